@@ -1,14 +1,42 @@
 from __future__ import annotations
 import json
+import os
+import re
+import threading
+import time
 from pathlib import Path
-from typing import Any, Dict, Iterable, Iterator
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 def append_jsonl(path: Path, obj: Dict[str, Any]) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     with path.open("a", encoding="utf-8") as f:
         f.write(json.dumps(obj, ensure_ascii=False) + "\n")
 
-def read_jsonl(path: Path) -> Iterator[Dict[str, Any]]:
+# rotated sets written by JsonlWriter: dir/events.jsonl -> dir/events-YYYYMMDD-HH.jsonl.N
+def _rotation_parts(path: Path) -> Tuple[str, str]:
+    return (path.stem, path.suffix) if path.suffix else (path.name, ".jsonl")
+
+def rotated_name(path: Path, ts: float, n: int) -> Path:
+    stem, suffix = _rotation_parts(path)
+    return path.with_name(f"{stem}-{time.strftime('%Y%m%d-%H', time.gmtime(ts))}{suffix}.{n}")
+
+def rotated_files(path: Path) -> List[Path]:
+    """Files of the rotated set of path (dir/events.jsonl -> dir/events-*.jsonl.N) in write order,
+    preceded by path itself if it exists."""
+    stem, suffix = _rotation_parts(path)
+    pattern = re.compile(re.escape(stem) + r"-(\d{8})-(\d{2})" + re.escape(suffix) + r"\.(\d+)$")
+    keyed: List[Tuple[Tuple[str, str, int], Path]] = []
+    if path.parent.is_dir():
+        for p in path.parent.iterdir():
+            m = pattern.match(p.name)
+            if m:
+                keyed.append(((m.group(1), m.group(2), int(m.group(3))), p))
+    files = [p for _, p in sorted(keyed)]
+    if path.is_file():
+        files.insert(0, path)
+    return files
+
+def _read_jsonl_file(path: Path) -> Iterator[Dict[str, Any]]:
     with path.open("r", encoding="utf-8") as f:
         for line in f:
             line=line.strip()
@@ -16,6 +44,285 @@ def read_jsonl(path: Path) -> Iterator[Dict[str, Any]]:
                 continue
             yield json.loads(line)
 
+def read_jsonl(path: Path) -> Iterator[Dict[str, Any]]:
+    """Read a JSONL file, or the rotated set written by JsonlWriter for path, in order."""
+    files = rotated_files(path)
+    if not files:
+        raise FileNotFoundError(path)
+    for p in files:
+        yield from _read_jsonl_file(p)
+
+def read_jsonl_batches(path: Path, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch: List[Dict[str, Any]] = []
+    for obj in read_jsonl(path):
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+class JsonlWriter:
+    """Long-lived, buffered JSONL writer.
+
+    Lines are buffered and written when buffer_size objects are pending or
+    flush_interval seconds have passed (a daemon thread flushes idle buffers;
+    flush_interval=0 flushes by count only).
+    With rotate_bytes and/or rotate_hourly the output is a rotated set
+    <stem>-YYYYMMDD-HH.jsonl.N (UTC hour) next to path instead of path
+    itself; read_jsonl reads such a set back in order. fsync_on_rotate
+    fsyncs every file before it is closed. close() flushes everything.
+
+    Subclasses can write other encodings by overriding encode (one buffered
+    item per object, may run in another process, see write_encoded) and
+    _chunks (the indivisible pieces a flush writes); binary = True opens the
+    files in binary mode.
+    """
+
+    binary = False
+
+    def __init__(
+        self,
+        path: Path,
+        buffer_size: int = 1000,
+        flush_interval: float = 1.0,
+        rotate_bytes: Optional[int] = None,
+        rotate_hourly: bool = False,
+        fsync_on_rotate: bool = False,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = Path(path)
+        self.buffer_size = max(1, buffer_size)
+        self.flush_interval = flush_interval
+        self.rotate_bytes = rotate_bytes
+        self.rotate_hourly = rotate_hourly
+        self.fsync_on_rotate = fsync_on_rotate
+        # wall clock used for hourly rotation and file names
+        self.clock = clock
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._buf: List[Any] = []
+        self._f = None
+        self._current: Optional[Path] = None
+        self._hour: Optional[str] = None
+        self._n = 0
+        self._size = 0
+        self._last_flush = time.monotonic()
+        self._closed = False
+        self._flusher: Optional[threading.Thread] = None
+        if flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, name="jsonl-writer-flush", daemon=True)
+            self._flusher.start()
+
+    @property
+    def rotating(self) -> bool:
+        return bool(self.rotate_bytes) or self.rotate_hourly
+
+    @property
+    def current_path(self) -> Optional[Path]:
+        return self._current
+
+    @property
+    def current_size(self) -> int:
+        """Bytes written to current_path (after flush(), all of them are in the file)."""
+        return self._size
+
+    @staticmethod
+    def encode(obj: Dict[str, Any]) -> Any:
+        return json.dumps(obj, ensure_ascii=False) + "\n"
+
+    def _chunks(self, pending: List[Any]) -> List[Any]:
+        return pending
+
+    def write(self, obj: Dict[str, Any]) -> None:
+        self.write_encoded((self.encode(obj),))
+
+    def write_encoded(self, items: Iterable[Any]) -> None:
+        """Buffers items already produced by encode()."""
+        with self._lock:
+            self._buf.extend(items)
+            if len(self._buf) >= self.buffer_size or (
+                self.flush_interval > 0 and time.monotonic() - self._last_flush >= self.flush_interval
+            ):
+                self._flush_locked()
+
+    def write_many(self, objs: Iterable[Dict[str, Any]]) -> None:
+        for obj in objs:
+            self.write(obj)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._flush_locked()
+            self._close_file()
+
+    def __enter__(self) -> "JsonlWriter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def _flush_loop(self) -> None:
+        while not self._closed:
+            time.sleep(self.flush_interval)
+            with self._lock:
+                if self._closed:
+                    return
+                if self._buf and time.monotonic() - self._last_flush >= self.flush_interval:
+                    self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self._buf:
+            return
+        pending = self._chunks(self._buf)
+        if not self.rotating:
+            self._open(self.path)
+            self._write_locked(pending)
+        else:
+            if self._f is None:
+                # open the first file up front so the size cap covers it too
+                self._rotate()
+            # rotate between lines so no line straddles two files
+            start = 0
+            size = self._size
+            for i, line in enumerate(pending):
+                if self._needs_rotation(size + len(line)) and (i > start or size > 0):
+                    self._write_locked(pending[start:i])
+                    self._rotate()
+                    start = i
+                    size = 0
+                size += len(line)
+            self._write_locked(pending[start:])
+        self._buf = []
+
+    def _write_locked(self, lines: List[Any]) -> None:
+        if not lines:
+            return
+        if self._f is None:
+            if self.rotating:
+                self._rotate()
+            else:
+                self._open(self.path)
+        if self.binary:
+            data = b"".join(lines)
+            size = len(data)
+        else:
+            data = "".join(lines)
+            size = len(data) if data.isascii() else len(data.encode("utf-8"))
+        self._f.write(data)
+        self._f.flush()
+        self._size += size
+
+    def _needs_rotation(self, size_after: int) -> bool:
+        if self._f is None:
+            return False
+        if self.rotate_hourly and self._hour != time.strftime("%Y%m%d-%H", time.gmtime(self.clock())):
+            return True
+        return bool(self.rotate_bytes) and size_after > self.rotate_bytes
+
+    def _rotate(self) -> None:
+        now = self.clock()
+        hour = time.strftime("%Y%m%d-%H", time.gmtime(now))
+        if self._f is not None:
+            self._close_file(fsync=self.fsync_on_rotate)
+            self._n = self._n + 1 if hour == self._hour else 0
+        else:
+            # continue an existing set for this hour instead of overwriting it
+            existing = [p for p in rotated_files(self.path) if p.name.startswith(rotated_name(self.path, now, 0).name[:-1])]
+            self._n = int(existing[-1].name.rsplit(".", 1)[1]) + 1 if existing else 0
+        self._hour = hour
+        self._open(rotated_name(self.path, now, self._n))
+
+    def _open(self, path: Path) -> None:
+        if self._f is not None and self._current == path:
+            return
+        self._close_file()
+        self._f = path.open("ab") if self.binary else path.open("a", encoding="utf-8")
+        self._current = path
+        self._size = path.stat().st_size
+
+    def _close_file(self, fsync: bool = False) -> None:
+        if self._f is None:
+            return
+        self._f.flush()
+        if fsync:
+            os.fsync(self._f.fileno())
+        self._f.close()
+        self._f = None
+
+# tail -F style reader: read_new() returns whatever complete lines were
+# appended since the last call, without blocking. When path is the base of a
+# rotated set (see JsonlWriter), the reader moves on to the next file of the
+# set once the current one is drained.
+class JsonlTail:
+    binary = False
+
+    def __init__(self, path: Path, from_end: bool = False) -> None:
+        self.path = path
+        self.from_end = from_end
+        self._f = None
+        self._current: Optional[Path] = None
+        self._partial: Any = b"" if self.binary else ""
+
+    def _next_file(self) -> Optional[Path]:
+        files = rotated_files(self.path)
+        if not files:
+            return None
+        if self._current is None:
+            return files[-1] if self.from_end else files[0]
+        if self._current in files:
+            i = files.index(self._current)
+            return files[i + 1] if i + 1 < len(files) else None
+        return None
+
+    def _open_next(self) -> bool:
+        nxt = self._next_file()
+        if nxt is None:
+            return False
+        first = self._current is None
+        if self._f is not None:
+            self._f.close()
+        self._f = nxt.open("rb") if self.binary else nxt.open("r", encoding="utf-8")
+        self._current = nxt
+        self._partial = b"" if self.binary else ""
+        if first and self.from_end:
+            self._f.seek(0, 2)
+        return True
+
+    def read_new(self, max_items: int) -> List[Dict[str, Any]]:
+        if self._f is None and not self._open_next():
+            return []
+        out: List[Dict[str, Any]] = []
+        while len(out) < max_items:
+            line = self._f.readline()
+            if not line:
+                # drained: continue with the next rotated file, if any
+                if self._partial or not self._open_next():
+                    break
+                continue
+            if not line.endswith("\n"):
+                # writer is mid-line; keep the fragment until the rest arrives
+                self._partial += line
+                break
+            line = (self._partial + line).strip()
+            self._partial = ""
+            if line:
+                out.append(json.loads(line))
+        return out
+
+    def close(self) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
 def write_json(path: Path, obj: Any) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     path.write_text(json.dumps(obj, ensure_ascii=False, indent=2), encoding="utf-8")
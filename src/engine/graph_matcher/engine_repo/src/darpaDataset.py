@@ -6,6 +6,8 @@ from tqdm import tqdm, trange
 from scipy.stats import spearmanr, kendalltau
 import pickle 
 import glob
+import json
+import os
 
 from layers import AttentionModule, TensorNetworkModule, DiffPool
 from utils import calculate_ranking_correlation, calculate_prec_at_k, gen_pairs, ensure_dir
@@ -17,36 +19,36 @@ from torch_geometric.datasets import GEDDataset
 from torch_geometric.transforms import OneHotDegree
 from torch_geometric.data import InMemoryDataset
 from parser import parameter_parser
+from vocabulary import get_vocabulary
 
 import matplotlib.pyplot as plt
 
 class DARPADataset(InMemoryDataset):
     args = parameter_parser()
-    if args.dataset == "DARPA_OPTC":
-        num_features = 4
-        num_relations = 10
-    elif args.dataset == "DARPA_CADETS":
-        num_features = 4
-        num_relations = 31
-    elif args.dataset == "DARPA_THEIA":
-        num_features = 4
-        num_relations = 17
-    elif args.dataset == "DARPA_TRACE":
-        num_features = 4
-        num_relations = 24
+    vocabulary = get_vocabulary(args.dataset)
+    num_features = vocabulary.num_node_labels
+    num_relations = vocabulary.num_edge_labels
     def __init__(self, root,train:bool=True,predict=False,query = False,file_name=None):
+        # predict files to refresh in process(): only the requested one when
+        # predicting, none for the query dataset, all of them otherwise
+        self.predict_files = [file_name] if predict else ([] if query else None)
         super().__init__(root)  
         self.name = "DARPA_Dataset"
+        # process() only runs when a processed file is missing, so stale
+        # query / predict files are re-collated here on every load
         if query:
+            manifest = self.load_manifest()
+            if self.process_query_file(manifest):
+                self.save_manifest(manifest)
             path = self.processed_paths[3]
             self.data, self.slices = torch.load(path)  
         elif predict:
             file_path = self.root + "/processed/predict_dataset/" + file_name
-            self.process()
-            try:
-                self.data, self.slices = torch.load(file_path) 
-            except:
-                self.process()            
+            manifest = self.load_manifest()
+            changed = self.process_query_file(manifest)
+            if self.process_predict_file(file_name, manifest) or changed:
+                self.save_manifest(manifest)
+            self.data, self.slices = torch.load(file_path) 
         else:
             path = self.processed_paths[0] if train else self.processed_paths[1]
             self.data, self.slices = torch.load(path)
@@ -61,18 +63,70 @@ class DARPADataset(InMemoryDataset):
         return ['torch_training_dataset.pt','torch_testing_dataset.pt','nged_matrix.pt','query_graphs_dataset.pt']
 
 
+    @property
+    def manifest_path(self):
+        return self.root + "/processed/predict_dataset/manifest.json"
+
+    def load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except ValueError:
+            return {}
+
+    def save_manifest(self, manifest):
+        ensure_dir(self.manifest_path)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    @staticmethod
+    def _stat(path):
+        st = os.stat(path)
+        return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+    def _collate_if_stale(self, key, raw_path, save_path, manifest):
+        """
+        Collate raw_path into save_path unless the manifest shows it is up to date.
+        :return changed: True if the file was (re)collated.
+        """
+        stat = self._stat(raw_path)
+        if manifest.get(key) == stat and os.path.exists(save_path):
+            return False
+        raw = torch.load(raw_path)
+        # realtime exports may already be a collated (data, slices) pair
+        torch.save(raw if isinstance(raw, tuple) else self.collate(raw), save_path)
+        manifest[key] = stat
+        return True
+
+    def process_query_file(self, manifest):
+        query_path = self.args.dataset_path + "raw/torch_query_dataset.pt"
+        return self._collate_if_stale("torch_query_dataset.pt", query_path, self.processed_paths[3], manifest)
+
+    def process_predict_file(self, file_name, manifest):
+        raw_path = self.args.dataset_path + "raw/torch_prediction/" + file_name
+        ensure_dir(self.root + "/processed/predict_dataset/")
+        save_path = self.root + "/processed/predict_dataset/" + file_name
+        return self._collate_if_stale("torch_prediction/" + file_name, raw_path, save_path, manifest)
+
     def process(self):
         if self.args.predict:
-            query_path = self.args.dataset_path + "raw/torch_query_dataset.pt"
-            query_list = torch.load(query_path)
-            torch.save(self.collate(query_list),self.processed_paths[3])
-
-            predict_paths = self.args.dataset_path + "raw/torch_prediction/*"
-            ensure_dir(self.root + "/processed/predict_dataset/")
-            for predict_path in glob.glob(predict_paths):
-                predict_list = torch.load(predict_path)
-                save_path = self.root + "/processed/predict_dataset/" + predict_path.split("/")[-1]
-                torch.save(self.collate(predict_list),save_path)
+            # incremental: only files that are new or whose mtime/size changed
+            # since the last run (tracked in processed/predict_dataset/manifest.json)
+            manifest = self.load_manifest()
+            changed = self.process_query_file(manifest)
+
+            predict_files = getattr(self, "predict_files", None)
+            if predict_files is None:
+                predict_paths = self.args.dataset_path + "raw/torch_prediction/*"
+                predict_files = [predict_path.split("/")[-1] for predict_path in glob.glob(predict_paths)]
+            for file_name in predict_files:
+                changed = self.process_predict_file(file_name, manifest) or changed
+            if changed:
+                self.save_manifest(manifest)
         else:    
             print("processing dataset from",self.args.dataset_path," path")        
             data_path_training = self.args.dataset_path + "raw/torch_training_dataset.pt"
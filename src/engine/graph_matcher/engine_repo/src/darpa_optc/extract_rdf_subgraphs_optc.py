@@ -29,6 +29,7 @@ current_dir = os.getcwd()
 # warnings.simplefilter("ignore", distributed.comm.core.CommClosedError)
 sys.path.append(current_dir+"/src")
 from dataset_config import get_stardog_cred
+from vocabulary import get_vocabulary
 
 process = psutil.Process(os.getpid())
 import multiprocessing
@@ -1156,27 +1157,26 @@ def subgraph_quality_check_per_query(subgraphs, suspicious_nodes, min_iocs):
 
 def encode_for_RGCN(g):
 #     print("Encoding a subgraph with",g.number_of_nodes(),g.number_of_edges())
-    types = ['PROCESS', 'SHELL', 'FILE', 'FLOW']
+    vocabulary = get_vocabulary("darpa_optc")
     mapping = {name: j for j, name in enumerate(g.nodes())}
     g = nx.relabel_nodes(g, mapping)
     x = torch.zeros(g.number_of_nodes(), dtype=torch.long)
     tmp_g = copy.deepcopy(g)
     for node, info in g.nodes(data=True):
         try:
-            x[int(node)] = types.index(info['type'].upper())
+            x[int(node)] = vocabulary.node_id(info['type'].upper())
         except Exception as e:
             print("Undefined node type. The error", e, "The nodes attributes", info)
             g.remove_node(node)
             continue
     g = copy.deepcopy(tmp_g)
-    x = F.one_hot(x, num_classes=len(types)).to(torch.float)
+    x = F.one_hot(x, num_classes=vocabulary.num_node_labels).to(torch.float)
     for node in g.nodes():
         g.nodes[node]["label"] = x[node]
-    edge_types = ['RENAME', 'READ', 'DELETE', 'CREATE', 'OPEN', 'MESSAGE', 'COMMAND', 'WRITE', 'TERMINATE', 'MODIFY']
     for n1, n2, info in g.edges(data=True):
         for k, info in g.get_edge_data(n1, n2).items():
             try:
-                g.edges[n1, n2, k]["edge_label"] = edge_types.index(info['type'].upper())
+                g.edges[n1, n2, k]["edge_label"] = vocabulary.edge_id(info['type'].upper())
             except Exception as e:
                 print("Undefined edge type. The error", e, "The nodes attributes", info)
     dgl_graph = dgl.from_networkx(g, node_attrs=["label"], edge_attrs=["edge_label"])
@@ -31,6 +31,7 @@ import sys
 current_dir = os.getcwd()
 sys.path.append(current_dir+"/src")
 from dataset_config import get_stardog_cred
+from vocabulary import get_vocabulary
 from resource import *
 
 parser = argparse.ArgumentParser()
@@ -1193,29 +1194,26 @@ def subgraph_quality_check_per_query(subgraphs, suspicious_nodes, min_iocs):
 
 def encode_for_RGCN(g):
     #     print("Encoding a subgraph with",g.number_of_nodes(),g.number_of_edges())
-    types = ['FILE', 'MEMORY', 'PROCESS', 'FLOW']
+    vocabulary = get_vocabulary("darpa_theia")
     mapping = {name: j for j, name in enumerate(g.nodes())}
     g = nx.relabel_nodes(g, mapping)
     x = torch.zeros(g.number_of_nodes(), dtype=torch.long)
     tmp_g = copy.deepcopy(g)
     for node, info in g.nodes(data=True):
         try:
-            x[int(node)] = types.index(info['type'].upper())
+            x[int(node)] = vocabulary.node_id(info['type'].upper())
         except Exception as e:
             print("Undefined node type. The error", e, "The nodes attributes", info)
             tmp_g.remove_node(node)
             continue
     g = copy.deepcopy(tmp_g)
-    x = F.one_hot(x, num_classes=len(types)).to(torch.float)
+    x = F.one_hot(x, num_classes=vocabulary.num_node_labels).to(torch.float)
     for node in g.nodes():
         g.nodes[node]["label"] = x[node]
-    edge_types = ['SENDTO', 'CLONE', 'EXECUTE', 'SHM', 'RECVMSG', 'RECVFROM', 'READ_SOCKET_PARAMS', 'READ', 'CONNECT',
-                  'SENDMSG', 'WRITE', 'MMAP', 'OPEN', 'WRITE_SOCKET_PARAMS', 'MODIFY_FILE_ATTRIBUTES', 'MPROTECT',
-                  'UNLINK']
     for n1, n2, info in g.edges(data=True):
         for k, info in g.get_edge_data(n1, n2).items():
             try:
-                g.edges[n1, n2, k]["edge_label"] = edge_types.index(info['type'].upper())
+                g.edges[n1, n2, k]["edge_label"] = vocabulary.edge_id(info['type'].upper())
             except Exception as e:
                 print("Undefined edge type. The error", e, "The nodes attributes", info)
     dgl_graph = dgl.from_networkx(g, node_attrs=["label"], edge_attrs=["edge_label"])
@@ -30,6 +30,7 @@ import sys
 current_dir = os.getcwd()
 sys.path.append(current_dir+"/src")
 from dataset_config import get_stardog_cred
+from vocabulary import get_vocabulary
 
 parser = argparse.ArgumentParser()
 parser.add_argument('--min-nodes', type=int, help='Minimum number of nodes for subgraphs', default=3)
@@ -848,30 +849,24 @@ def subgraph_quality_check_per_query(subgraphs, suspicious_nodes, min_iocs):
 
 def encode_for_RGCN(g):
     #     print("Encoding a subgraph with",g.number_of_nodes(),g.number_of_edges())
-    types = ['PROCESS', 'FILE', 'FLOW', 'MEMORY']
+    # mapping to THEIA edges, For an old experiemnt
+    vocabulary = get_vocabulary("darpa_theia" if args.map_to_theia else "darpa_trace")
     mapping = {name: j for j, name in enumerate(g.nodes())}
     g = nx.relabel_nodes(g, mapping)
     x = torch.zeros(g.number_of_nodes(), dtype=torch.long)
     tmp_g = copy.deepcopy(g)
     for node, info in list(g.nodes.data()):
         try:
-            x[int(node)] = types.index(info['type'].upper())
+            x[int(node)] = vocabulary.node_id(info['type'].upper())
         except Exception as e:
             print("Undefined node type. The error", e, "The nodes attributes", info)
             g.remove_node(node)
             continue
     g = copy.deepcopy(tmp_g)
-    x = F.one_hot(x, num_classes=len(types)).to(torch.float)
+    x = F.one_hot(x, num_classes=vocabulary.num_node_labels).to(torch.float)
     for node in g.nodes():
         g.nodes[node]["label"] = x[node]
-    edge_types = ['EXECUTE', 'RECVMSG', 'SENDMSG', 'UNIT', 'RENAME', 'OPEN', 'CREATE_OBJECT', 'CONNECT', 'CLOSE',
-                  'MPROTECT', 'LINK', 'CLONE', 'LOADLIBRARY', 'FORK', 'UPDATE', 'EXIT', 'WRITE',
-                  'MODIFY_FILE_ATTRIBUTES', 'TRUNCATE', 'MMAP', 'UNLINK', 'OTHER', 'CHANGE_PRINCIPAL', 'READ']
-    # mapping to THEIA edges, For an old experiemnt
     if args.map_to_theia:
-        edge_types = ['SENDTO', 'CLONE', 'EXECUTE', 'SHM', 'RECVMSG', 'RECVFROM', 'READ_SOCKET_PARAMS', 'READ',
-                      'CONNECT', 'SENDMSG', 'WRITE', 'MMAP', 'OPEN', 'WRITE_SOCKET_PARAMS', 'MODIFY_FILE_ATTRIBUTES',
-                      'MPROTECT', 'UNLINK']
         mapping_edges = {"RENAME": "MODIFY_FILE_ATTRIBUTES", "CHANGE_PRINCIPAL": "MODIFY_FILE_ATTRIBUTES",
                          "CLOSE": "UNLINK", "EXIT": "UNLINK", "TRUNCATE": "MODIFY_FILE_ATTRIBUTES", "FORK": "CLONE",
                          "CREATE_OBJECT": "OPEN", "LINK": "MODIFY_FILE_ATTRIBUTES", "LOADLIBRARY": "EXECUTE",
@@ -883,7 +878,7 @@ def encode_for_RGCN(g):
                 if current_edge_type in mapping_edges:
                     current_edge_type = mapping_edges[current_edge_type]
             try:
-                g.edges[n1, n2, k]["edge_label"] = edge_types.index(info['type'].upper())
+                g.edges[n1, n2, k]["edge_label"] = vocabulary.edge_id(current_edge_type)
             except Exception as e:
                 print("Undefined edge type. The error", e, "The nodes attributes", info)
     dgl_graph = dgl.from_networkx(g, node_attrs=["label"], edge_attrs=["edge_label"])
@@ -1,3 +1,6 @@
+from vocabulary import get_vocabulary
+
+
 def get_postgres_cred(dataset):
     username = ""
     password = ""
@@ -21,30 +24,8 @@ def get_stardog_cred(dataset):
 
 
 def get_dataset_nodes_and_edges(dataset):
-    if dataset == "darpa_optc":
-        node_types = ['PROCESS', 'SHELL', 'FILE', 'FLOW']
-        edge_types = ['RENAME', 'READ', 'DELETE', 'CREATE', 'OPEN', 'MESSAGE', 'COMMAND', 'WRITE', 'TERMINATE',
-                      'MODIFY']
-    elif dataset == "darpa_cadets":
-        node_types = ['PROCESS', 'FILE', 'FLOW', 'PIPE']
-        edge_types = ['ACCEPT', 'ADD_OBJECT_ATTRIBUTE', 'BIND', 'CHANGE_PRINCIPAL', 'CLOSE', 'CONNECT', 'CREATE_OBJECT',
-                      'EXECUTE', 'EXIT', 'FCNTL', 'FLOWS_TO', 'FORK', 'LINK', 'LOGIN', 'LSEEK', 'MMAP',
-                      'MODIFY_FILE_ATTRIBUTES', 'MODIFY_PROCESS', 'MPROTECT', 'OPEN', 'OTHER', 'READ', 'RECVFROM',
-                      'RECVMSG', 'RENAME', 'SENDMSG', 'SENDTO', 'SIGNAL', 'TRUNCATE', 'UNLINK', 'WRITE']
-    elif dataset == "darpa_theia":
-        node_types = ['FILE', 'MEMORY', 'PROCESS', 'FLOW']
-        edge_types = ['SENDTO', 'CLONE', 'EXECUTE', 'SHM', 'RECVMSG', 'RECVFROM', 'READ_SOCKET_PARAMS', 'READ',
-                      'CONNECT',
-                      'SENDMSG', 'WRITE', 'MMAP', 'OPEN', 'WRITE_SOCKET_PARAMS', 'MODIFY_FILE_ATTRIBUTES', 'MPROTECT',
-                      'UNLINK']
-    elif dataset == "darpa_trace":
-        node_types = ['PROCESS', 'FILE', 'FLOW', 'MEMORY']
-        edge_types = ['EXECUTE', 'RECVMSG', 'SENDMSG', 'UNIT', 'RENAME', 'OPEN', 'CREATE_OBJECT', 'CONNECT', 'CLOSE',
-                      'MPROTECT', 'LINK', 'CLONE', 'LOADLIBRARY', 'FORK', 'UPDATE', 'EXIT', 'WRITE',
-                      'MODIFY_FILE_ATTRIBUTES', 'TRUNCATE', 'MMAP', 'UNLINK', 'OTHER', 'CHANGE_PRINCIPAL', 'READ']
-    else:
-        print("Undefined dataset")
-    return node_types, edge_types
+    vocabulary = get_vocabulary(dataset)
+    return list(vocabulary.node_types), list(vocabulary.edge_types)
 
 
 def get_ground_cases(dataset, similar_attack=False):
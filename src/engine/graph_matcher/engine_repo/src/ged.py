@@ -5,6 +5,7 @@ from copy import deepcopy
 
 from lapjv import lapjv
 import time
+import weakref
 
 EPSILON = 0.0000001;
 Time_Limit = 30;
@@ -58,6 +59,12 @@ def validate_cost_functions(G1, G2,
         G1_node_deletion_cost, G1_edge_deletion_cost, \
         G2_node_insertion_cost, G2_edge_insertion_cost;
         
+def diagonal_block(diagonal, off_diagonal):
+    # n x n block with the given diagonal and off_diagonal everywhere else
+    block = np.full((len(diagonal), len(diagonal)), off_diagonal, dtype=float)
+    np.fill_diagonal(block, diagonal)
+    return block
+
 def construct_cost_functions(G1, G2, 
                             node_substitution_cost, edge_substitution_cost, 
                             G1_node_deletion_cost, G1_edge_deletion_cost,
@@ -78,14 +85,8 @@ def construct_cost_functions(G1, G2,
     
     
     C_node[0:num_G1_nodes, 0:num_G2_nodes] = node_substitution_cost;
-    C_node[0:num_G1_nodes, num_G2_nodes:num_G2_nodes + num_G1_nodes] = np.array([G1_node_deletion_cost[i] if i == j \
-                                                                     else cost_upper_bound\
-                                                                     for i in range(num_G1_nodes) \
-                                                                     for j in range(num_G1_nodes)]).reshape(num_G1_nodes, num_G1_nodes);
-    C_node[num_G1_nodes:num_G1_nodes + num_G2_nodes, 0:num_G2_nodes] = np.array([G2_node_insertion_cost[i] if i == j \
-                                                                     else cost_upper_bound\
-                                                                     for i in range(num_G2_nodes) \
-                                                                     for j in range(num_G2_nodes)]).reshape(num_G2_nodes, num_G2_nodes);
+    C_node[0:num_G1_nodes, num_G2_nodes:num_G2_nodes + num_G1_nodes] = diagonal_block(G1_node_deletion_cost, cost_upper_bound);
+    C_node[num_G1_nodes:num_G1_nodes + num_G2_nodes, 0:num_G2_nodes] = diagonal_block(G2_node_insertion_cost, cost_upper_bound);
         
     # cost matrix of edge mappings
     cost_upper_bound = edge_substitution_cost.sum() + G1_edge_deletion_cost.sum() + G2_edge_insertion_cost.sum() + 1
@@ -93,195 +94,191 @@ def construct_cost_functions(G1, G2,
     
     
     C_edge[0:num_G1_edges, 0:num_G2_edges] = edge_substitution_cost;
-    C_edge[0:num_G1_edges, num_G2_edges:num_G2_edges + num_G1_edges] = np.array([G1_edge_deletion_cost[i] if i == j \
-                                                                     else cost_upper_bound\
-                                                                     for i in range(num_G1_edges) \
-                                                                     for j in range(num_G1_edges)]).reshape(num_G1_edges, num_G1_edges);
-    C_edge[num_G1_edges:num_G1_edges + num_G2_edges, 0:num_G2_edges] = np.array([G2_edge_insertion_cost[i] if i == j \
-                                                                     else cost_upper_bound\
-                                                                     for i in range(num_G2_edges) \
-                                                                     for j in range(num_G2_edges)]).reshape(num_G2_edges, num_G2_edges);
+    C_edge[0:num_G1_edges, num_G2_edges:num_G2_edges + num_G1_edges] = diagonal_block(G1_edge_deletion_cost, cost_upper_bound);
+    C_edge[num_G1_edges:num_G1_edges + num_G2_edges, 0:num_G2_edges] = diagonal_block(G2_edge_insertion_cost, cost_upper_bound);
     return C_node, C_edge;
 
-def get_edges_to_match(G, node_id, matched_nodes):
-    # Find the edges in G with one end-point as node_id and other in matched_nodes or node_id
-    incident_edges = np.array([], dtype=int)
-    index = np.array([], dtype=int)
-    direction = np.array([], dtype=int)
-    if G.has_edges_between(node_id, node_id):
-        _,_,self_edge_ids = G.edge_ids(node_id, node_id,return_uv=True);
-        self_edge_ids = self_edge_ids.numpy();
-        incident_edges = np.concatenate((incident_edges, self_edge_ids));
-        index = np.concatenate((index, [-1]*len(self_edge_ids)));
-        direction = np.concatenate((direction, [0]*len(self_edge_ids)));
+def get_edges_to_match(G, node_id, matched_positions):
+    # Find the edges in G with one end-point as node_id and other in matched nodes or node_id.
+    # matched_positions[v] is the position of v in the list of matched nodes, -1 if v is not matched.
+    src, dst, self_edges, incoming_edges, outgoing_edges = _graph_structure(G)
+    self_edge_ids = self_edges[node_id]
     # Find predecessors
-    src, _, eid = G.in_edges([node_id], 'all');
-    eid = eid.numpy();
-    src = src.numpy();
-    filtered_indices = [(i,matched_nodes.index(src[i])) for i in range(len(src)) if src[i] in matched_nodes];
-    matched_index = np.array([_[1] for _ in filtered_indices], dtype=int);
-    eid_index = np.array([_[0] for _ in filtered_indices], dtype=int);
-    index = np.concatenate((index, matched_index));
-    incident_edges = np.concatenate((incident_edges, eid[eid_index]));
-    direction = np.concatenate((direction, np.array([-1]*len(filtered_indices), dtype=int)));
+    in_eid = incoming_edges[node_id]
+    in_index = matched_positions[src[in_eid]]
+    in_matched = in_index >= 0
     # Find successors
-    _, dst, eid = G.out_edges([node_id], 'all');
-    eid = eid.numpy();
-    dst = dst.numpy();
-    filtered_indices = [(i,matched_nodes.index(dst[i])) for i in range(len(dst)) if dst[i] in matched_nodes]
-    matched_index = np.array([_[1] for _ in filtered_indices], dtype=int);
-    eid_index = np.array([_[0] for _ in filtered_indices], dtype=int);
-    index = np.concatenate((index, matched_index));
-    incident_edges = np.concatenate((incident_edges, eid[eid_index]));
-    direction = np.concatenate((direction, np.array([1]*len(filtered_indices), dtype=int)));
+    out_eid = outgoing_edges[node_id]
+    out_index = matched_positions[dst[out_eid]]
+    out_matched = out_index >= 0
+    incident_edges = np.concatenate((self_edge_ids, in_eid[in_matched], out_eid[out_matched]))
+    index = np.concatenate((np.full(len(self_edge_ids), -1, dtype=int), in_index[in_matched], out_index[out_matched]))
+    direction = np.concatenate((np.zeros(len(self_edge_ids), dtype=int),
+                                np.full(int(in_matched.sum()), -1, dtype=int),
+                                np.ones(int(out_matched.sum()), dtype=int)))
     return incident_edges, index, direction;
 
 def subset_cost_matrix(cost_matrix, row_ids, col_ids, num_rows, num_cols):
     # Extract thr subset of cost matrix corresponding to rows/cols in arrays row_ids/col_ids
     # Note that the shape of cost_matrix is (num_rows+num_cols) * (num_rows+num_cols)
-    extended_row_ids = np.concatenate((row_ids, np.array([k + num_rows for k in col_ids])));
-    extended_col_ids = np.concatenate((col_ids, np.array([k + num_cols for k in row_ids])));
-    return cost_matrix[extended_row_ids, :][:, extended_col_ids]
+    extended_row_ids = np.concatenate((row_ids, np.asarray(col_ids, dtype=int) + num_rows));
+    extended_col_ids = np.concatenate((col_ids, np.asarray(row_ids, dtype=int) + num_cols));
+    return cost_matrix[np.ix_(extended_row_ids, extended_col_ids)]
+
+def _assignment_cost_bound(cost_matrix, row_ids, col_ids, num_rows, num_cols):
+    # LAP cost of matching the unprocessed rows/cols, deletion/insertion cost if one side is empty
+    if len(row_ids) > 0 and len(col_ids) > 0: # Consider substituting
+        unmatched_cost_matrix = subset_cost_matrix(cost_matrix, row_ids, col_ids, num_rows, num_cols)
+        row_ind, col_ind, _ = lapjv(unmatched_cost_matrix);
+        return unmatched_cost_matrix[np.arange(len(row_ind)), row_ind].sum();
+    elif len(row_ids) > 0: # only deletion possible
+        return cost_matrix[row_ids, num_cols + row_ids].sum();
+    elif len(col_ids) > 0: # only insertion possible
+        return cost_matrix[num_rows + col_ids, col_ids].sum();
+    return 0.0;
 
 class search_tree_node:
-    def __init__(self, G1, G2, parent_matched_cost, parent_matched_nodes, parent_matched_edges, node_G1, node_G2, \
-                 parent_unprocessed_nodes_G1, parent_unprocessed_nodes_G2, parent_unprocessed_edges_G1, parent_unprocessed_edges_G2, \
-                 cost_matrix_nodes, cost_matrix_edges):
-        
-        self.matched_cost = parent_matched_cost;
+    """A node of the A*/beam search tree: the match of node_G1 with node_G2 (None means deletion/insertion)
+    on top of the matches of its ancestors.
+    Matched nodes/edges are not copied into every child; they are kept once per tree-node and followed
+    through parent pointers. Unprocessed nodes/edges are numpy bool masks instead of lists.
+    """
+    __slots__ = ("parent", "depth", "node_G1", "node_G2", "edges_G1", "edges_G2",
+                 "matched_cost", "future_approximate_cost",
+                 "unprocessed_nodes_G1", "unprocessed_nodes_G2", "unprocessed_edges_G1", "unprocessed_edges_G2",
+                 "num_unprocessed")
+
+    def __init__(self, G1, G2, parent, node_G1, node_G2, matched_positions, cost_matrix_nodes, cost_matrix_edges):
+        # matched_positions: the parent's matched_positions(), shared by all children of a parent
+        num_G1_nodes, num_G2_nodes = G1.number_of_nodes(), G2.number_of_nodes()
+        num_G1_edges, num_G2_edges = G1.number_of_edges(), G2.number_of_edges()
+        
+        self.parent = parent;
+        self.depth = parent.depth + 1;
+        self.node_G1 = node_G1;
+        self.node_G2 = node_G2;
+        self.matched_cost = parent.matched_cost;
         self.future_approximate_cost = 0.0;
-        self.matched_nodes = deepcopy(parent_matched_nodes);
-        self.matched_nodes[0].append(node_G1);
-        self.matched_nodes[1].append(node_G2);
-        self.matched_edges = deepcopy(parent_matched_edges);
-        self.unprocessed_nodes_G1 = [_ for _ in parent_unprocessed_nodes_G1 if _ != node_G1];
-        self.unprocessed_nodes_G2 = [_ for _ in parent_unprocessed_nodes_G2 if _ != node_G2];
-        
+        self.unprocessed_nodes_G1 = parent.unprocessed_nodes_G1.copy();
+        self.unprocessed_nodes_G2 = parent.unprocessed_nodes_G2.copy();
+        if node_G1 is not None:
+            self.unprocessed_nodes_G1[node_G1] = False;
+        if node_G2 is not None:
+            self.unprocessed_nodes_G2[node_G2] = False;
         
         # Add the cost of matching nodes at this tree-node to the matched cost
         if node_G1 is not None and node_G2 is not None: # Substitute node_G1 with node_G2
             self.matched_cost += cost_matrix_nodes[node_G1, node_G2];
         elif node_G1 is not None: # Delete node_G1
-            self.matched_cost += cost_matrix_nodes[node_G1, node_G1+G2.number_of_nodes()];
+            self.matched_cost += cost_matrix_nodes[node_G1, node_G1+num_G2_nodes];
         elif node_G2 is not None: # Insert node_G2
-            self.matched_cost += cost_matrix_nodes[node_G2+G1.number_of_nodes(), node_G2];
+            self.matched_cost += cost_matrix_nodes[node_G2+num_G1_nodes, node_G2];
             
         # Add the cost of matching edges at this tree-node to the matched cost
-        incident_edges_G1 = [];
+        incident_edges_G1 = np.array([], dtype=int);
         if node_G1 is not None: # Find the edges with one end-point as node_G1 and other in matched nodes or node_G1
-            incident_edges_G1, index_G1, direction_G1 = get_edges_to_match(G1, node_G1, parent_matched_nodes[0])
+            incident_edges_G1, index_G1, direction_G1 = get_edges_to_match(G1, node_G1, matched_positions[0])
         
-        incident_edges_G2 = np.array([]);
+        incident_edges_G2 = np.array([], dtype=int);
         if node_G2 is not None: # Find the edges with one end-point as node_G2 and other in matched nodes or node_G2
-            incident_edges_G2, index_G2, direction_G2 = get_edges_to_match(G2, node_G2, parent_matched_nodes[1])
+            incident_edges_G2, index_G2, direction_G2 = get_edges_to_match(G2, node_G2, matched_positions[1])
         
-        if len(incident_edges_G1) > 0 and len(incident_edges_G2) > 0: # Consider substituting
-            matched_edges_cost_matrix = subset_cost_matrix(cost_matrix_edges, incident_edges_G1, incident_edges_G2, G1.number_of_edges(), G2.number_of_edges())
+        m, n = len(incident_edges_G1), len(incident_edges_G2)
+        if m > 0 and n > 0: # Consider substituting
+            matched_edges_cost_matrix = subset_cost_matrix(cost_matrix_edges, incident_edges_G1, incident_edges_G2, num_G1_edges, num_G2_edges)
             max_sum = matched_edges_cost_matrix.sum();
-            # take care of impossible assignments by assigning maximum cost
-            for i in range(len(incident_edges_G1)):
-                for j in range(len(incident_edges_G2)):
-                    # both edges need to have same direction and the other end nodes are matched
-                    if direction_G1[i] == direction_G2[j] and index_G1[i] == index_G2[j]:
-                        continue;
-                    else:
-                        matched_edges_cost_matrix[i,j] = max_sum;
+            # take care of impossible assignments by assigning maximum cost:
+            # both edges need to have same direction and the other end nodes are matched
+            possible = (direction_G1[:, None] == direction_G2[None, :]) & (index_G1[:, None] == index_G2[None, :])
+            matched_edges_cost_matrix[:m, :n][~possible] = max_sum;
             # Match the edges as per the LAP solution
             row_ind, col_ind, _ = lapjv(matched_edges_cost_matrix);
-            lap_cost = 0.00
-            for i in range(len(row_ind)):
-                lap_cost += matched_edges_cost_matrix[i, row_ind[i]];
-                
-            #Update matched edges
-            for i in range(len(row_ind)):
-                if i < len(incident_edges_G1):
-                    self.matched_edges[0].append(incident_edges_G1[i]);
-                    if row_ind[i] < len(incident_edges_G2):
-                        self.matched_edges[1].append(incident_edges_G2[row_ind[i]]);
-                    else:
-                        self.matched_edges[1].append(None);
-                elif row_ind[i] < len(incident_edges_G2):
-                    self.matched_edges[0].append(None);
-                    self.matched_edges[1].append(incident_edges_G2[row_ind[i]]);
-            self.matched_cost += lap_cost;
+            self.matched_cost += matched_edges_cost_matrix[np.arange(len(row_ind)), row_ind].sum();
             
-        elif len(incident_edges_G1) > 0: #only deletion possible
-            edge_deletion_cost = 0.0;
-            for edge in incident_edges_G1:
-                edge_deletion_cost += cost_matrix_edges[edge, G2.number_of_edges()+edge];
-            #Update matched edges
-            for edge in incident_edges_G1:
-                self.matched_edges[0].append(edge);
-                self.matched_edges[1].append(None);
-                
-                #Update matched edges
-            
-            self.matched_cost += edge_deletion_cost;
-            
-        elif len(incident_edges_G2) > 0: #only insertion possible
-            edge_insertion_cost = 0.0;
-            for edge in incident_edges_G2:
-                edge_insertion_cost += cost_matrix_edges[G1.number_of_edges()+edge, edge];
-            #Update matched edges
-            for edge in incident_edges_G2:
-                self.matched_edges[0].append(None);
-                self.matched_edges[1].append(edge);
-            
-            self.matched_cost += edge_insertion_cost;
-            
-            
-        # Add the cost of matching of unprocessed nodes to the future approximate cost
-        if len(self.unprocessed_nodes_G1) > 0 and len(self.unprocessed_nodes_G2) > 0: # Consider substituting
-            unmatched_nodes_cost_matrix = subset_cost_matrix(cost_matrix_nodes, self.unprocessed_nodes_G1, self.unprocessed_nodes_G2, G1.number_of_nodes(), G2.number_of_nodes())
-            # Match the edges as per the LAP solution
-            row_ind, col_ind, _ = lapjv(unmatched_nodes_cost_matrix);
-            lap_cost = 0.00
+            # Matched edges of this step, (None means deleted/inserted)
+            edges_G1, edges_G2 = [], []
             for i in range(len(row_ind)):
-                lap_cost += unmatched_nodes_cost_matrix[i, row_ind[i]];
-
-            self.future_approximate_cost += lap_cost;
-            
-        elif len(self.unprocessed_nodes_G1) > 0: # only deletion possible
-            node_deletion_cost = 0.0;
-            for node in self.unprocessed_nodes_G1:
-                node_deletion_cost += cost_matrix_nodes[node, G2.number_of_nodes()+node];
-
-            self.future_approximate_cost += node_deletion_cost;
-            
-        elif len(self.unprocessed_nodes_G2) > 0: # only insertion possible
-            node_insertion_cost = 0.0;
-            for node in self.unprocessed_nodes_G2:
-                node_insertion_cost += cost_matrix_nodes[G1.number_of_nodes()+node, node];
-
-            self.future_approximate_cost += node_insertion_cost;
+                if i < m:
+                    edges_G1.append(incident_edges_G1[i]);
+                    edges_G2.append(incident_edges_G2[row_ind[i]] if row_ind[i] < n else None);
+                elif row_ind[i] < n:
+                    edges_G1.append(None);
+                    edges_G2.append(incident_edges_G2[row_ind[i]]);
+            self.edges_G1, self.edges_G2 = tuple(edges_G1), tuple(edges_G2)
+            
+        elif m > 0: #only deletion possible
+            self.matched_cost += cost_matrix_edges[incident_edges_G1, num_G2_edges + incident_edges_G1].sum();
+            self.edges_G1, self.edges_G2 = tuple(incident_edges_G1), (None,) * m
+            
+        elif n > 0: #only insertion possible
+            self.matched_cost += cost_matrix_edges[num_G1_edges + incident_edges_G2, incident_edges_G2].sum();
+            self.edges_G1, self.edges_G2 = (None,) * n, tuple(incident_edges_G2)
         
+        else:
+            self.edges_G1, self.edges_G2 = (), ()
+            
+        # Add the cost of matching of unprocessed nodes to the future approximate cost
+        unprocessed_nodes_G1 = np.flatnonzero(self.unprocessed_nodes_G1)
+        unprocessed_nodes_G2 = np.flatnonzero(self.unprocessed_nodes_G2)
+        self.future_approximate_cost += _assignment_cost_bound(cost_matrix_nodes, unprocessed_nodes_G1, unprocessed_nodes_G2, num_G1_nodes, num_G2_nodes)
          
         # Add the cost of LAP matching of unprocessed edges to the future approximate cost
-        self.unprocessed_edges_G1 = [_ for _ in parent_unprocessed_edges_G1 if _ not in incident_edges_G1];
-        self.unprocessed_edges_G2 = [_ for _ in parent_unprocessed_edges_G2 if _ not in incident_edges_G2];
-        if len(self.unprocessed_edges_G1) > 0 and len(self.unprocessed_edges_G2) > 0: # Consider substituting
-            unmatched_edges_cost_matrix = subset_cost_matrix(cost_matrix_edges, self.unprocessed_edges_G1, self.unprocessed_edges_G2, G1.number_of_edges(), G2.number_of_edges())
-            # Match the edges as per the LAP solution
-            row_ind, col_ind, _ = lapjv(unmatched_edges_cost_matrix);
-            lap_cost = 0.00
-            for i in range(len(row_ind)):
-                lap_cost += unmatched_edges_cost_matrix[i, row_ind[i]];
-
-            self.future_approximate_cost += lap_cost;
-            
-        elif len(self.unprocessed_edges_G1) > 0: # only deletion possible
-            edge_deletion_cost = 0.0;
-            for edge in self.unprocessed_edges_G1:
-                edge_deletion_cost += cost_matrix_edges[edge, G2.number_of_edges()+edge];
-
-            self.future_approximate_cost += edge_deletion_cost;
-            
-        elif len(self.unprocessed_edges_G2) > 0: # only insertion possible
-            edge_insertion_cost = 0.0;
-            for edge in self.unprocessed_edges_G2:
-                edge_insertion_cost += cost_matrix_edges[G1.number_of_edges()+edge, edge];
-
-            self.future_approximate_cost += edge_insertion_cost;
+        self.unprocessed_edges_G1 = parent.unprocessed_edges_G1.copy();
+        self.unprocessed_edges_G2 = parent.unprocessed_edges_G2.copy();
+        self.unprocessed_edges_G1[incident_edges_G1] = False;
+        self.unprocessed_edges_G2[incident_edges_G2] = False;
+        unprocessed_edges_G1 = np.flatnonzero(self.unprocessed_edges_G1)
+        unprocessed_edges_G2 = np.flatnonzero(self.unprocessed_edges_G2)
+        self.future_approximate_cost += _assignment_cost_bound(cost_matrix_edges, unprocessed_edges_G1, unprocessed_edges_G2, num_G1_edges, num_G2_edges)
+        
+        self.num_unprocessed = len(unprocessed_nodes_G1) + len(unprocessed_nodes_G2) + len(unprocessed_edges_G1) + len(unprocessed_edges_G2)
+    
+    @classmethod
+    def root(cls, G1, G2):
+        # Empty matching: every node and edge is unprocessed
+        node = cls.__new__(cls)
+        node.parent = None;
+        node.depth = 0;
+        node.node_G1 = node.node_G2 = None;
+        node.edges_G1 = node.edges_G2 = ();
+        node.matched_cost = 0.0;
+        node.future_approximate_cost = 0.0;
+        node.unprocessed_nodes_G1 = np.ones(G1.number_of_nodes(), dtype=bool);
+        node.unprocessed_nodes_G2 = np.ones(G2.number_of_nodes(), dtype=bool);
+        node.unprocessed_edges_G1 = np.ones(G1.number_of_edges(), dtype=bool);
+        node.unprocessed_edges_G2 = np.ones(G2.number_of_edges(), dtype=bool);
+        node.num_unprocessed = G1.number_of_nodes() + G2.number_of_nodes() + G1.number_of_edges() + G2.number_of_edges()
+        return node
+    
+    def path(self):
+        # tree-nodes from the first match down to this one
+        nodes = []
+        node = self
+        while node.depth > 0:
+            nodes.append(node)
+            node = node.parent
+        return nodes[::-1]
+    
+    @property
+    def matched_nodes(self):
+        path = self.path()
+        return ([node.node_G1 for node in path], [node.node_G2 for node in path])
+    
+    @property
+    def matched_edges(self):
+        path = self.path()
+        return ([e for node in path for e in node.edges_G1], [e for node in path for e in node.edges_G2])
+    
+    def matched_positions(self, num_G1_nodes, num_G2_nodes):
+        # position of every node in matched_nodes, -1 if the node is not matched yet
+        positions_G1 = np.full(num_G1_nodes, -1, dtype=int)
+        positions_G2 = np.full(num_G2_nodes, -1, dtype=int)
+        for k, node in enumerate(self.path()):
+            if node.node_G1 is not None:
+                positions_G1[node.node_G1] = k
+            if node.node_G2 is not None:
+                positions_G2[node.node_G2] = k
+        return positions_G1, positions_G2
         
     # For heap insertion order
     def __lt__(self, other):
@@ -291,10 +288,7 @@ class search_tree_node:
         elif abs(self.matched_cost - other.matched_cost) > EPSILON:
             return other.matched_cost < self.matched_cost; #matched cost is closer to reality
         else:
-            return (len(self.unprocessed_nodes_G1)+len(self.unprocessed_nodes_G2)+\
-                    len(self.unprocessed_edges_G1)+len(self.unprocessed_edges_G2)) < \
-                    (len(other.unprocessed_nodes_G1)+len(other.unprocessed_nodes_G2)+\
-                    len(other.unprocessed_edges_G1)+len(other.unprocessed_edges_G2));
+            return self.num_unprocessed < other.num_unprocessed;
         
 def edit_cost_from_node_matching(G1, G2, cost_matrix_nodes, cost_matrix_edges, node_matching,start_time):
     
@@ -320,18 +314,21 @@ def edit_cost_from_node_matching(G1, G2, cost_matrix_nodes, cost_matrix_edges, n
     if (time.time() - start_time) >= Time_Limit:
         print("processing Exceed time limit, ",Time_Limit," seconds");
         return 100000;
+    positions_G1 = np.full(G1.number_of_nodes(), -1, dtype=int)
+    positions_G2 = np.full(G2.number_of_nodes(), -1, dtype=int)
     for i in range(len(matched_nodes[0])):
         if (time.time() - start_time) >= Time_Limit:
             print("processing Exceed time limit, ",Time_Limit," seconds");
             return 100000;
+        step, node_G1, node_G2 = i, matched_nodes[0][i], matched_nodes[1][i];
         # Add the cost of matching edges
         incident_edges_G1 = [];
         if matched_nodes[0][i] is not None: # Find the edges with one end-point as node_G1 and other in matched nodes or node_G1
-            incident_edges_G1, index_G1, direction_G1 = get_edges_to_match(G1, matched_nodes[0][i], matched_nodes[0][:i])
+            incident_edges_G1, index_G1, direction_G1 = get_edges_to_match(G1, matched_nodes[0][i], positions_G1)
         
         incident_edges_G2 = np.array([]);
         if matched_nodes[1][i] is not None: # Find the edges with one end-point as node_G2 and other in matched nodes or node_G2
-            incident_edges_G2, index_G2, direction_G2 = get_edges_to_match(G2, matched_nodes[1][i], matched_nodes[1][:i])
+            incident_edges_G2, index_G2, direction_G2 = get_edges_to_match(G2, matched_nodes[1][i], positions_G2)
             
         if len(incident_edges_G1) > 0 and len(incident_edges_G2) > 0: # Consider substituting
             matched_edges_cost_matrix = subset_cost_matrix(cost_matrix_edges, incident_edges_G1, incident_edges_G2, G1.number_of_edges(), G2.number_of_edges())
@@ -387,8 +384,71 @@ def edit_cost_from_node_matching(G1, G2, cost_matrix_nodes, cost_matrix_edges, n
             
             matched_cost += edge_insertion_cost;
             
+        if node_G1 is not None:
+            positions_G1[node_G1] = step;
+        if node_G2 is not None:
+            positions_G2[node_G2] = step;
+            
     return matched_cost;
 
+_graph_structure_cache = weakref.WeakKeyDictionary()
+
+def _graph_structure(G):
+    # (src, dst, self_edges, incoming_edges, outgoing_edges) of G, computed once per graph
+    try:
+        return _graph_structure_cache[G]
+    except (KeyError, TypeError):
+        pass
+    num_nodes = G.number_of_nodes()
+    src, dst = G.edges()
+    src = src.numpy()
+    dst = dst.numpy()
+    eids = np.arange(len(src))
+    loop = src == dst
+
+    def group(keys, ids):
+        # ids are ascending, a stable sort keeps them sorted inside every group
+        order = np.argsort(keys, kind="stable")
+        counts = np.bincount(keys, minlength=num_nodes)
+        return np.split(ids[order], np.cumsum(counts)[:-1])
+
+    structure = (src, dst, group(src[loop], eids[loop]), group(dst[~loop], eids[~loop]), group(src[~loop], eids[~loop]))
+    try:
+        _graph_structure_cache[G] = structure
+    except TypeError:
+        pass
+    return structure
+
+def incident_edge_lists(G):
+    """Returns (self_edges, incoming_edges, outgoing_edges) of G: for every node, the sorted ids of its
+    self-loops, of its incoming edges and of its outgoing edges (both without self-loops).
+    The lists only depend on G, so they are computed once per graph and reused for every pair it takes part in.
+    """
+    return _graph_structure(G)[2:]
+
+def _edge_classes(cost_rows):
+    # edges whose substitution costs and deletion/insertion cost are identical are interchangeable
+    # in a local edge assignment
+    if len(cost_rows) == 0:
+        return np.zeros(0, dtype=int)
+    _, classes = np.unique(cost_rows, axis=0, return_inverse=True)
+    return classes.reshape(-1)
+
+def _node_signatures(edge_lists, edge_classes):
+    # group nodes whose self/incoming/outgoing edges have the same multiset of edge classes;
+    # returns the group id of every node and one representative node per group
+    groups = {}
+    group_ids = np.empty(len(edge_lists[0]), dtype=int)
+    representatives = []
+    for i, edges in enumerate(zip(*edge_lists)):
+        signature = tuple(tuple(np.sort(edge_classes[e]).tolist()) for e in edges)
+        group_id = groups.get(signature)
+        if group_id is None:
+            group_id = groups[signature] = len(representatives)
+            representatives.append(i)
+        group_ids[i] = group_id
+    return group_ids, representatives
+
 def contextual_cost_matrix_construction(G1, G2, 
                             node_substitution_cost, edge_substitution_cost, 
                             G1_node_deletion_cost, G1_edge_deletion_cost,
@@ -400,94 +460,58 @@ def contextual_cost_matrix_construction(G1, G2,
     num_G1_nodes = G1.number_of_nodes()
     num_G2_nodes = G2.number_of_nodes()
     
-    num_G1_edges = G1.number_of_edges()
-    num_G2_edges = G2.number_of_edges()
-    
     cost_upper_bound = 2*(node_substitution_cost.sum() + G1_node_deletion_cost.sum() + G2_node_insertion_cost.sum() + 1)
     cost_matrix = np.zeros((num_G1_nodes + num_G2_nodes, num_G1_nodes + num_G2_nodes), dtype=float)
     
-    
     cost_matrix[0:num_G1_nodes, 0:num_G2_nodes] = node_substitution_cost;
-    cost_matrix[0:num_G1_nodes, num_G2_nodes:num_G2_nodes + num_G1_nodes] = np.array([G1_node_deletion_cost[i] if i == j \
-                                                                     else cost_upper_bound\
-                                                                     for i in range(num_G1_nodes) \
-                                                                     for j in range(num_G1_nodes)]).reshape(num_G1_nodes, num_G1_nodes);
-    cost_matrix[num_G1_nodes:num_G1_nodes + num_G2_nodes, 0:num_G2_nodes] = np.array([G2_node_insertion_cost[i] if i == j \
-                                                                     else cost_upper_bound\
-                                                                     for i in range(num_G2_nodes) \
-                                                                     for j in range(num_G2_nodes)]).reshape(num_G2_nodes, num_G2_nodes);
-    
-    
-    self_edge_list_G1 = [np.array([], dtype=int)]*num_G1_nodes;
-    self_edge_list_G2 = [np.array([], dtype=int)]*num_G2_nodes;
-    incoming_edges_G1 = [np.array([], dtype=int)]*num_G1_nodes;
-    incoming_edges_G2 = [np.array([], dtype=int)]*num_G2_nodes;
-    outgoing_edges_G1 = [np.array([], dtype=int)]*num_G1_nodes;
-    outgoing_edges_G2 = [np.array([], dtype=int)]*num_G2_nodes;
+    cost_matrix[0:num_G1_nodes, num_G2_nodes:num_G2_nodes + num_G1_nodes] = diagonal_block(G1_node_deletion_cost, cost_upper_bound);
+    cost_matrix[num_G1_nodes:num_G1_nodes + num_G2_nodes, 0:num_G2_nodes] = diagonal_block(G2_node_insertion_cost, cost_upper_bound);
     
-    for i in range(num_G1_nodes):
-        if G1.has_edges_between(i, i):
-            _,_,edge_ids = G1.edge_ids(i, i,return_uv=True);
-            self_edge_list_G1[i] = sorted(edge_ids.numpy());
-        incoming_edges_G1[i] = G1.in_edges([i], 'eid').numpy();
-        incoming_edges_G1[i] = np.setdiff1d(incoming_edges_G1[i], self_edge_list_G1[i]);
-        outgoing_edges_G1[i] = G1.out_edges([i], 'eid').numpy();
-        outgoing_edges_G1[i] = np.setdiff1d(outgoing_edges_G1[i], self_edge_list_G1[i]);
+    self_edge_list_G1, incoming_edges_G1, outgoing_edges_G1 = incident_edge_lists(G1)
+    self_edge_list_G2, incoming_edges_G2, outgoing_edges_G2 = incident_edge_lists(G2)
+    
+    selected_deletion_G1 = [G1_edge_deletion_cost[np.concatenate((self_edge_list_G1[i], incoming_edges_G1[i], outgoing_edges_G1[i]))] for i in range(num_G1_nodes)];
+    selected_insertion_G2 = [G2_edge_insertion_cost[np.concatenate((self_edge_list_G2[i], incoming_edges_G2[i], outgoing_edges_G2[i]))] for i in range(num_G2_nodes)];
+    
+    # The local edge assignment of (i, j) only depends on the costs of the edges around i and j,
+    # so nodes with the same incident-edge signature share one LAP solve.
+    G1_classes = _edge_classes(np.column_stack((edge_substitution_cost, G1_edge_deletion_cost)))
+    G2_classes = _edge_classes(np.column_stack((edge_substitution_cost.T, G2_edge_insertion_cost)))
+    G1_groups, G1_representatives = _node_signatures((self_edge_list_G1, incoming_edges_G1, outgoing_edges_G1), G1_classes)
+    G2_groups, G2_representatives = _node_signatures((self_edge_list_G2, incoming_edges_G2, outgoing_edges_G2), G2_classes)
     if (time.time() - start_time) >= Time_Limit:
         print("processing Exceed time limit, ",Time_Limit," seconds");
         return 100000;
-    for i in range(num_G2_nodes):
-        if G2.has_edges_between(i, i):
-            _,_,edge_ids = G2.edge_ids(i, i,return_uv=True);
-            self_edge_list_G2[i] = sorted(edge_ids.numpy());
-        incoming_edges_G2[i] = G2.in_edges([i], 'eid').numpy();
-        incoming_edges_G2[i] = np.setdiff1d(incoming_edges_G2[i], self_edge_list_G2[i]);
-        outgoing_edges_G2[i] = G2.out_edges([i], 'eid').numpy();
-        outgoing_edges_G2[i] = np.setdiff1d(outgoing_edges_G2[i], self_edge_list_G2[i]);
-        
-    selected_deletion_G1 = [G1_edge_deletion_cost[np.concatenate((self_edge_list_G1[i], incoming_edges_G1[i], outgoing_edges_G1[i]))] for i in range(G1.number_of_nodes())];
-    selected_insertion_G2 = [G2_edge_insertion_cost[np.concatenate((self_edge_list_G2[i], incoming_edges_G2[i], outgoing_edges_G2[i]))] for i in range(G2.number_of_nodes())];
-    if (time.time() - start_time) >= Time_Limit:
-        print("processing Exceed time limit, ",Time_Limit," seconds");
-        return 100000;  
-        
     
     # Add the cost of edge edition which are dependent of a node (see this as the cost associated with a substructure)    
-    for i in range(num_G1_nodes):
+    group_lap_cost = np.zeros((len(G1_representatives), len(G2_representatives)), dtype=float)
+    for gi, i in enumerate(G1_representatives):
         if (time.time() - start_time) >= Time_Limit:
             print("processing Exceed time limit, ",Time_Limit," seconds");
             return 100000;
-        for j in range(num_G2_nodes):
-            m = len(self_edge_list_G1[i])+len(incoming_edges_G1[i])+len(outgoing_edges_G1[i]);
-            n = len(self_edge_list_G2[j])+len(incoming_edges_G2[j])+len(outgoing_edges_G2[j]);
-                
-            matrix_dim = m + n;
-            
-            if matrix_dim == 0:
+        s1, in1, out1 = len(self_edge_list_G1[i]), len(incoming_edges_G1[i]), len(outgoing_edges_G1[i])
+        m = s1 + in1 + out1
+        for gj, j in enumerate(G2_representatives):
+            s2, in2, out2 = len(self_edge_list_G2[j]), len(incoming_edges_G2[j]), len(outgoing_edges_G2[j])
+            n = s2 + in2 + out2
+            if m + n == 0:
                 continue;
-            temp_edge_cost_matrix = np.empty((matrix_dim, matrix_dim));
-            temp_edge_cost_matrix.fill(cost_upper_bound);
-            
-            temp_edge_cost_matrix[:len(self_edge_list_G1[i]),:len(self_edge_list_G2[j])] = edge_substitution_cost[self_edge_list_G1[i],:][:,self_edge_list_G2[j]];
-            temp_edge_cost_matrix[len(self_edge_list_G1[i]):len(self_edge_list_G1[i])+len(incoming_edges_G1[i]),len(self_edge_list_G2[j]):len(self_edge_list_G2[j])+len(incoming_edges_G2[j])] = edge_substitution_cost[incoming_edges_G1[i],:][:, incoming_edges_G2[j]];
-            temp_edge_cost_matrix[len(self_edge_list_G1[i])+len(incoming_edges_G1[i]):m,len(self_edge_list_G2[j])+len(incoming_edges_G2[j]):n] = edge_substitution_cost[outgoing_edges_G1[i],:][:, outgoing_edges_G2[j]];
-            
+            temp_edge_cost_matrix = np.full((m + n, m + n), cost_upper_bound, dtype=float)
+            temp_edge_cost_matrix[:s1, :s2] = edge_substitution_cost[np.ix_(self_edge_list_G1[i], self_edge_list_G2[j])]
+            temp_edge_cost_matrix[s1:s1+in1, s2:s2+in2] = edge_substitution_cost[np.ix_(incoming_edges_G1[i], incoming_edges_G2[j])]
+            temp_edge_cost_matrix[s1+in1:m, s2+in2:n] = edge_substitution_cost[np.ix_(outgoing_edges_G1[i], outgoing_edges_G2[j])]
             np.fill_diagonal(temp_edge_cost_matrix[:m, n:], selected_deletion_G1[i]);
             np.fill_diagonal(temp_edge_cost_matrix[m:, :n], selected_insertion_G2[j]);
-            
-            temp_edge_cost_matrix[m:, n:].fill(0);
+            temp_edge_cost_matrix[m:, n:] = 0
             row_ind, col_ind, _ = lapjv(temp_edge_cost_matrix);
-            lap_cost = 0.00
-            for k in range(len(row_ind)):
-                lap_cost += temp_edge_cost_matrix[k, row_ind[k]];
-                
-            cost_matrix[i,j] += lap_cost;
-            
-    for i in range(num_G1_nodes):
-        cost_matrix[i,num_G2_nodes+i] += selected_deletion_G1[i].sum()
-            
-    for i in range(num_G2_nodes):
-        cost_matrix[num_G1_nodes+i,i] += selected_insertion_G2[i].sum()
+            group_lap_cost[gi, gj] = temp_edge_cost_matrix[np.arange(m + n), row_ind].sum()
+    
+    cost_matrix[0:num_G1_nodes, 0:num_G2_nodes] += group_lap_cost[np.ix_(G1_groups, G2_groups)]
+    
+    G1_deletion = np.array([c.sum() for c in selected_deletion_G1], dtype=float)
+    G2_insertion = np.array([c.sum() for c in selected_insertion_G2], dtype=float)
+    cost_matrix[np.arange(num_G1_nodes), num_G2_nodes + np.arange(num_G1_nodes)] += G1_deletion
+    cost_matrix[num_G1_nodes + np.arange(num_G2_nodes), np.arange(num_G2_nodes)] += G2_insertion
         
     return cost_matrix,start_time;
             
@@ -506,32 +530,8 @@ def hausdorff_matching(G1, G2,
     num_G1_edges = G1.number_of_edges()
     num_G2_edges = G2.number_of_edges()
     
-    self_edge_list_G1 = [np.array([], dtype=int)]*num_G1_nodes;
-    self_edge_list_G2 = [np.array([], dtype=int)]*num_G2_nodes;
-    incoming_edges_G1 = [np.array([], dtype=int)]*num_G1_nodes;
-    incoming_edges_G2 = [np.array([], dtype=int)]*num_G2_nodes;
-    outgoing_edges_G1 = [np.array([], dtype=int)]*num_G1_nodes;
-    outgoing_edges_G2 = [np.array([], dtype=int)]*num_G2_nodes;
-    
-    for i in range(num_G1_nodes):
-        if G1.has_edges_between(i, i):
-            _,_,edge_ids = G1.edge_ids(i, i,return_uv=True);
-            self_edge_list_G1[i] = sorted(edge_ids.numpy());
-        incoming_edges_G1[i] = G1.in_edges([i], 'eid').numpy();
-        incoming_edges_G1[i] = np.setdiff1d(incoming_edges_G1[i], self_edge_list_G1[i]);
-        outgoing_edges_G1[i] = G1.out_edges([i], 'eid').numpy();
-        outgoing_edges_G1[i] = np.setdiff1d(outgoing_edges_G1[i], self_edge_list_G1[i]);
-    if (time.time() - start_time) >= Time_Limit:
-        print("processing Exceed time limit, ",Time_Limit," seconds");
-        return 100000;
-    for i in range(num_G2_nodes):
-        if G2.has_edges_between(i, i):
-            _,_,edge_ids = G2.edge_ids(i, i,return_uv=True);
-            self_edge_list_G2[i] = sorted(edge_ids.numpy());
-        incoming_edges_G2[i] = G2.in_edges([i], 'eid').numpy();
-        incoming_edges_G2[i] = np.setdiff1d(incoming_edges_G2[i], self_edge_list_G2[i]);
-        outgoing_edges_G2[i] = G2.out_edges([i], 'eid').numpy();
-        outgoing_edges_G2[i] = np.setdiff1d(outgoing_edges_G2[i], self_edge_list_G2[i]);
+    self_edge_list_G1, incoming_edges_G1, outgoing_edges_G1 = incident_edge_lists(G1)
+    self_edge_list_G2, incoming_edges_G2, outgoing_edges_G2 = incident_edge_lists(G2)
     if (time.time() - start_time) >= Time_Limit:
         print("processing Exceed time limit, ",Time_Limit," seconds");
         return 100000;    
@@ -611,33 +611,41 @@ def hausdorff_matching(G1, G2,
     return graph_hausdorff_cost;
     
     
-def a_star_search(G1, G2, cost_matrix_nodes, cost_matrix_edges, max_beam_size):
+def a_star_search(G1, G2, cost_matrix_nodes, cost_matrix_edges, max_beam_size, stats=None):
+    # stats (optional dict) receives the number of expanded and generated tree-nodes
     start_time = time.time();
-    # A-star traversal
+    num_G1_nodes, num_G2_nodes = G1.number_of_nodes(), G2.number_of_nodes()
+    if stats is not None:
+        stats.setdefault("expanded", 0)
+        stats.setdefault("generated", 0)
+    
+    def expand(parent_tree_node):
+        # Children of a tree-node: match the first unprocessed node of G1 with all possibilities
+        # (each unprocessed node of G2, and deletion), or insert the remaining nodes of G2
+        matched_positions = parent_tree_node.matched_positions(num_G1_nodes, num_G2_nodes)
+        unprocessed_nodes_G1 = np.flatnonzero(parent_tree_node.unprocessed_nodes_G1)
+        unprocessed_nodes_G2 = np.flatnonzero(parent_tree_node.unprocessed_nodes_G2).tolist()
+        children = []
+        if len(unprocessed_nodes_G1) > 0:
+            node_G1 = int(unprocessed_nodes_G1[0])
+            for node_G2 in unprocessed_nodes_G2 + [None]:
+                children.append(search_tree_node(G1, G2, parent_tree_node, node_G1, node_G2, matched_positions,
+                                                 cost_matrix_nodes, cost_matrix_edges));
+        else:
+            for node_G2 in unprocessed_nodes_G2:
+                if (time.time() - start_time) >= Time_Limit:
+                    return None;
+                children.append(search_tree_node(G1, G2, parent_tree_node, None, node_G2, matched_positions,
+                                                 cost_matrix_nodes, cost_matrix_edges));
+        if stats is not None:
+            stats["expanded"] += 1
+            stats["generated"] += len(children)
+        return children
+    
+    # A-star traversal, the open-list is implemented as a heap
     open_list = [];
-    # Create first nodes in the A-star search tree, matching node 0 of G1 with all possibilities (each node of G2, and deletion)
-    matched_cost = 0.0;
-    matched_nodes = ([], []); # No nodes matched in the beginning
-    matched_edges = ([], []); # No edges matched in the beginning
-    unprocessed_nodes_G1 = [i for i in range(G1.number_of_nodes())] # No nodes matched in the beginning
-    unprocessed_nodes_G2 = [i for i in range(G2.number_of_nodes())] # No nodes matched in the beginning
-    unprocessed_edges_G1 = [i for i in range(G1.number_of_edges())] # No edges matched in the beginning
-    unprocessed_edges_G2 = [i for i in range(G2.number_of_edges())] # No edges matched in the beginning
-    
-    for i in range(len(unprocessed_nodes_G2)):
-        tree_node = search_tree_node(G1, G2, matched_cost, matched_nodes, matched_edges, unprocessed_nodes_G1[0], unprocessed_nodes_G2[i], \
-                         unprocessed_nodes_G1, unprocessed_nodes_G2, unprocessed_edges_G1, unprocessed_edges_G2, \
-                                     cost_matrix_nodes, cost_matrix_edges);
-        # Insert into open-list, implemented as a heap
-        
+    for tree_node in expand(search_tree_node.root(G1, G2)):
         heappush(open_list, tree_node)
-    
-    # Consider node deletion
-    tree_node = search_tree_node(G1, G2, matched_cost, matched_nodes, matched_edges, unprocessed_nodes_G1[0], None, \
-                     unprocessed_nodes_G1, unprocessed_nodes_G2, unprocessed_edges_G1, unprocessed_edges_G2, \
-                                 cost_matrix_nodes, cost_matrix_edges);
-    # Insert into open-list, implemented as a heap
-    heappush(open_list, tree_node)
     if (time.time() - start_time) >= Time_Limit:
         print("processing Exceed time limit, ",Time_Limit," seconds");
         return 100000;
@@ -649,41 +657,14 @@ def a_star_search(G1, G2, cost_matrix_nodes, cost_matrix_edges, max_beam_size):
         # TODO: Create a node that processes multi node insertion deletion in one search node, 
         # as opposed in multiple search nodes here 
         parent_tree_node = heappop(open_list);
-        matched_cost = parent_tree_node.matched_cost;
-        matched_nodes = parent_tree_node.matched_nodes;
-        matched_edges = parent_tree_node.matched_edges;
-        unprocessed_nodes_G1 = parent_tree_node.unprocessed_nodes_G1;
-        unprocessed_nodes_G2 = parent_tree_node.unprocessed_nodes_G2;
-        unprocessed_edges_G1 = parent_tree_node.unprocessed_edges_G1;
-        unprocessed_edges_G2 = parent_tree_node.unprocessed_edges_G2;
-        
-        if len(unprocessed_nodes_G1) == 0 and len(unprocessed_nodes_G2) == 0:
-            return matched_cost;
-        elif len(unprocessed_nodes_G1) > 0:
-            for i in range(len(unprocessed_nodes_G2)):
-                tree_node = search_tree_node(G1, G2, matched_cost, matched_nodes, matched_edges, unprocessed_nodes_G1[0], unprocessed_nodes_G2[i], \
-                                 unprocessed_nodes_G1, unprocessed_nodes_G2, unprocessed_edges_G1, unprocessed_edges_G2, \
-                                             cost_matrix_nodes, cost_matrix_edges);
-                # Insert into open-list, implemented as a heap
-                heappush(open_list, tree_node)
-
-            # Consider node deletion
-            tree_node = search_tree_node(G1, G2, matched_cost, matched_nodes, matched_edges, unprocessed_nodes_G1[0], None, \
-                             unprocessed_nodes_G1, unprocessed_nodes_G2, unprocessed_edges_G1, unprocessed_edges_G2, \
-                                         cost_matrix_nodes, cost_matrix_edges);
-            # Insert into open-list, implemented as a heap
+        if not parent_tree_node.unprocessed_nodes_G1.any() and not parent_tree_node.unprocessed_nodes_G2.any():
+            return parent_tree_node.matched_cost;
+        children = expand(parent_tree_node)
+        if children is None:
+            print("processing Exceed time limit, ",Time_Limit," seconds");
+            return 100000;
+        for tree_node in children:
             heappush(open_list, tree_node)
-        
-        elif len(unprocessed_nodes_G2) > 0:
-            for i in range(len(unprocessed_nodes_G2)):
-                if (time.time() - start_time) >= Time_Limit:
-                    print("processing Exceed time limit, ",Time_Limit," seconds");
-                    return 100000;  
-                tree_node = search_tree_node(G1, G2, matched_cost, matched_nodes, matched_edges, None, unprocessed_nodes_G2[i], \
-                                 unprocessed_nodes_G1, unprocessed_nodes_G2, unprocessed_edges_G1, unprocessed_edges_G2, \
-                                             cost_matrix_nodes, cost_matrix_edges);
-                # Insert into open-list, implemented as a heap
-                heappush(open_list, tree_node)
                 
         # Retain the top-k elements in open-list iff algorithm is beam
         if max_beam_size > 0 and len(open_list) > max_beam_size:
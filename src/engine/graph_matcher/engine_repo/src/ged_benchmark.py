@@ -0,0 +1,91 @@
+import argparse
+import json
+import multiprocessing
+import resource
+import time
+
+import numpy as np
+import torch
+
+
+# Micro-benchmark of the A*/beam GED search: tree-nodes expanded per second and
+# peak RSS per configuration. Every configuration runs in a fresh (spawned)
+# process so ru_maxrss is not inflated by the previous ones.
+
+def random_graphs(num_graphs, num_nodes, num_edges, seed=0):
+    import dgl
+    rng = np.random.default_rng(seed)
+    graphs = []
+    for _ in range(num_graphs):
+        # a ring keeps every node connected, the rest of the edges are random
+        src = np.concatenate((np.arange(num_nodes), rng.integers(0, num_nodes, num_edges - num_nodes)))
+        dst = np.concatenate(((np.arange(num_nodes) + 1) % num_nodes, rng.integers(0, num_nodes, num_edges - num_nodes)))
+        graphs.append(dgl.graph((torch.from_numpy(src), torch.from_numpy(dst)), num_nodes=num_nodes))
+    return graphs
+
+
+def load_graphs(args):
+    if args.root_path:
+        graphs = torch.load(args.root_path + "/raw/dgl_training_dataset.pt")
+        return graphs[:args.num_graphs]
+    return random_graphs(args.num_graphs, args.num_nodes, args.num_edges, args.seed)
+
+
+def run_configuration(args, algorithm, max_beam_size):
+    from ged import a_star_search, validate_cost_functions, construct_cost_functions
+    graphs = load_graphs(args)
+    stats = {"expanded": 0, "generated": 0}
+    distances = []
+    start = time.perf_counter()
+    for i in range(len(graphs)):
+        for j in range(i + 1, len(graphs)):
+            costs = validate_cost_functions(graphs[i], graphs[j])
+            cost_matrix_nodes, cost_matrix_edges = construct_cost_functions(graphs[i], graphs[j], *costs)
+            distances.append(a_star_search(graphs[i], graphs[j], cost_matrix_nodes, cost_matrix_edges,
+                                           max_beam_size if algorithm == "beam" else -1, stats))
+    seconds = time.perf_counter() - start
+    return {
+        "algorithm": algorithm,
+        "max_beam_size": max_beam_size if algorithm == "beam" else None,
+        "pairs": len(distances),
+        "seconds": seconds,
+        "expanded": stats["expanded"],
+        "generated": stats["generated"],
+        "expanded_per_second": stats["expanded"] / seconds if seconds else None,
+        "generated_per_second": stats["generated"] / seconds if seconds else None,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "timeouts": sum(1 for d in distances if d == 100000),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark A*/beam GED search tree expansion")
+    parser.add_argument('--root-path', help='Experiment path, benchmark its dgl_training_dataset.pt graphs instead of random graphs')
+    parser.add_argument('--num-graphs', type=int, default=4, help='Graphs to compare pairwise')
+    parser.add_argument('--num-nodes', type=int, default=50, help='Nodes per random graph')
+    parser.add_argument('--num-edges', type=int, default=100, help='Edges per random graph')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--beam-sizes', default="2,10", help='Comma-separated beam sizes')
+    parser.add_argument('--astar', action='store_true', help='Also run exact A* (only feasible for small graphs)')
+    parser.add_argument('--output', help='Write results as JSON')
+    args = parser.parse_args()
+
+    configurations = [("beam", int(b)) for b in args.beam_sizes.split(",") if b]
+    if args.astar:
+        configurations.append(("astar", -1))
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for algorithm, max_beam_size in configurations:
+        with ctx.Pool(1) as pool:
+            result = pool.apply(run_configuration, (args, algorithm, max_beam_size))
+        results.append(result)
+        print("%-6s beam=%-5s pairs=%d expanded=%d (%.0f/s) generated=%d (%.0f/s) peak RSS=%.1f MB timeouts=%d" % (
+            algorithm, result["max_beam_size"], result["pairs"], result["expanded"], result["expanded_per_second"] or 0,
+            result["generated"], result["generated_per_second"] or 0, result["peak_rss_mb"], result["timeouts"]))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+import glob
+import os
+import time
+from multiprocessing import Pool
+
+import numpy as np
+import torch
+
+from ged import graph_edit_distance
+
+# Parallel, resumable GED matrix computation.
+#
+# Pairs are split into small row-local blocks that a process pool pulls one
+# at a time (imap_unordered with chunksize=1, so idle workers keep stealing
+# the next block instead of waiting on a static partition). Every finished
+# block is appended to the worker's shard file as fixed-size records
+# (row, col, value, algorithm); a restart reads all shards and only
+# schedules pairs that have no record yet. Pairs where every algorithm
+# failed are recorded too (value=inf, algorithm=failed), so they are not
+# retried unless --retry-failed is given.
+#
+# shard-*.ged hold final values (every algorithm, or a refined pair);
+# bound-*.ged the Hausdorff pass of strategy="cheap-first". A pair's value in
+# the matrix is the lowest of its records. Rows finished by the original
+# compute_ged_for_training.py (ged_samples/ged_<i>.pt) are imported once into
+# shard-legacy.ged.
+
+GED_FAILED = 100000
+ALGORITHMS = ("hausdorff", "bipartite", "beam")
+ALGO_LEGACY = 254
+ALGO_FAILED = 255
+RECORD = np.dtype([("row", "<i4"), ("col", "<i4"), ("value", "<f4"), ("algo", "u1")])
+SHARD_GLOB = "shard-*.ged"
+BOUND_GLOB = "bound-*.ged"
+LEGACY_SHARD = "shard-legacy.ged"
+LEGACY_GLOB = "ged_*.pt"
+
+_graphs = None
+_options = None
+
+
+def shard_dir(root_path):
+    return os.path.join(root_path, "ged_samples")
+
+
+def read_shards(root_path, pattern=SHARD_GLOB):
+    """Returns every record stored under root_path/ged_samples in the shards
+    matching pattern. A torn record at the end of a shard (killed mid-write)
+    is ignored."""
+    parts = []
+    for path in sorted(glob.glob(os.path.join(shard_dir(root_path), pattern))):
+        with open(path, "rb") as f:
+            raw = f.read()
+        usable = len(raw) - len(raw) % RECORD.itemsize
+        if usable:
+            parts.append(np.frombuffer(raw[:usable], dtype=RECORD))
+    if not parts:
+        return np.empty(0, dtype=RECORD)
+    return np.concatenate(parts)
+
+
+def row_columns(i, n_training):
+    """Columns computed for row i. Training pairs are symmetric, so only
+    j >= i is computed; testing graphs are compared with every training
+    graph."""
+    if i < n_training:
+        return np.arange(i, n_training)
+    return np.arange(n_training)
+
+
+def pair_rows(n_training, n_dataset):
+    """Yields (row, cols) for every pair to compute."""
+    for i in range(n_dataset):
+        yield i, row_columns(i, n_training)
+
+
+def import_legacy_samples(root_path, n_training, n_dataset):
+    """
+    Records for the rows the original compute_ged_for_training.py finished
+    (ged_<i>.pt: an n x n matrix with row i filled in), written once to
+    shard-legacy.ged. Its values are the minimum of every algorithm, as with
+    strategy="all"; pairs of a stored row left at inf had failed.
+    :return imported: Number of imported pairs.
+    """
+    target = os.path.join(shard_dir(root_path), LEGACY_SHARD)
+    if os.path.exists(target):
+        return 0
+    parts = []
+    for path in sorted(glob.glob(os.path.join(shard_dir(root_path), LEGACY_GLOB))):
+        index = os.path.basename(path)[len("ged_"):-len(".pt")]
+        if not index.isdigit():
+            continue
+        i = int(index)
+        matrix = torch.load(path)
+        if i >= n_dataset or tuple(matrix.shape) != (n_dataset, n_dataset):
+            print("Warning: not importing", path, "- it does not match the", n_dataset, "graphs of this dataset")
+            continue
+        cols = row_columns(i, n_training)
+        values = matrix[i, torch.from_numpy(cols)].numpy()
+        finite = np.isfinite(values)
+        records = np.empty(len(cols), dtype=RECORD)
+        records["row"] = i
+        records["col"] = cols
+        records["value"] = np.where(finite, values, np.inf)
+        records["algo"] = np.where(finite, ALGO_LEGACY, ALGO_FAILED)
+        parts.append(records)
+    if not parts:
+        return 0
+    records = np.concatenate(parts)
+    tmp_path = target + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(records.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, target)
+    print("Imported", len(records), "pairs of", len(parts), "rows from", LEGACY_GLOB, "files")
+    return len(records)
+
+
+def _pair_mask(records, n_dataset):
+    mask = np.zeros((n_dataset, n_dataset), dtype=bool)
+    if len(records):
+        mask[records["row"], records["col"]] = True
+    return mask
+
+
+def pending_blocks(n_training, n_dataset, records, block_size, retry_failed=False, wanted=None):
+    """(row, cols) blocks of the pairs without a record; with wanted (a boolean
+    n x n mask), only of the pairs it selects."""
+    done = _pair_mask(records if not retry_failed else records[records["algo"] != ALGO_FAILED], n_dataset)
+    blocks = []
+    for i, cols in pair_rows(n_training, n_dataset):
+        cols = cols[~done[i, cols]]
+        if wanted is not None:
+            cols = cols[wanted[i, cols]]
+        for start in range(0, len(cols), block_size):
+            blocks.append((i, cols[start:start + block_size]))
+    return blocks
+
+
+def refine_selection(bounds, n_dataset, refine_margin):
+    """
+    Pairs strategy="cheap-first" refines with bipartite/beam: those whose
+    Hausdorff bound is within refine_margin of the lowest bound of their row
+    (the diagonal aside), and those where Hausdorff failed. Only the bound
+    records are used, so the choice does not depend on the block size or on
+    where an earlier run was interrupted.
+    :return wanted, value: n x n mask of the pairs to refine, and the bounds
+    (GED_FAILED where Hausdorff failed or did not run).
+    """
+    value = np.full((n_dataset, n_dataset), GED_FAILED, dtype=np.float64)
+    ok = bounds[bounds["algo"] != ALGO_FAILED]
+    np.minimum.at(value, (ok["row"], ok["col"]), ok["value"])
+    off_diagonal = value.copy()
+    np.fill_diagonal(off_diagonal, GED_FAILED)
+    row_best = off_diagonal.min(axis=1, keepdims=True)
+    wanted = _pair_mask(bounds, n_dataset) & ((value >= GED_FAILED) | (value <= row_best * (1 + refine_margin)))
+    np.fill_diagonal(wanted, False)
+    return wanted, value
+
+
+def _safe_ged(g1, g2, algorithm, **kwargs):
+    try:
+        distance = graph_edit_distance(g1, g2, algorithm=algorithm, **kwargs)
+    except Exception:
+        print("Error for", algorithm, "algorithm")
+        return GED_FAILED
+    if distance is None:
+        return GED_FAILED
+    return float(distance)
+
+
+def compute_block(row, cols, graphs, algorithms=ALGORITHMS, max_beam_size=2, bounds=None):
+    """Computes GED between graphs[row] and graphs[cols] with every algorithm
+    in algorithms and returns RECORD rows holding the minimum.
+
+    bounds are Hausdorff values already computed for the pairs (GED_FAILED
+    where it failed); they take part in the minimum, which is how
+    strategy="cheap-first" refines a pair with bipartite/beam only.
+    """
+    g1 = graphs[row]
+    out = np.empty(len(cols), dtype=RECORD)
+    out["row"] = row
+    out["col"] = cols
+    if bounds is None:
+        best = np.full(len(cols), GED_FAILED, dtype=np.float64)
+        algo = np.full(len(cols), ALGO_FAILED, dtype=np.uint8)
+    else:
+        best = np.asarray(bounds, dtype=np.float64).copy()
+        algo = np.where(best < GED_FAILED, ALGORITHMS.index("hausdorff"), ALGO_FAILED).astype(np.uint8)
+
+    for k, j in enumerate(cols.tolist()):
+        for algorithm in algorithms:
+            if algorithm == "beam":
+                distance = _safe_ged(g1, graphs[j], "beam", max_beam_size=max_beam_size)
+            else:
+                distance = _safe_ged(g1, graphs[j], algorithm)
+            if distance < best[k]:
+                best[k] = distance
+                algo[k] = ALGORITHMS.index(algorithm)
+
+    failed = best >= GED_FAILED
+    out["value"] = np.where(failed, np.inf, best)
+    out["algo"] = algo
+    return out
+
+
+def _init_worker(graphs, options):
+    global _graphs, _options
+    _graphs = graphs
+    _options = options
+    _options["shard"] = os.path.join(_options["shard_dir"],
+                                     "%s-%d-%d.ged" % (_options["prefix"], os.getpid(), int(time.time())))
+
+
+def _work(block):
+    row, cols, bounds = block
+    start = time.time()
+    records = compute_block(row, cols, _graphs, _options["algorithms"], _options["max_beam_size"], bounds)
+    with open(_options["shard"], "ab") as f:
+        f.write(records.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    return row, len(cols), time.time() - start
+
+
+def run_blocks(graphs, blocks, root_path, prefix, algorithms, n_workers=None, max_beam_size=2):
+    """Computes (row, cols, bounds) blocks on a process pool; records go to
+    ged_samples/<prefix>-<pid>-<time>.ged."""
+    total_pairs = sum(len(cols) for _, cols, _ in blocks)
+    print("Pending pairs (%s):" % "/".join(algorithms), total_pairs, "in", len(blocks), "blocks")
+    if not blocks:
+        return
+    n_workers = n_workers or max(1, os.cpu_count() - 4)
+    options = {
+        "shard_dir": shard_dir(root_path),
+        "prefix": prefix,
+        "algorithms": algorithms,
+        "max_beam_size": max_beam_size,
+    }
+    finished = 0
+    with Pool(n_workers, initializer=_init_worker, initargs=(graphs, options)) as pool:
+        for row, count, seconds in pool.imap_unordered(_work, blocks, chunksize=1):
+            finished += count
+            print("Done row %d (%d pairs) in %.2f seconds, %d/%d" % (row, count, seconds, finished, total_pairs))
+
+
+def assemble_matrix(records, n_dataset, n_training):
+    """Scatters shard records into a dense n x n matrix (inf = not computed),
+    keeping the lowest value of a pair; training pairs are mirrored."""
+    ged_matrix = np.full((n_dataset, n_dataset), np.inf, dtype=np.float32)
+    ok = records[records["algo"] != ALGO_FAILED]
+    np.minimum.at(ged_matrix, (ok["row"], ok["col"]), ok["value"])
+    training = ged_matrix[:n_training, :n_training]
+    ged_matrix[:n_training, :n_training] = np.minimum(training, training.T)
+    return torch.from_numpy(ged_matrix)
+
+
+def normalize_ged_matrix(ged_matrix, num_nodes):
+    num_nodes = torch.as_tensor(num_nodes, dtype=ged_matrix.dtype)
+    return ged_matrix / (0.5 * (num_nodes.unsqueeze(1) + num_nodes.unsqueeze(0)))
+
+
+def compute_ged_matrix(root_path, n_workers=None, block_size=32, strategy="all",
+                       refine_margin=0.1, max_beam_size=2, retry_failed=False):
+    start_running_time = time.time()
+    training_file = os.path.join(root_path, "raw/dgl_training_dataset.pt")
+    testing_file = os.path.join(root_path, "raw/dgl_testing_dataset.pt")
+    training_dataset = torch.load(training_file)
+    testing_dataset = torch.load(testing_file)
+    print("Training Samples", len(training_dataset))
+    print("Testing Samples", len(testing_dataset))
+    graph_data = training_dataset + testing_dataset
+    n_training = len(training_dataset)
+    n_dataset = len(graph_data)
+
+    os.makedirs(shard_dir(root_path), exist_ok=True)
+    import_legacy_samples(root_path, n_training, n_dataset)
+    records = read_shards(root_path)
+    print("Stored pairs:", len(records))
+    if strategy == "all":
+        blocks = pending_blocks(n_training, n_dataset, records, block_size, retry_failed)
+        run_blocks(graph_data, [(i, cols, None) for i, cols in blocks], root_path, "shard", ALGORITHMS,
+                   n_workers, max_beam_size)
+    else:
+        # Hausdorff bound of every pair without a value, then bipartite/beam
+        # on the pairs refine_selection picks from all of the bounds
+        bounds = read_shards(root_path, BOUND_GLOB)
+        blocks = pending_blocks(n_training, n_dataset, np.concatenate((records, bounds)), block_size, retry_failed)
+        run_blocks(graph_data, [(i, cols, None) for i, cols in blocks], root_path, "bound", ("hausdorff",),
+                   n_workers, max_beam_size)
+        bounds = read_shards(root_path, BOUND_GLOB)
+        wanted, value = refine_selection(bounds, n_dataset, refine_margin)
+        print("Refining", int(wanted.sum()), "of", len(bounds), "bounded pairs")
+        blocks = pending_blocks(n_training, n_dataset, records, block_size, retry_failed, wanted)
+        run_blocks(graph_data, [(i, cols, value[i, cols]) for i, cols in blocks], root_path, "shard",
+                   ("bipartite", "beam"), n_workers, max_beam_size)
+    records = np.concatenate((read_shards(root_path), read_shards(root_path, BOUND_GLOB)))
+
+    ged_matrix = assemble_matrix(records, n_dataset, n_training)
+    torch.save(ged_matrix, os.path.join(root_path, "raw/ged_matrix.pt"))
+    print("Training smples: ", (~torch.isinf(ged_matrix[0:n_training])).float().sum())
+    print("Testing Samples: ", (~torch.isinf(ged_matrix[n_training:])).float().sum())
+
+    print("Normalize GED matrix")
+    num_nodes = [g.num_nodes() for g in graph_data]
+    torch.save(normalize_ged_matrix(ged_matrix, num_nodes), os.path.join(root_path, "raw/nged_matrix.pt"))
+
+    failed = records[records["algo"] == ALGO_FAILED]
+    failed = failed[np.isinf(ged_matrix.numpy()[failed["row"], failed["col"]])]
+    uncomputed = sorted(set(zip(failed["row"].tolist(), failed["col"].tolist())))
+    print("\n Total Number of uncomputed paris: ", len(uncomputed))
+    torch.save(uncomputed, os.path.join(shard_dir(root_path), "uncomputed_pairs.pt"))
+    print("\n---Total Running Time : %s seconds ---" % (time.time() - start_running_time))
+    return ged_matrix
@@ -8,11 +8,12 @@ import torch.nn.functional as F
 from tqdm import tqdm, trange
 from scipy.stats import spearmanr, kendalltau
 import glob
+import hashlib
 from sklearn import metrics
 from layers import AttentionModule, TensorNetworkModule, DiffPool
 from utils import calculate_ranking_correlation, calculate_prec_at_k, gen_pairs, ensure_dir, checkpoint, print_memory_cpu_usage
-from darpaDataset import DARPADataset
 from dataset_config import get_ground_cases
+from vocabulary import FINGERPRINT_KEY, get_vocabulary
 
 from torch_geometric.nn import GCNConv, GINConv , FastRGCNConv
 from torch_geometric.data import DataLoader, Batch
@@ -214,63 +215,135 @@ class MEGRAPT(torch.nn.Module):
         adj = to_dense_adj(edge_index, batch)
         return self.attention(x, adj, mask)
 
-    def forward(self, data):
+    def embed(self, graph):
         """
-        Forward pass with graphs.
-        :param data: Data dictionary.
-        :return score: Similarity score.
+        Embedding stage: GNN pass and pooling for one graph or a batch of graphs.
+        :param graph: Data or Batch object.
+        :return embedding: Dictionary with node features, batch vector and pooled features.
         """
-        edge_index_1 = data["g1"].edge_index
-        edge_index_2 = data["g2"].edge_index
-        features_1 = data["g1"].nlabel
-        features_2 = data["g2"].nlabel
-        if self.args.gnn_operator == "rgcn":
-            edge_features_1 = data["g1"].elabel
-            edge_features_2 = data["g2"].elabel
-
-        
-        batch_1 = (
-            data["g1"].batch
-            if hasattr(data["g1"], "batch")
-            else torch.tensor((), dtype=torch.long).new_zeros(data["g1"].num_nodes)
-        )
-        batch_2 = (
-            data["g2"].batch
-            if hasattr(data["g2"], "batch")
-            else torch.tensor((), dtype=torch.long).new_zeros(data["g2"].num_nodes)
+        edge_index = graph.edge_index
+        batch = (
+            graph.batch
+            if hasattr(graph, "batch") and graph.batch is not None
+            else torch.tensor((), dtype=torch.long).new_zeros(graph.num_nodes)
         )
-
         if self.args.gnn_operator == "rgcn":
-            abstract_features_1 = self.relation_convolutional_pass(edge_index_1, features_1,edge_features_1)
-            abstract_features_2 = self.relation_convolutional_pass(edge_index_2, features_2,edge_features_2)
-        else:    
-            abstract_features_1 = self.convolutional_pass(edge_index_1, features_1)
-            abstract_features_2 = self.convolutional_pass(edge_index_2, features_2)
-        
-        if self.args.histogram:
-            hist = self.calculate_histogram(
-                abstract_features_1, abstract_features_2, batch_1, batch_2
-            )
+            abstract_features = self.relation_convolutional_pass(edge_index, graph.nlabel, graph.elabel)
+        else:
+            abstract_features = self.convolutional_pass(edge_index, graph.nlabel)
 
         if self.args.diffpool:
-            pooled_features_1 = self.diffpool(
-                abstract_features_1, edge_index_1, batch_1
-            )
-            pooled_features_2 = self.diffpool(
-                abstract_features_2, edge_index_2, batch_2
-            )
+            pooled_features = self.diffpool(abstract_features, edge_index, batch)
         else:
-            pooled_features_1 = self.attention(abstract_features_1, batch_1)
-            pooled_features_2 = self.attention(abstract_features_2, batch_2)
-            
-        scores = self.tensor_network(pooled_features_1, pooled_features_2)
+            pooled_features = self.attention(abstract_features, batch)
+        return {"features": abstract_features, "batch": batch, "pooled": pooled_features}
+
+    @staticmethod
+    def repeat_embedding(embedding, count):
+        """
+        Repeating a single-graph embedding to pair it with a batch of graphs.
+        :param embedding: Embedding of one graph (see embed).
+        :param count: Number of copies.
+        :return embedding: Embedding of a batch of count identical graphs.
+        """
+        num_nodes = embedding["features"].size(0)
+        return {
+            "features": embedding["features"].repeat(count, 1),
+            "batch": torch.arange(count, dtype=torch.long).repeat_interleave(num_nodes),
+            "pooled": embedding["pooled"].repeat(count, 1),
+        }
+
+    def compare(self, embedding_1, embedding_2):
+        """
+        Comparison stage: similarity scores for pairs of embeddings.
+        A single-graph embedding is paired with every graph of the other side.
+        :param embedding_1: Embedding of source graphs.
+        :param embedding_2: Embedding of target graphs.
+        :return score: Similarity score.
+        """
+        count_1 = embedding_1["pooled"].size(0)
+        count_2 = embedding_2["pooled"].size(0)
+        if count_1 == 1 and count_2 > 1:
+            embedding_1 = self.repeat_embedding(embedding_1, count_2)
+        elif count_2 == 1 and count_1 > 1:
+            embedding_2 = self.repeat_embedding(embedding_2, count_1)
+
+        scores = self.tensor_network(embedding_1["pooled"], embedding_2["pooled"])
         if self.args.histogram:
+            hist = self.calculate_histogram(
+                embedding_1["features"], embedding_2["features"], embedding_1["batch"], embedding_2["batch"]
+            )
             scores = torch.cat((scores, hist), dim=1)
 
         scores = F.relu(self.fully_connected_first(scores))
         score = torch.sigmoid(self.scoring_layer(scores)).view(-1)
         return score
 
+    def forward(self, data):
+        """
+        Forward pass with graphs.
+        :param data: Data dictionary.
+        :return score: Similarity score.
+        """
+        return self.compare(self.embed(data["g1"]), self.embed(data["g2"]))
+
+
+def graph_digest(graph):
+    """
+    Content hash of a graph, used to key cached query embeddings.
+    :param graph: Data object.
+    :return digest: Hex digest.
+    """
+    h = hashlib.sha256()
+    h.update(str(getattr(graph, "g_name", "")).encode())
+    h.update(str(int(graph.num_nodes)).encode())
+    for key in ("edge_index", "nlabel", "elabel"):
+        value = getattr(graph, key, None)
+        if value is not None:
+            h.update(value.detach().cpu().contiguous().numpy().tobytes())
+    return h.hexdigest()
+
+
+def checkpoint_fingerprint(checkpoint_path):
+    """
+    Identity of a checkpoint file (path, size and mtime).
+    :param checkpoint_path: Path of the model checkpoint.
+    :return fingerprint: String fingerprint.
+    """
+    st = os.stat(checkpoint_path)
+    return "{}:{}:{}".format(os.path.abspath(checkpoint_path), st.st_size, int(st.st_mtime))
+
+
+def embed_query_graphs(model, query_graphs, cache_path=None, checkpoint_path=None):
+    """
+    Embedding query graphs once per checkpoint, with an optional on-disk cache.
+    :param model: MEGRAPT model in eval mode.
+    :param query_graphs: List of query Data objects.
+    :param cache_path: File to load/store embeddings (e.g. processed/query_embeddings/<model>.pt).
+    :param checkpoint_path: Checkpoint the model was loaded from; cache entries of other checkpoints are ignored.
+    :return embeddings: Dictionary graph digest -> embedding.
+    """
+    fingerprint = checkpoint_fingerprint(checkpoint_path) if checkpoint_path else None
+    cached = {}
+    if cache_path and os.path.exists(cache_path):
+        stored = torch.load(cache_path)
+        if fingerprint is not None and stored.get("checkpoint") == fingerprint:
+            cached = stored.get("embeddings", {})
+
+    embeddings = {}
+    missing = False
+    with torch.no_grad():
+        for g in query_graphs:
+            digest = graph_digest(g)
+            if digest not in cached:
+                cached[digest] = {k: v.detach() for k, v in model.embed(g).items()}
+                missing = True
+            embeddings[digest] = cached[digest]
+
+    if cache_path and fingerprint is not None and missing:
+        checkpoint({"checkpoint": fingerprint, "embeddings": cached}, cache_path)
+    return embeddings
+
 
 class MEGRAPTTrainer(object):
     """
@@ -285,20 +358,12 @@ class MEGRAPTTrainer(object):
         self.current_mem = getrusage(RUSAGE_SELF).ru_maxrss
         print_memory_cpu_usage("Initial memory usage")
         self.args = args
+        self.vocabulary = get_vocabulary(args.dataset)
+        print("Label vocabulary", self.vocabulary)
         if self.args.predict:
             self.root_file = self.args.dataset_path
-            if args.dataset == "DARPA_OPTC":
-                self.number_of_labels = 4
-                self.number_of_edge_labels = 10
-            elif args.dataset == "DARPA_CADETS":
-                self.number_of_labels = 4
-                self.number_of_edge_labels = 31
-            elif args.dataset == "DARPA_THEIA":
-                self.number_of_labels = 4
-                self.number_of_edge_labels = 17
-            elif args.dataset == "DARPA_TRACE":
-                self.number_of_labels = 4
-                self.number_of_edge_labels = 24
+            self.number_of_labels = self.vocabulary.num_node_labels
+            self.number_of_edge_labels = self.vocabulary.num_edge_labels
             print("Number of labels",self.number_of_labels) 
             print("Number of edge labels",self.number_of_edge_labels)                 
         else:
@@ -318,14 +383,17 @@ class MEGRAPTTrainer(object):
         """
         Saving model.
         """
-        torch.save(self.model.state_dict(), self.args.save)
+        state = self.model.state_dict()
+        state[FINGERPRINT_KEY] = self.vocabulary.fingerprint
+        torch.save(state, self.args.save)
         print(f"Model is saved under {self.args.save}.")
 
     def load(self):
         """
         Loading model.
         """
-        self.model.load_state_dict(torch.load(self.args.load))
+        state = self.vocabulary.check_checkpoint(torch.load(self.args.load), self.args.load)
+        self.model.load_state_dict(state)
         print(f"Model is loaded from {self.args.load}.")
 
     def process_dataset(self):
@@ -333,6 +401,7 @@ class MEGRAPTTrainer(object):
         Downloading and processing dataset.
         """
         print("\nPreparing dataset.\n")
+        from darpaDataset import DARPADataset
         if self.args.dataset == "DARPA_OPTC" or self.args.dataset == "DARPA_CADETS" or self.args.dataset == "DARPA_THEIA" or self.args.dataset == "DARPA_TRACE":
             self.root_file = self.args.dataset_path
             self.training_graphs = DARPADataset(self.root_file, train=True)
@@ -538,6 +607,7 @@ class MEGRAPTTrainer(object):
         predict similarity of predict dataset
         """
         print("\n\nsample prediction.\n")
+        from darpaDataset import DARPADataset
         self.prediction_time = time.time()
         self.model.eval()
         if(self.args.predict_file):
@@ -552,13 +622,7 @@ class MEGRAPTTrainer(object):
                 if query_graph_name != "all":
                     self.query_graphs = [query for query in all_query_graphs if query.g_name == query_graph_name]
                 print("Number of query graphs", len(self.query_graphs))
-                similarity_matrix = np.empty((len(self.query_graphs) , len(self.predict_graphs)))
-                for i, g in enumerate(self.query_graphs):
-                    source_batch = Batch.from_data_list([g] * len(self.predict_graphs))
-                    target_batch = Batch.from_data_list(self.predict_graphs)
-                    data = self.transform((source_batch, target_batch), predict=True)
-                    prediction = self.model(data)
-                    similarity_matrix[i] = prediction.detach().numpy()
+                similarity_matrix = self.predict_similarity_matrix()
                 if self.args.log_similarity:
                     checkpoint(similarity_matrix,(self.root_file+"predict/"+self.args.load.split("/")[-1].replace(".pt","") + "_similarity/similarity_matrix_"+self.args.predict_file))
                 Highest_index = np.argmax(similarity_matrix)
@@ -604,6 +668,24 @@ class MEGRAPTTrainer(object):
         print("I/O counters", io_counters)
 
 
+    def predict_similarity_matrix(self):
+        """
+        Similarity of every query graph against every predict graph.
+        Query embeddings are computed once per checkpoint and cached under
+        processed/query_embeddings/, predict graphs are embedded once.
+        :return similarity_matrix: Array of shape (query graphs, predict graphs).
+        """
+        cache_path = None
+        if self.args.load:
+            cache_path = self.root_file + "processed/query_embeddings/" + self.args.load.split("/")[-1]
+        query_embeddings = embed_query_graphs(self.model, self.query_graphs, cache_path, self.args.load)
+        similarity_matrix = np.empty((len(self.query_graphs), len(self.predict_graphs)))
+        with torch.no_grad():
+            target = self.model.embed(Batch.from_data_list(self.predict_graphs))
+            for i, g in enumerate(self.query_graphs):
+                similarity_matrix[i] = self.model.compare(query_embeddings[graph_digest(g)], target).numpy()
+        return similarity_matrix
+
     def predict_pairs(self):
         if self.predict_graphs[0]==None:
             raised_alarms = np.array([])
@@ -612,13 +694,7 @@ class MEGRAPTTrainer(object):
         else:    
             print("Number of predict graphs", len(self.predict_graphs))
             print("Query graph:", self.query_graphs[0].g_name)
-            similarity_matrix = np.empty((len(self.query_graphs) , len(self.predict_graphs)))
-            for i, g in enumerate(self.query_graphs):
-                source_batch = Batch.from_data_list([g] * len(self.predict_graphs))
-                target_batch = Batch.from_data_list(self.predict_graphs)
-                data = self.transform((source_batch, target_batch), predict=True)
-                prediction = self.model(data)
-                similarity_matrix[i] = prediction.detach().numpy()
+            similarity_matrix = self.predict_similarity_matrix()
             if self.args.log_similarity:    
                 checkpoint(similarity_matrix,(self.root_file+"predict/"+self.args.load.split("/")[-1].replace(".pt","") + "_similarity/similarity_matrix_"+self.predict_file))
             Highest_index = np.argmax(similarity_matrix)
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+
+# Node and edge label vocabularies, one file per dataset under vocabularies/
+# (darpa_cadets.json, ...). Label ids are positions in node_types / edge_types;
+# every encoder (extract_rdf_subgraphs_*, the realtime exporter), DARPADataset
+# and MEGRAPTTrainer read them from here. Bump "version" when a list changes:
+# checkpoints store the fingerprint of the vocabulary they were trained on.
+
+VOCABULARY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vocabularies")
+FINGERPRINT_KEY = "vocabulary_fingerprint"
+
+_VOCABULARIES = {}
+
+
+class Vocabulary(object):
+    """
+    Label vocabulary of one dataset.
+    node_aliases / edge_aliases map names from other sources (the realtime
+    normalizer's ntypes and actions) onto dataset labels; default_node /
+    default_edge label whatever is left.
+    """
+
+    def __init__(self, dataset, version, node_types, edge_types, node_aliases=None, edge_aliases=None,
+                 default_node=None, default_edge=None):
+        self.dataset = dataset
+        self.version = version
+        self.node_types = list(node_types)
+        self.edge_types = list(edge_types)
+        self.node_ids = {name: i for i, name in enumerate(self.node_types)}
+        self.edge_ids = {name: i for i, name in enumerate(self.edge_types)}
+        if len(self.node_ids) != len(self.node_types) or len(self.edge_ids) != len(self.edge_types):
+            raise ValueError("Duplicate label in the vocabulary of " + dataset)
+        self._node_labels = self._labels(self.node_ids, node_aliases or {})
+        self._edge_labels = self._labels(self.edge_ids, edge_aliases or {})
+        self.default_node_id = self.node_ids[default_node] if default_node is not None else None
+        self.default_edge_id = self.edge_ids[default_edge] if default_edge is not None else None
+        canonical = json.dumps([dataset, version, self.node_types, self.edge_types])
+        self.fingerprint = hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+    def _labels(self, ids, aliases):
+        labels = dict(ids)
+        for alias, name in aliases.items():
+            if alias in ids and alias != name:
+                raise ValueError("Alias %s shadows a label of %s" % (alias, self.dataset))
+            labels[alias] = ids[name]
+        return labels
+
+    @property
+    def num_node_labels(self):
+        return len(self.node_types)
+
+    @property
+    def num_edge_labels(self):
+        return len(self.edge_types)
+
+    def node_id(self, name):
+        """
+        Id of a node type of the dataset (KeyError if it is not one).
+        """
+        return self.node_ids[name]
+
+    def edge_id(self, name):
+        """
+        Id of an edge type of the dataset (KeyError if it is not one).
+        """
+        return self.edge_ids[name]
+
+    def node_label(self, name):
+        """
+        Id of a node type, an alias or else default_node.
+        """
+        return self._node_labels.get(name, self.default_node_id)
+
+    def edge_label(self, name):
+        """
+        Id of an edge type, an alias or else default_edge.
+        """
+        return self._edge_labels.get(name, self.default_edge_id)
+
+    def check_checkpoint(self, state, source="checkpoint"):
+        """
+        Remove the vocabulary fingerprint from a loaded state_dict and fail if
+        it is not this vocabulary's. Checkpoints saved without one load with a
+        warning.
+        :param state: state_dict as loaded by torch.load.
+        :param source: Name of the checkpoint for messages.
+        """
+        fingerprint = state.pop(FINGERPRINT_KEY, None)
+        if fingerprint is None:
+            print("Warning: %s has no vocabulary fingerprint, assuming %s vocabulary v%s"
+                  % (source, self.dataset, self.version))
+        elif fingerprint != self.fingerprint:
+            raise ValueError("%s was trained on vocabulary %s, but %s v%s is %s"
+                             % (source, fingerprint, self.dataset, self.version, self.fingerprint))
+        return state
+
+    def __repr__(self):
+        return "Vocabulary(%s v%s, %d node / %d edge labels, %s)" % (
+            self.dataset, self.version, self.num_node_labels, self.num_edge_labels, self.fingerprint)
+
+
+def get_vocabulary(dataset):
+    """
+    Vocabulary of a dataset, loaded once per process.
+    :param dataset: Dataset name, e.g. DARPA_CADETS or darpa_cadets.
+    :return vocabulary: Vocabulary object.
+    """
+    key = dataset.lower()
+    if key not in _VOCABULARIES:
+        path = os.path.join(VOCABULARY_DIR, key + ".json")
+        if not os.path.exists(path):
+            raise KeyError("No label vocabulary for dataset %s (%s)" % (dataset, path))
+        with open(path) as f:
+            _VOCABULARIES[key] = Vocabulary(**json.load(f))
+    return _VOCABULARIES[key]
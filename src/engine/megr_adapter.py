@@ -1,7 +1,9 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, Sequence
+from typing import Any, Optional, Sequence
+import importlib
+import sys
 
 from src.engine.runner import EngineSpec, run_engine
 
@@ -52,3 +54,17 @@ def megr_predict(args: MEGRArgs, engine_root: Path = DEFAULT_ENGINE_ROOT) -> int
         "--load", str(args.load),
     ]
     return run_engine(spec, cli)
+
+def import_engine_module(name: str, engine_root: Path = DEFAULT_ENGINE_ROOT) -> Any:
+    # engine modules import each other as top-level modules (from layers
+    # import ...), so its src/ goes on sys.path; appended, so that its
+    # utils.py / parser.py do not shadow modules of the same name
+    src = str((engine_root/"src").resolve())
+    if src not in sys.path:
+        sys.path.append(src)
+    return importlib.import_module(name)
+
+def load_vocabulary(dataset: str, engine_root: Path = DEFAULT_ENGINE_ROOT) -> Any:
+    """The engine's label Vocabulary for dataset (e.g. DARPA_CADETS), cached
+    per process by the engine's vocabulary registry."""
+    return import_engine_module("vocabulary", engine_root).get_vocabulary(dataset)
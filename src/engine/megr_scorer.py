@@ -0,0 +1,111 @@
+from __future__ import annotations
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Sequence
+import re
+
+import numpy as np
+
+from src.engine.megr_adapter import DEFAULT_ENGINE_ROOT, import_engine_module, load_vocabulary
+
+# Resident MEGRAPT inference: loads the checkpoint once and scores in-memory
+# torch_geometric Data objects, instead of spawning src/main.py per predict.
+
+# defaults of the engine's parameter_parser that are not recoverable from a
+# state_dict
+_ENGINE_DEFAULTS: Dict[str, Any] = {
+    "gnn_operator": "rgcn",
+    "dropout": 0.0,
+    "histogram": False,
+    "diffpool": False,
+    "bins": 16,
+}
+
+_CONV_RE = re.compile(r"^convolution_(\d+)\.weight$")
+
+def _import_engine(engine_root: Path) -> Any:
+    return import_engine_module("megrapt", engine_root)
+
+def model_args_from_state_dict(state: Dict[str, Any], **overrides: Any) -> SimpleNamespace:
+    # Recover the MEGRAPT hyperparameters (rgcn) from tensor shapes, so any
+    # checkpoint can be loaded without repeating its training command line.
+    convs = sorted(int(m.group(1)) for k in state for m in [_CONV_RE.match(k)] if m)
+    if not convs or state[f"convolution_{convs[0]}.weight"].dim() != 3:
+        raise ValueError("In-process scoring supports rgcn checkpoints only")
+    outs = [int(state[f"convolution_{i}.weight"].shape[2]) for i in convs]
+    layers = len(convs)
+    # the last layer always outputs filters_3; unused leading filters are padded
+    filters = [outs[0]] * (3 - layers) + outs
+    tensor_neurons = int(state["tensor_network.weight_matrix"].shape[2])
+    feature_count = int(state["fully_connected_first.weight"].shape[1])
+    args = dict(_ENGINE_DEFAULTS)
+    args.update(
+        embedding_layers=layers,
+        filters_1=filters[0],
+        filters_2=filters[1],
+        filters_3=filters[2],
+        tensor_neurons=tensor_neurons,
+        bottle_neck_neurons=int(state["fully_connected_first.weight"].shape[0]),
+        histogram=feature_count != tensor_neurons,
+        bins=(feature_count - tensor_neurons) or _ENGINE_DEFAULTS["bins"],
+        diffpool="attention.weight_matrix" not in state,
+        number_of_labels=int(state[f"convolution_{convs[0]}.weight"].shape[1]),
+        number_of_edge_labels=int(state[f"convolution_{convs[0]}.weight"].shape[0]),
+    )
+    args.update(overrides)
+    return SimpleNamespace(**args)
+
+def load_query_graphs(experiment_path: Path, query_name: Optional[str] = None) -> List[Any]:
+    import torch
+    graphs = torch.load(Path(experiment_path)/"raw/torch_query_dataset.pt")
+    if query_name and query_name != "all":
+        graphs = [g for g in graphs if getattr(g, "g_name", None) == query_name]
+    return graphs
+
+class MegraptScorer:
+    def __init__(self, checkpoint: Path, dataset: Optional[str] = None, engine_root: Path = DEFAULT_ENGINE_ROOT,
+                 device: str = "cpu", cache_dir: Optional[Path] = None, **overrides: Any) -> None:
+        import torch
+        self._torch = torch
+        self._engine = _import_engine(engine_root)
+        state = torch.load(str(checkpoint), map_location=device)
+        self.dataset = dataset
+        # fails fast when the checkpoint was trained on another vocabulary
+        # than the one the candidates are encoded with
+        self.vocabulary = load_vocabulary(dataset, engine_root) if dataset else None
+        if self.vocabulary is not None:
+            self.vocabulary.check_checkpoint(state, str(checkpoint))
+        else:
+            state.pop(self._engine.FINGERPRINT_KEY, None)
+        self.checkpoint = Path(checkpoint)
+        self.args = model_args_from_state_dict(state, **overrides)
+        self.model = self._engine.MEGRAPT(self.args, self.args.number_of_labels, self.args.number_of_edge_labels)
+        self.model.load_state_dict(state)
+        self.model.to(device)
+        self.model.eval()
+        self.device = device
+        # query embeddings are computed once per checkpoint; with cache_dir
+        # (e.g. <experiment>/processed/query_embeddings) they persist on disk
+        self.cache_path = str(Path(cache_dir)/self.checkpoint.name) if cache_dir else None
+        self._query_embeddings: Dict[str, Dict[str, Any]] = {}
+
+    def embed_queries(self, query_graphs: Sequence[Any]) -> List[Dict[str, Any]]:
+        digests = [self._engine.graph_digest(g) for g in query_graphs]
+        missing = [g for g, d in zip(query_graphs, digests) if d not in self._query_embeddings]
+        if missing:
+            self._query_embeddings.update(
+                self._engine.embed_query_graphs(self.model, missing, self.cache_path, str(self.checkpoint))
+            )
+        return [self._query_embeddings[d] for d in digests]
+
+    def score(self, query_graphs: Sequence[Any], candidate_graphs: Sequence[Any]) -> np.ndarray:
+        from torch_geometric.data import Batch
+        sim = np.empty((len(query_graphs), len(candidate_graphs)))
+        if not len(query_graphs) or not len(candidate_graphs):
+            return sim
+        queries = self.embed_queries(query_graphs)
+        with self._torch.no_grad():
+            target = self.model.embed(Batch.from_data_list(list(candidate_graphs)).to(self.device))
+            for i, q in enumerate(queries):
+                sim[i] = self.model.compare(q, target).cpu().numpy()
+        return sim
@@ -11,9 +11,10 @@ Metrics:
 
 import json
 import time
+import random
 import logging
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Any, Iterator, List, Dict, Optional, Sequence
 from dataclasses import dataclass, field
 from datetime import datetime
 
@@ -228,13 +229,17 @@ def evaluate_detection_accuracy(
 
 def benchmark_hunting_latency(
     events_file: Path,
-    num_trials: int = 10
+    num_trials: int = 10,
+    batch_size: int = 5000,
+    events_format: str = "jsonl",
 ) -> Dict:
     """Benchmark hunting pipeline latency
     
     Args:
-        events_file: Path to events JSONL
+        events_file: Path to the event log
         num_trials: Number of trials to run
+        batch_size: Events per ingest_batch call (ingest_batch_size in hunting.yaml)
+        events_format: jsonl, msgpack or parquet (see event_store)
         
     Returns:
         Latency statistics
@@ -246,12 +251,17 @@ def benchmark_hunting_latency(
         
         # Simulate hunting pipeline stages
         # (In real implementation, call actual pipeline)
-        from src.common.io import read_jsonl
+        from src.common.io import read_jsonl_batches
+        from src.pipeline.hunting.event_store import read_event_columns
         from src.pipeline.hunting.provenance import WindowedProvenanceGraph
         
         pg = WindowedProvenanceGraph()
-        for ev in read_jsonl(events_file):
-            pg.ingest(ev)
+        if events_format == "jsonl":
+            for batch in read_jsonl_batches(events_file, batch_size):
+                pg.ingest_batch(batch)
+        else:
+            for cols in read_event_columns(events_file, events_format, batch_size):
+                pg.ingest_columns(cols)
         
         latency = time.time() - start
         latencies.append(latency)
@@ -262,9 +272,989 @@ def benchmark_hunting_latency(
         "max_latency": max(latencies),
         "median_latency": sorted(latencies)[len(latencies) // 2],
         "trials": num_trials,
+        "batch_size": batch_size,
+        "events_format": events_format,
     }
 
 
+def synthetic_events(
+    num_events: int,
+    events_per_second: float = 5000.0,
+    num_pids: int = 2000,
+    num_paths: int = 50000,
+    seed: int = 0,
+) -> Iterator[Dict[str, Any]]:
+    """Generate normalized events shaped like the collector output
+    
+    Args:
+        num_events: Number of events to yield
+        events_per_second: Simulated event rate (drives the ts spacing)
+        num_pids: Size of the pid pool
+        num_paths: Size of the file path pool
+        seed: RNG seed for reproducible runs
+        
+    Yields:
+        Event dicts accepted by WindowedProvenanceGraph.ingest
+    """
+    from src.pipeline.hunting.syscalls import READ
+
+    rng = random.Random(seed)
+    ts0 = 1_700_000_000.0
+    step = 1.0 / events_per_second
+    for i in range(num_events):
+        ts = ts0 + i * step
+        pid = rng.randrange(num_pids)
+        r = rng.random()
+        if r < 0.05:
+            yield {"ts": ts, "kind": "process_start", "pid": pid, "ppid": rng.randrange(num_pids),
+                   "exe": f"/usr/bin/bin{pid % 97}", "comm": f"bin{pid % 97}"}
+        elif r < 0.90:
+            yield {"ts": ts, "kind": "file_op", "pid": pid, "exe": f"/usr/bin/bin{pid % 97}",
+                   "comm": f"bin{pid % 97}", "path": f"/data/f{rng.randrange(num_paths)}", "action": READ}
+        else:
+            yield {"ts": ts, "kind": "net_op", "pid": pid, "exe": f"/usr/bin/bin{pid % 97}",
+                   "comm": f"bin{pid % 97}", "saddr": f"10.0.{rng.randrange(256)}.{rng.randrange(256)}:443"}
+
+
+def _full_scan_graph_cls():
+    """WindowedProvenanceGraph with the original per-ingest full edge scan (baseline)"""
+    import networkx as nx
+    from src.pipeline.hunting.provenance import WindowedProvenanceGraph
+
+    class FullScanProvenanceGraph(WindowedProvenanceGraph):
+        def _prune(self, now_ts: float) -> None:
+            cutoff = now_ts - self.window_seconds
+            remove_edges = [(u, v) for u, v, dat in self.g.edges(data=True) if dat.get("ts", now_ts) < cutoff]
+            self.g.remove_edges_from(remove_edges)
+            if self.g.number_of_nodes() > self.max_nodes:
+                isolates = list(nx.isolates(self.g))
+                self.g.remove_nodes_from(isolates[: max(0, len(isolates)//2)])
+
+    return FullScanProvenanceGraph
+
+
+def benchmark_ingest_throughput(
+    sizes: Sequence[int] = (10**5, 10**6, 10**7),
+    window_seconds: int = 120,
+    max_nodes: int = 200000,
+    events_per_second: float = 5000.0,
+    baseline_max_events: int = 2 * 10**4,
+) -> Dict:
+    """Benchmark WindowedProvenanceGraph ingest throughput
+    
+    Compares the indexed eviction ("after") against the original full edge
+    scan ("before"). The full scan is quadratic, so it only runs for sizes up
+    to baseline_max_events; larger sizes report None for "before".
+    
+    Args:
+        sizes: Event counts to replay
+        window_seconds: Sliding window length
+        max_nodes: Node cap passed to the graph
+        events_per_second: Simulated event rate of the synthetic stream
+        baseline_max_events: Largest size the full-scan baseline is run for
+        
+    Returns:
+        Per-size events/sec and final graph size
+    """
+    from src.pipeline.hunting.provenance import WindowedProvenanceGraph
+
+    variants = {"after": WindowedProvenanceGraph, "before": _full_scan_graph_cls()}
+    results: Dict[str, Dict] = {}
+    for n in sizes:
+        row: Dict[str, Any] = {}
+        for name, cls in variants.items():
+            if name == "before" and n > baseline_max_events:
+                row[f"{name}_events_per_second"] = None
+                continue
+            pg = cls(window_seconds=window_seconds, max_nodes=max_nodes)
+            start = time.perf_counter()
+            for ev in synthetic_events(n, events_per_second=events_per_second):
+                pg.ingest(ev)
+            elapsed = time.perf_counter() - start
+            row[f"{name}_events_per_second"] = n / elapsed if elapsed > 0 else 0.0
+            row[f"{name}_nodes"] = pg.g.number_of_nodes()
+            row[f"{name}_edges"] = pg.g.number_of_edges()
+        results[str(n)] = row
+        log.info("ingest %d events: %s", n, row)
+    return results
+
+
+def benchmark_graph_memory(
+    num_nodes: int = 200000,
+    num_edges: int = 2000000,
+    backends: Sequence[str] = ("networkx", "compact"),
+    batch_size: int = 5000,
+) -> Dict:
+    """Measure provenance graph memory per backend with tracemalloc
+    
+    Builds a graph of roughly num_nodes nodes and num_edges edges from
+    synthetic file_op events (window large enough that nothing expires).
+    
+    Args:
+        num_nodes: Target node count (10% processes, 90% files)
+        num_edges: Number of events, i.e. upper bound on edges
+        backends: graph_backend names to measure
+        batch_size: Events per ingest_batch call
+        
+    Returns:
+        Per-backend peak/current traced bytes and final graph size
+    """
+    import tracemalloc
+    from src.pipeline.hunting.provenance import make_provenance_graph
+    from src.pipeline.hunting.syscalls import READ
+
+    num_pids = max(1, num_nodes // 10)
+    num_paths = max(1, num_nodes - num_pids)
+    results: Dict[str, Dict] = {}
+    for backend in backends:
+        tracemalloc.start()
+        start = time.perf_counter()
+        pg = make_provenance_graph(backend, window_seconds=10**9, max_nodes=num_nodes * 2)
+        batch: List[Dict[str, Any]] = []
+        for ev in synthetic_events(num_edges, num_pids=num_pids, num_paths=num_paths):
+            if ev["kind"] != "file_op":
+                ev = dict(ev, kind="file_op", path=f"/data/f{ev['pid'] % num_paths}", action=READ)
+            batch.append(ev)
+            if len(batch) >= batch_size:
+                pg.ingest_batch(batch)
+                batch = []
+        if batch:
+            pg.ingest_batch(batch)
+        # materialize the edge view once so lazily built indexes are counted
+        pg.g.number_of_edges()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[backend] = {
+            "nodes": pg.g.number_of_nodes(),
+            "edges": pg.g.number_of_edges(),
+            "current_mb": current / 2**20,
+            "peak_mb": peak / 2**20,
+            "build_seconds": time.perf_counter() - start,
+        }
+        log.info("graph memory %s: %s", backend, results[backend])
+        del pg
+    return results
+
+
+
+def synthetic_lifecycle_events(
+    num_events: int,
+    events_per_second: float = 5000.0,
+    num_pids: int = 32768,
+    num_paths: int = 50000,
+    running: int = 500,
+    ops_per_process: float = 50.0,
+    exits: bool = True,
+    seed: int = 0,
+) -> Iterator[Dict[str, Any]]:
+    """Normalized events of processes that start, work and exit
+    
+    Keeps about `running` processes alive; each one does about
+    ops_per_process file/net events, then exits and is replaced by a new
+    process. Pids are allocated round-robin from num_pids, so they are
+    reused like on a long-running host.
+    
+    Args:
+        num_events: Number of events to yield
+        events_per_second: Simulated event rate (drives the ts spacing)
+        num_pids: Size of the pid space
+        num_paths: Size of the file path pool
+        running: Concurrently running processes
+        ops_per_process: Mean number of file/net events per process
+        exits: Yield process_exit events (exit_group audited)
+        seed: RNG seed for reproducible runs
+        
+    Yields:
+        Event dicts accepted by WindowedProvenanceGraph.ingest
+    """
+    from src.pipeline.hunting.syscalls import CONNECT, EXIT, EXECUTE, READ, WRITE
+
+    rng = random.Random(seed)
+    ts0 = 1_700_000_000.0
+    step = 1.0 / events_per_second
+    procs: List[List[Any]] = []   # [pid, exe, ops left]
+    next_pid = 300
+    i = 0
+    while i < num_events:
+        ts = ts0 + i * step
+        if len(procs) < running:
+            pid, next_pid = next_pid, 300 + (next_pid - 299) % (num_pids - 300)
+            ppid = procs[rng.randrange(len(procs))][0] if procs else 1
+            exe = f"/usr/bin/bin{rng.randrange(97)}"
+            procs.append([pid, exe, max(1, int(rng.expovariate(1.0 / ops_per_process)))])
+            yield {"ts": ts, "kind": "process_start", "pid": pid, "ppid": ppid, "exe": exe,
+                   "comm": exe.rsplit("/", 1)[1], "action": EXECUTE}
+            i += 1
+            continue
+        k = rng.randrange(len(procs))
+        proc = procs[k]
+        pid, exe = proc[0], proc[1]
+        comm = exe.rsplit("/", 1)[1]
+        if rng.random() < 0.9:
+            yield {"ts": ts, "kind": "file_op", "pid": pid, "exe": exe, "comm": comm,
+                   "path": f"/data/f{rng.randrange(num_paths)}", "action": READ if rng.random() < 0.7 else WRITE}
+        else:
+            yield {"ts": ts, "kind": "net_op", "pid": pid, "exe": exe, "comm": comm,
+                   "saddr": f"10.0.{rng.randrange(256)}.{rng.randrange(256)}:443", "action": CONNECT}
+        i += 1
+        proc[2] -= 1
+        if proc[2] <= 0:
+            procs[k] = procs[-1]
+            procs.pop()
+            if exits and i < num_events:
+                yield {"ts": ts, "kind": "process_exit", "pid": pid, "exe": exe, "comm": comm, "action": EXIT}
+                i += 1
+
+
+def benchmark_graph_growth(
+    num_events: int = 5 * 10**6,
+    window_seconds: int = 120,
+    max_nodes: int = 200000,
+    backends: Sequence[str] = ("networkx", "compact"),
+    samples: int = 10,
+    batch_size: int = 5000,
+) -> Dict:
+    """Graph size over a long synthetic run with process churn and pid reuse
+    
+    Replays synthetic_lifecycle_events with and without process_exit events
+    and samples node/edge counts and the number of tracked processes. With
+    exits the node count should level off once the window is full.
+    
+    Args:
+        num_events: Events per run
+        window_seconds: Sliding window length
+        max_nodes: Node cap passed to the graph
+        backends: graph_backend names to run
+        samples: Number of samples per run
+        batch_size: Events per ingest_batch call
+        
+    Returns:
+        Per backend and exit mode: list of {events, nodes, edges, processes}
+    """
+    from src.pipeline.hunting.provenance import make_provenance_graph
+
+    every = max(batch_size, num_events // samples)
+    results: Dict[str, Any] = {}
+    for backend in backends:
+        for exits in (True, False):
+            pg = make_provenance_graph(backend, window_seconds=window_seconds, max_nodes=max_nodes)
+            rows = []
+            batch: List[Dict[str, Any]] = []
+            seen = 0
+            for ev in synthetic_lifecycle_events(num_events, exits=exits):
+                batch.append(ev)
+                if len(batch) >= batch_size:
+                    pg.ingest_batch(batch)
+                    seen += len(batch)
+                    batch = []
+                    if seen % every < batch_size:
+                        rows.append({"events": seen, "nodes": pg.g.number_of_nodes(),
+                                     "edges": pg.g.number_of_edges(), "processes": len(pg._procs)})
+            if batch:
+                pg.ingest_batch(batch)
+            name = f"{backend}_{'exits' if exits else 'no_exits'}"
+            results[name] = rows
+            log.info("graph growth %s: %s", name, rows[-1] if rows else None)
+    return results
+
+def _set_k_hop_subgraph(g, seeds: Sequence[str], k: int):
+    """k-hop expansion with Python sets and a copied induced subgraph (baseline)"""
+    nodes = set(seeds)
+    frontier = set(seeds)
+    for _ in range(k):
+        nxt = set()
+        for u in frontier:
+            nxt.update(g.predecessors(u))
+            nxt.update(g.successors(u))
+        nxt -= nodes
+        nodes |= nxt
+        frontier = nxt
+        if not frontier:
+            break
+    return g.subgraph(nodes).copy()
+
+
+def benchmark_extraction(
+    num_events: int = 10**6,
+    k: int = 2,
+    backends: Sequence[str] = ("networkx", "compact"),
+    trials: int = 20,
+    max_fanout: int = 200,
+    hub_degree: int = 5000,
+    seed: int = 0,
+) -> Dict:
+    """k-hop extraction around seeds next to hubs
+    
+    Every process of synthetic_lifecycle_events also reads
+    /etc/ld.so.cache at start, so a 2-hop expansion from any process reaches
+    the cache and, through it, every process in the window.
+    
+    Args:
+        num_events: Events ingested before extracting
+        k: Number of hops
+        backends: graph_backend names to run
+        trials: Seeds (random process nodes) extracted per variant
+        max_fanout: k_hop_max_fanout of the bounded variant
+        hub_degree: hub_out_degree / hub_in_degree of the bounded variant
+        seed: RNG seed for reproducible runs
+        
+    Returns:
+        Per backend and variant ("set_copy" baseline, "csr" unbounded,
+        "csr_bounded"): mean seconds and mean nodes/edges per extraction
+    """
+    from src.pipeline.hunting.extractor import k_hop_subgraph
+    from src.pipeline.hunting.provenance import make_provenance_graph
+    from src.pipeline.hunting.syscalls import READ
+
+    results: Dict[str, Any] = {}
+    for backend in backends:
+        pg = make_provenance_graph(backend, window_seconds=120)
+        batch: List[Dict[str, Any]] = []
+        for ev in synthetic_lifecycle_events(num_events, seed=seed):
+            batch.append(ev)
+            if ev["kind"] == "process_start":
+                batch.append({"ts": ev["ts"], "kind": "file_op", "pid": ev["pid"], "exe": ev["exe"],
+                              "comm": ev["comm"], "path": "/etc/ld.so.cache", "action": READ})
+            if len(batch) >= 5000:
+                pg.ingest_batch(batch)
+                batch = []
+        pg.ingest_batch(batch)
+
+        rng = random.Random(seed)
+        procs = [n for n, dat in pg.g.nodes(data=True) if dat.get("ntype") == "process"]
+        seeds = [rng.choice(procs) for _ in range(trials)]
+        variants = {
+            "set_copy": lambda s: _set_k_hop_subgraph(pg.g, [s], k),
+            "csr": lambda s: k_hop_subgraph(pg.g, [s], k),
+            "csr_bounded": lambda s: k_hop_subgraph(pg.g, [s], k, max_fanout=max_fanout,
+                                                    hub_out_degree=hub_degree, hub_in_degree=hub_degree),
+        }
+        row: Dict[str, Any] = {"nodes": pg.g.number_of_nodes(), "edges": pg.g.number_of_edges()}
+        for name, extract in variants.items():
+            nodes = edges = 0
+            start = time.perf_counter()
+            for s in seeds:
+                sub = extract(s)
+                nodes += sub.number_of_nodes()
+                edges += sub.number_of_edges()
+            row[name] = {
+                "seconds": (time.perf_counter() - start) / trials,
+                "nodes": nodes / trials,
+                "edges": edges / trials,
+            }
+        results[backend] = row
+        log.info("extraction %s: %s", backend, row)
+    return results
+
+def _per_element_export(g, g_name: str):
+    """Data of g built one node / edge at a time, with list.index lookups over
+    the normalizer's own labels (baseline)"""
+    import torch
+    from torch_geometric.data import Data
+    from src.pipeline.hunting.syscalls import EDGE_ACTION_NAMES
+
+    NODE_TYPES = ["process", "file", "socket", "other"]
+    EDGE_TYPES = list(EDGE_ACTION_NAMES)
+
+    nodes = list(g.nodes())
+    idx = {n: i for i, n in enumerate(nodes)}
+    edges = list(g.edges(data=True))
+    edge_index = torch.tensor([[idx[u] for u, _, _ in edges], [idx[v] for _, v, _ in edges]], dtype=torch.long)
+    elabel = torch.tensor([EDGE_TYPES.index(dat.get("etype", "OTHER") if dat.get("etype", "OTHER") in EDGE_TYPES
+                                            else "OTHER") for _, _, dat in edges], dtype=torch.long)
+    rows = []
+    for n in nodes:
+        x = torch.zeros(len(NODE_TYPES))
+        ntype = g.nodes[n].get("ntype")
+        x[NODE_TYPES.index(ntype if ntype in NODE_TYPES else "other")] = 1.0
+        rows.append(x)
+    data = Data(edge_index=edge_index, g_name=g_name)
+    data.num_nodes = len(nodes)
+    data.nlabel = torch.stack(rows)
+    data.elabel = elabel
+    return data
+
+def benchmark_export(
+    num_events: int = 200000,
+    backends: Sequence[str] = ("networkx", "compact"),
+    num_seeds: int = 200,
+    dataset: str = "DARPA_CADETS",
+    seed: int = 0,
+) -> Dict:
+    """MEGR export of a whole window and of per-seed candidates
+    
+    Args:
+        num_events: Events ingested before exporting
+        backends: graph_backend names to run
+        num_seeds: File seeds of the candidate export
+        dataset: Engine dataset whose label vocabulary is exported to
+        seed: RNG seed for reproducible runs
+        
+    Returns:
+        Per backend: seconds of the per-element baseline, to_megr_data_list on
+        the graph and on a whole-graph view, and to_megr_collated on the
+        candidates (nodes/edges are the exported totals)
+    """
+    from src.engine.megr_adapter import load_vocabulary
+    from src.pipeline.hunting.export_megr import to_megr_collated, to_megr_data_list
+    from src.pipeline.hunting.extractor import extract_candidates, k_hop_subgraph
+    from src.pipeline.hunting.provenance import make_provenance_graph
+
+    vocabulary = load_vocabulary(dataset)
+    results: Dict[str, Any] = {}
+    for backend in backends:
+        pg = make_provenance_graph(backend, window_seconds=120)
+        batch: List[Dict[str, Any]] = []
+        for ev in synthetic_lifecycle_events(num_events, seed=seed):
+            batch.append(ev)
+            if len(batch) >= 5000:
+                pg.ingest_batch(batch)
+                batch = []
+        pg.ingest_batch(batch)
+
+        rng = random.Random(seed)
+        files = [n for n, dat in pg.g.nodes(data=True) if dat.get("ntype") == "file"]
+        candidates = extract_candidates(pg.g, rng.sample(files, min(num_seeds, len(files))), k=2)
+        whole = k_hop_subgraph(pg.g, [], 2)
+        variants = {
+            "per_element": lambda: _per_element_export(pg.g, "bench"),
+            "vectorized": lambda: to_megr_data_list(pg.g, "bench", vocabulary),
+            "vectorized_view": lambda: to_megr_data_list(whole, "bench", vocabulary),
+            "candidates_collated": lambda: to_megr_collated(candidates, "bench", vocabulary),
+        }
+        row: Dict[str, Any] = {"nodes": pg.g.number_of_nodes(), "edges": pg.g.number_of_edges(),
+                               "candidates": len(candidates)}
+        for name, export in variants.items():
+            start = time.perf_counter()
+            export()
+            row[name] = time.perf_counter() - start
+        results[backend] = row
+        log.info("export %s: %s", backend, row)
+    return results
+
+def _uncached_graph_cls():
+    """WindowedProvenanceGraph building process attribute dicts per event (baseline)"""
+    from src.pipeline.hunting.provenance import WindowedProvenanceGraph
+
+    class UncachedProvenanceGraph(WindowedProvenanceGraph):
+        def _proc(self, ts, pid, exe, comm):
+            entry = super()._proc(ts, pid, exe, comm)
+            return entry[0], self._proc_attrs(exe, comm), entry[2]
+
+    return UncachedProvenanceGraph
+
+
+def benchmark_ingest_allocations(
+    events_file: Optional[Path] = None,
+    events_format: str = "jsonl",
+    num_events: int = 10**6,
+    batch_size: int = 5000,
+    top: int = 10,
+) -> Dict:
+    """Allocation profile (tracemalloc) of replaying an event log into the graph
+    
+    The log is decoded up front, outside the ingest measurement. Variants:
+    "before" ingests the decoded dicts with per-event attribute dicts
+    (no process cache), "after" ingests the same dicts with the per-pid
+    process cache, "after_records" ingests normalizer.AuditEvent records.
+    
+    Args:
+        events_file: Event log to replay; synthetic_events(num_events) written
+            to a temporary JSONL file when None
+        events_format: Format of events_file (see event_store)
+        num_events: Size of the synthetic log
+        batch_size: Events per ingest_batch call
+        top: Allocation sites to report per variant
+        
+    Returns:
+        Per variant: MB held by the decoded events, ingest seconds, traced
+        current/peak MB, GC collections during ingest and the top sites
+    """
+    import gc
+    import tempfile
+    import tracemalloc
+    from src.common.io import read_jsonl_batches
+    from src.pipeline.hunting.event_store import columns_to_events, read_event_columns
+    from src.pipeline.hunting.normalizer import AuditEvent
+    from src.pipeline.hunting.provenance import WindowedProvenanceGraph
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if events_file is None:
+            events_file = Path(tmp)/"events.jsonl"
+            events_format = "jsonl"
+            with events_file.open("w", encoding="utf-8") as f:
+                for ev in synthetic_events(num_events):
+                    f.write(json.dumps(ev) + "\n")
+
+        def load(as_records: bool) -> List[List[Any]]:
+            if events_format == "jsonl":
+                batches = read_jsonl_batches(events_file, batch_size)
+            else:
+                batches = (columns_to_events(cols) for cols in read_event_columns(events_file, events_format, batch_size))
+            if as_records:
+                return [[AuditEvent.from_dict(ev) for ev in batch] for batch in batches]
+            return list(batches)
+
+        variants = {
+            "before": (_uncached_graph_cls(), False),
+            "after": (WindowedProvenanceGraph, False),
+            "after_records": (WindowedProvenanceGraph, True),
+        }
+        results: Dict[str, Any] = {"events_file": str(events_file), "events_format": events_format}
+        for name, (cls, as_records) in variants.items():
+            gc.collect()
+            tracemalloc.start()
+            batches = load(as_records)
+            events_mb = tracemalloc.get_traced_memory()[0] / 2**20
+            tracemalloc.stop()
+
+            pg = cls(window_seconds=120)
+            gc.collect()
+            collections = sum(st["collections"] for st in gc.get_stats())
+            tracemalloc.start()
+            start = time.perf_counter()
+            for batch in batches:
+                pg.ingest_batch(batch)
+            elapsed = time.perf_counter() - start
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            results[name] = {
+                "events": sum(len(b) for b in batches),
+                "events_mb": events_mb,
+                "ingest_seconds": elapsed,
+                "current_mb": current / 2**20,
+                "peak_mb": peak / 2**20,
+                "gc_collections": sum(st["collections"] for st in gc.get_stats()) - collections,
+                "top": [
+                    {"site": str(stat.traceback[0]), "mb": stat.size / 2**20, "blocks": stat.count}
+                    for stat in snapshot.statistics("lineno")[:top]
+                ],
+            }
+            log.info("ingest allocations %s: %s", name, {k: v for k, v in results[name].items() if k != "top"})
+            del pg, batches, snapshot
+    return results
+
+
+def _scan_seeds(g, indicators: Sequence[Dict[str, Any]]) -> set:
+    """CTI seeds by scanning every node once per indicator (baseline)"""
+    out = set()
+    for ind in indicators:
+        typ, vlow = ind["type"], ind["value"].lower()
+        for n, dat in g.nodes(data=True):
+            ntype = dat.get("ntype")
+            if typ == "file_path" and ntype == "file":
+                hit = vlow in dat.get("path", "").lower()
+            elif typ in ("process_name", "command_line") and ntype == "process":
+                hit = vlow in dat.get("exe", "").lower() or vlow in dat.get("comm", "").lower()
+            elif typ in ("ip", "domain") and ntype == "socket":
+                hit = vlow in dat.get("saddr", "").lower()
+            else:
+                hit = False
+            if hit:
+                out.add(n)
+    return out
+
+
+def benchmark_seeding(
+    num_events: int = 10**6,
+    num_indicators: Sequence[int] = (10, 100, 1000),
+    backend: str = "networkx",
+    trials: int = 5,
+    seed: int = 0,
+) -> Dict:
+    """Seeding cost against a window built from synthetic_lifecycle_events
+    
+    Indicators are a mix of file paths, command lines, process names and
+    IPs/CIDRs drawn from the synthetic pools, so a fraction of them hit.
+    
+    Args:
+        num_events: Events ingested before seeding
+        num_indicators: Indicator counts of the generated seeds files
+        backend: graph_backend name
+        trials: find_seeds calls timed per indicator count
+        seed: RNG seed for reproducible runs
+        
+    Returns:
+        Per indicator count: seconds of the per-indicator node scan
+        (baseline), of find_seeds with the graph's index (first call builds
+        the matcher) and of find_seeds building a NodeIndex from the graph
+    """
+    import tempfile
+    from src.pipeline.hunting.provenance import make_provenance_graph
+    from src.pipeline.hunting.seeding import find_seeds
+
+    rng = random.Random(seed)
+    pg = make_provenance_graph(backend, window_seconds=120)
+    batch: List[Dict[str, Any]] = []
+    for ev in synthetic_lifecycle_events(num_events, seed=seed):
+        batch.append(ev)
+        if len(batch) >= 5000:
+            pg.ingest_batch(batch)
+            batch = []
+    pg.ingest_batch(batch)
+
+    results: Dict[str, Any] = {"nodes": pg.g.number_of_nodes(), "edges": pg.g.number_of_edges()}
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in num_indicators:
+            indicators = []
+            for i in range(count):
+                kind = i % 4
+                if kind == 0:
+                    indicators.append({"type": "file_path", "value": f"/data/f{rng.randrange(10**6)}"})
+                elif kind == 1:
+                    indicators.append({"type": "command_line", "value": f"bin{rng.randrange(1000)}"})
+                elif kind == 2:
+                    indicators.append({"type": "process_name", "value": f"bin{rng.randrange(1000)}"})
+                else:
+                    indicators.append({"type": "ip", "value": f"10.{rng.randrange(4)}.{rng.randrange(256)}.0/28"})
+            seeds_file = Path(tmp)/f"seeds_{count}.json"
+            seeds_file.write_text(json.dumps({"indicators": indicators}), encoding="utf-8")
+
+            start = time.perf_counter()
+            scanned = _scan_seeds(pg.g, indicators)
+            scan_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            find_seeds(pg.g, cti_seeds_path=str(seeds_file), index=pg.index)
+            first_s = time.perf_counter() - start
+            times = []
+            for _ in range(trials):
+                start = time.perf_counter()
+                seeds = find_seeds(pg.g, cti_seeds_path=str(seeds_file), index=pg.index)
+                times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            find_seeds(pg.g, cti_seeds_path=str(seeds_file))
+            rebuild_s = time.perf_counter() - start
+
+            results[str(count)] = {
+                "scan_seconds": scan_s,
+                "scan_matches": len(scanned),
+                "index_first_seconds": first_s,
+                "index_seconds": sum(times) / len(times),
+                "seeds": len(seeds),
+                "rebuild_index_seconds": rebuild_s,
+            }
+            log.info("seeding %d indicators: %s", count, results[str(count)])
+    return results
+
+
+def synthetic_audit_events(seed: int = 0, num_pids: int = 2000, num_paths: int = 50000) -> Iterator[List[str]]:
+    """Infinite stream of synthetic auditd events, one list of record lines each
+    
+    Mix of execve (SYSCALL/EXECVE/CWD/PATH/PROCTITLE), file open
+    (SYSCALL/CWD/PATH/PROCTITLE) and connect (SYSCALL/SOCKADDR/PROCTITLE)
+    events terminated by EOE, with hex-encoded proctitle and paths with spaces
+    like auditd writes them.
+    """
+    rng = random.Random(seed)
+    ts = 1_700_000_000.0
+    serial = 1000
+    while True:
+        ts += rng.random() * 0.001
+        serial += 1
+        stamp = f"msg=audit({ts:.3f}:{serial}):"
+        pid = rng.randrange(num_pids) + 100
+        comm = f"bin{pid % 97}"
+        r = rng.random()
+        syscall = 59 if r < 0.05 else (257 if r < 0.90 else 42)
+        lines = [
+            f"type=SYSCALL {stamp} arch=c000003e syscall={syscall} success=yes exit=3 a0=7ffd1 a1=80000 a2=0 a3=0 "
+            f"items=1 ppid={rng.randrange(num_pids) + 100} pid={pid} auid=1000 uid=1000 gid=1000 euid=1000 suid=1000 "
+            f"fsuid=1000 egid=1000 sgid=1000 fsgid=1000 tty=pts0 ses=3 comm=\"{comm}\" exe=\"/usr/bin/{comm}\" "
+            f"subj=unconfined key=(null)"
+        ]
+        if syscall == 59:
+            lines.append(f"type=EXECVE {stamp} argc=3 a0=\"{comm}\" a1=\"-v\" a2=2F746D702F6120622E747874")
+        if syscall != 42:
+            lines.append(f"type=CWD {stamp} cwd=\"/home/user\"")
+            f = rng.randrange(num_paths)
+            name = f"\"/data/f{f}\"" if f % 10 else "/data/my file {}".format(f).encode().hex().upper()
+            lines.append(f"type=PATH {stamp} item=0 name={name} inode={f} dev=08:01 mode=0100644 ouid=0 ogid=0 "
+                         f"rdev=00:00 nametype={'CREATE' if r < 0.2 else 'NORMAL'} cap_fp=0 cap_fi=0 cap_fe=0 cap_fver=0")
+        else:
+            lines.append(f"type=SOCKADDR {stamp} saddr=02000050C0A8{rng.randrange(65536):04X}0000000000000000")
+        lines.append(f"type=PROCTITLE {stamp} proctitle={(comm + ' --flag value').encode().hex().upper()}")
+        lines.append(f"type=EOE {stamp}")
+        yield lines
+
+
+def write_synthetic_audit_log(path: Path, size_bytes: int, seed: int = 0) -> int:
+    """Write synthetic_audit_events to path until it reaches size_bytes; returns line count"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    written = 0
+    lines = 0
+    with path.open("w", encoding="utf-8") as f:
+        for event in synthetic_audit_events(seed):
+            chunk = "\n".join(event) + "\n"
+            f.write(chunk)
+            written += len(chunk)
+            lines += len(event)
+            if written >= size_bytes:
+                break
+    return lines
+
+
+def _legacy_parse_record(line: str):
+    """The original three-regex audit_stream.parse_record (baseline)"""
+    import re
+    from src.pipeline.hunting.audit_stream import AuditRecord
+
+    mtype = re.search(r"type=([A-Z_]+)", line)
+    mserial = re.search(r"msg=audit\([^:]+:(\d+)\)", line)
+    if not mtype or not mserial:
+        return None
+    kv = {k: v.strip('"') for k, v in re.findall(r"(\w+)=([^\s]+)", line)}
+    return AuditRecord(record_type=mtype.group(1), serial=mserial.group(1), kv=kv, raw=line)
+
+
+def benchmark_audit_parse(
+    audit_log: Optional[Path] = None,
+    size_mb: int = 1024,
+    max_lines: Optional[int] = None,
+) -> Dict:
+    """Benchmark audit.log record parsing in lines/sec
+    
+    Compares the single-pass tokenizer ("after") against the original regex
+    parser ("before") over the same file.
+    
+    Args:
+        audit_log: Existing audit.log to parse; a synthetic one of size_mb is
+            generated next to the working directory when missing
+        size_mb: Size of the synthetic log
+        max_lines: Stop after this many lines (None = whole file)
+        
+    Returns:
+        Lines parsed and lines/sec per parser
+    """
+    from src.pipeline.hunting.audit_stream import parse_record
+
+    if audit_log is None:
+        audit_log = Path(f"synthetic_audit_{size_mb}mb.log")
+    if not audit_log.exists():
+        log.info("writing %d MB synthetic audit log to %s", size_mb, audit_log)
+        write_synthetic_audit_log(audit_log, size_mb * 2**20)
+
+    results: Dict[str, Any] = {"audit_log": str(audit_log), "bytes": audit_log.stat().st_size}
+    for name, parse in (("after", parse_record), ("before", _legacy_parse_record)):
+        lines = 0
+        parsed = 0
+        start = time.perf_counter()
+        with audit_log.open("r", encoding="utf-8", errors="ignore") as f:
+            for line in f:
+                if parse(line) is not None:
+                    parsed += 1
+                lines += 1
+                if max_lines is not None and lines >= max_lines:
+                    break
+        elapsed = time.perf_counter() - start
+        results[name] = {
+            "lines": lines,
+            "parsed": parsed,
+            "seconds": elapsed,
+            "lines_per_second": lines / elapsed if elapsed > 0 else 0.0,
+        }
+        log.info("audit parse %s: %s", name, results[name])
+    return results
+
+
+def benchmark_collector(
+    audit_log: Optional[Path] = None,
+    size_mb: int = 10240,
+    workers: Sequence[int] = (0, 1, 2, 4, 8),
+    events_format: str = "jsonl",
+) -> Dict:
+    """Benchmark collector throughput per number of parse workers
+    
+    Replays audit_log through the collector (--replay, from the start, no
+    offset checkpoint) once per worker count; 0 is the single-process
+    collector. Each run is a separate process so the pipeline's worker
+    processes are measured as deployed.
+    
+    Args:
+        audit_log: audit.log to replay; a synthetic one of size_mb is
+            generated next to the working directory when missing
+        size_mb: Size of the synthetic log
+        workers: Worker counts to run
+        events_format: Collector output format
+        
+    Returns:
+        Per worker count: seconds, audit MB/s and events/sec
+    """
+    import subprocess
+    import sys
+    import tempfile
+
+    if audit_log is None:
+        audit_log = Path(f"synthetic_audit_{size_mb}mb.log")
+    if not audit_log.exists():
+        log.info("writing %d MB synthetic audit log to %s", size_mb, audit_log)
+        write_synthetic_audit_log(audit_log, size_mb * 2**20)
+    size = audit_log.stat().st_size
+
+    results: Dict[str, Any] = {"audit_log": str(audit_log), "bytes": size}
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in workers:
+            out = Path(tmp)/f"events_{n}.{events_format}"
+            cmd = [sys.executable, "-m", "src.pipeline.hunting.collector", "--audit-log", str(audit_log),
+                   "--out", str(out), "--events-format", events_format, "--from-start", "--replay",
+                   "--offset-checkpoint", "none", "--workers", str(n), "--log-level", "WARNING"]
+            start = time.perf_counter()
+            subprocess.run(cmd, check=True)
+            elapsed = time.perf_counter() - start
+            if events_format == "jsonl":
+                with out.open("rb") as f:
+                    events = sum(1 for _ in f)
+            else:
+                from src.pipeline.hunting.event_store import read_msgpack_columns
+                events = sum(len(cols["ts"]) for cols in read_msgpack_columns(out))
+            results[str(n)] = {
+                "seconds": elapsed,
+                "mb_per_second": size / 2**20 / elapsed if elapsed > 0 else 0.0,
+                "events": events,
+                "events_per_second": events / elapsed if elapsed > 0 else 0.0,
+            }
+            out.unlink()
+            log.info("collector workers=%d: %s", n, results[str(n)])
+    return results
+
+def check_rotation(
+    num_events: int = 20000,
+    rotate_bytes: int = 64 * 2**10,
+    buffer_size: int = 1000,
+    runs: int = 3,
+) -> Dict:
+    """Check that a size-rotating JsonlWriter keeps every file under its cap
+    
+    Writes synthetic_events in runs consecutive writers on the same output
+    (as across collector restarts) and inspects the rotated set. Only a
+    file holding a single line larger than the cap may exceed it.
+    
+    Args:
+        num_events: Events over all runs
+        rotate_bytes: Size cap of the writer
+        buffer_size: Events buffered before a write
+        runs: Writers opened one after the other
+        
+    Returns:
+        files, events and max_bytes of the set, the oversized files and
+        within_cap
+    """
+    import tempfile
+    from src.common.io import JsonlWriter, rotated_files
+
+    events = list(synthetic_events(num_events))
+    per_run = -(-num_events // runs)
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp)/"events.jsonl"
+        for start in range(0, num_events, per_run):
+            with JsonlWriter(out, buffer_size=buffer_size, flush_interval=0, rotate_bytes=rotate_bytes) as w:
+                w.write_many(events[start:start + per_run])
+        sizes, lines = [], []
+        for p in rotated_files(out):
+            with p.open("rb") as f:
+                lines.append(sum(1 for _ in f))
+            sizes.append(p.stat().st_size)
+    oversized = [i for i, (size, n) in enumerate(zip(sizes, lines)) if size > rotate_bytes and n > 1]
+    results = {
+        "files": len(sizes),
+        "events": sum(lines),
+        "rotate_bytes": rotate_bytes,
+        "max_bytes": max(sizes, default=0),
+        "oversized": [{"file": i, "bytes": sizes[i], "lines": lines[i]} for i in oversized],
+        "within_cap": not oversized,
+    }
+    log.info("rotation check: %s", results)
+    return results
+
+
+# seconds of `import <entry point>` (as measured by -X importtime) each CLI
+# may spend before argparse runs; torch & co. belong in the code paths
+# that predict or train
+STARTUP_BUDGETS: Dict[str, float] = {
+    "src.pipeline.hunting.main": 1.0,
+    "src.pipeline.hunting.collector": 0.5,
+    "src.pipeline.agent.main": 0.5,
+    "src.pipeline.train.trainer": 0.5,
+}
+HEAVY_MODULES = ("torch", "torch_geometric", "openai", "feedparser", "bs4")
+
+
+def _parse_importtime(stderr: str) -> List[tuple]:
+    """(module, self us, cumulative us, depth) per line of -X importtime output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|", 2)
+        if not own.strip().isdigit():
+            continue  # header
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(own), int(cumulative), depth))
+    return rows
+
+
+def benchmark_startup(
+    entry_points: Optional[Dict[str, float]] = None,
+    repeats: int = 3,
+    top: int = 5,
+) -> Dict:
+    """Import time of the pipeline entry points
+    
+    Each entry point is imported in a fresh interpreter under
+    python -X importtime; the best of repeats runs is kept.
+    
+    Args:
+        entry_points: Module -> budget in seconds (default STARTUP_BUDGETS)
+        repeats: Interpreter runs per module
+        top: Heaviest first-level imports to report
+        
+    Returns:
+        Per module: import seconds, budget, within_budget, the heavy
+        modules it loads (HEAVY_MODULES) and its slowest first-level imports
+    """
+    import subprocess
+    import sys
+
+    entry_points = entry_points or STARTUP_BUDGETS
+    results: Dict[str, Any] = {}
+    for module, budget in entry_points.items():
+        best: Optional[List[tuple]] = None
+        end = 0
+        for _ in range(repeats):
+            proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                  capture_output=True, text=True)
+            if proc.returncode != 0:
+                lines = proc.stderr.strip().splitlines()
+                results[module] = {"error": lines[-1] if lines else f"exit code {proc.returncode}"}
+                break
+            rows = _parse_importtime(proc.stderr)
+            # the entry point's own line closes its block: the imports it
+            # triggered are the lines above it, one level deeper
+            i = max(j for j, r in enumerate(rows) if r[0] == module)
+            if best is None or rows[i][2] < best[end][2]:
+                best, end = rows, i
+        if best is None:
+            continue
+        depth = best[end][3]
+        start = end
+        while start > 0 and best[start - 1][3] > depth:
+            start -= 1
+        block = best[start:end]
+        seconds = best[end][2] / 1e6
+        names = {r[0] for r in block}
+        children = sorted((r for r in block if r[3] == depth + 1), key=lambda r: r[2], reverse=True)
+        results[module] = {
+            "seconds": seconds,
+            "budget": budget,
+            "within_budget": seconds <= budget,
+            "heavy": sorted(m for m in HEAVY_MODULES if m in names),
+            "slowest": [(r[0], r[2] / 1e6) for r in children[:top]],
+        }
+        log.info("startup %s: %s", module, results[module])
+    return results
+
 def print_hunting_report(metrics: HuntingMetrics):
     """Pretty print hunting evaluation report"""
     print("=" * 60)
@@ -307,24 +1297,178 @@ if __name__ == "__main__":
     import argparse
     
     ap = argparse.ArgumentParser(description="Evaluate Hunting Pipeline performance")
-    ap.add_argument("--events", required=True, help="Path to events JSONL")
+    ap.add_argument("--events", help="Path to the event log")
+    ap.add_argument("--events-format", choices=["jsonl", "msgpack", "parquet"], default="jsonl")
     ap.add_argument("--predictions", help="Path to predictions JSON")
     ap.add_argument("--ground-truth", help="Path to ground truth JSON")
     ap.add_argument("--benchmark-trials", type=int, default=10)
+    ap.add_argument("--batch-size", type=int, default=5000, help="Events per ingest batch")
+    ap.add_argument("--ingest-benchmark", action="store_true", help="Run synthetic ingest throughput benchmark")
+    ap.add_argument("--memory-benchmark", action="store_true", help="Measure graph memory per backend")
+    ap.add_argument("--memory-nodes", type=int, default=200000)
+    ap.add_argument("--memory-edges", type=int, default=2000000)
+    ap.add_argument("--parse-benchmark", action="store_true", help="Benchmark audit.log parsing in lines/sec")
+    ap.add_argument("--audit-log", help="audit.log for --parse-benchmark (default: synthetic)")
+    ap.add_argument("--audit-size-mb", type=int, default=1024, help="Size of the synthetic audit.log")
+    ap.add_argument("--parse-max-lines", type=int, help="Stop the parse benchmark after this many lines")
+    ap.add_argument("--collector-benchmark", action="store_true",
+                    help="Replay --audit-log (default: synthetic, --audit-size-mb) through the collector per worker count")
+    ap.add_argument("--collector-workers", default="0,1,2,4,8", help="Comma-separated worker counts")
+    ap.add_argument("--rotation-check", action="store_true",
+                    help="Check that size-rotated collector output stays under --rotate-kb per file")
+    ap.add_argument("--rotate-kb", type=int, default=64)
+    ap.add_argument("--growth-benchmark", action="store_true",
+                    help="Graph size over a long run with process churn, with and without exit events")
+    ap.add_argument("--growth-events", type=int, default=5000000)
+    ap.add_argument("--alloc-benchmark", action="store_true",
+                    help="tracemalloc profile of replaying --events (default: synthetic) into the graph")
+    ap.add_argument("--alloc-events", type=int, default=1000000, help="Size of the synthetic replay log")
+    ap.add_argument("--seeding-benchmark", action="store_true",
+                    help="Time find_seeds (index lookups) against per-indicator node scans")
+    ap.add_argument("--seeding-events", type=int, default=1000000)
+    ap.add_argument("--extract-benchmark", action="store_true",
+                    help="k-hop extraction next to hubs: set expansion vs CSR, unbounded and bounded")
+    ap.add_argument("--extract-events", type=int, default=1000000)
+    ap.add_argument("--export-benchmark", action="store_true",
+                    help="MEGR export: per-element baseline vs vectorized, whole window and candidates")
+    ap.add_argument("--export-events", type=int, default=200000)
+    ap.add_argument("--startup-benchmark", action="store_true",
+                    help="python -X importtime of the pipeline entry points against their budgets")
+    ap.add_argument("--ingest-sizes", default="100000,1000000,10000000", help="Comma-separated event counts")
     ap.add_argument("--output", help="Output JSON file for results")
     args = ap.parse_args()
     
     results = {}
     
     # Benchmark latency
-    if Path(args.events).exists():
+    if args.events and Path(args.events).exists():
         print("Running latency benchmark...")
         results["latency"] = benchmark_hunting_latency(
             Path(args.events),
-            num_trials=args.benchmark_trials
+            num_trials=args.benchmark_trials,
+            batch_size=args.batch_size,
+            events_format=args.events_format,
         )
         print(f"Mean latency: {results['latency']['mean_latency']:.3f}s")
     
+    # Benchmark ingest throughput
+    if args.ingest_benchmark:
+        print("Running ingest throughput benchmark...")
+        sizes = [int(x) for x in args.ingest_sizes.split(",") if x.strip()]
+        results["ingest_throughput"] = benchmark_ingest_throughput(sizes)
+        for n, row in results["ingest_throughput"].items():
+            before = row["before_events_per_second"]
+            before_s = f"{before:.0f} ev/s" if before is not None else "skipped"
+            print(f"  {n} events: after={row['after_events_per_second']:.0f} ev/s, before={before_s}")
+    
+    # Benchmark graph memory
+    if args.memory_benchmark:
+        print("Running graph memory benchmark...")
+        results["graph_memory"] = benchmark_graph_memory(args.memory_nodes, args.memory_edges)
+        for backend, row in results["graph_memory"].items():
+            print(f"  {backend}: {row['nodes']} nodes, {row['edges']} edges, "
+                  f"current={row['current_mb']:.1f} MB, peak={row['peak_mb']:.1f} MB")
+    
+    # Graph growth with process churn
+    if args.growth_benchmark:
+        print("Running graph growth benchmark...")
+        results["graph_growth"] = benchmark_graph_growth(args.growth_events)
+        for name, rows in results["graph_growth"].items():
+            sizes = ", ".join(f"{r['nodes']}" for r in rows)
+            print(f"  {name}: nodes {sizes}")
+    
+    # Allocation profile of the replay ingest
+    if args.alloc_benchmark:
+        print("Running ingest allocation benchmark...")
+        results["ingest_allocations"] = benchmark_ingest_allocations(
+            Path(args.events) if args.events else None,
+            events_format=args.events_format,
+            num_events=args.alloc_events,
+            batch_size=args.batch_size,
+        )
+        for name in ("before", "after", "after_records"):
+            row = results["ingest_allocations"][name]
+            print(f"  {name}: events={row['events_mb']:.1f} MB, ingest {row['ingest_seconds']:.2f}s, "
+                  f"current={row['current_mb']:.1f} MB, peak={row['peak_mb']:.1f} MB, "
+                  f"gc collections={row['gc_collections']}")
+    
+    # CTI seeding on the node index
+    if args.seeding_benchmark:
+        print("Running seeding benchmark...")
+        results["seeding"] = benchmark_seeding(args.seeding_events)
+        for count, row in results["seeding"].items():
+            if isinstance(row, dict):
+                print(f"  {count} indicators: scan={row['scan_seconds']:.3f}s, index={row['index_seconds']:.4f}s "
+                      f"(first {row['index_first_seconds']:.3f}s), rebuild={row['rebuild_index_seconds']:.3f}s, "
+                      f"seeds={row['seeds']}")
+    
+    # k-hop extraction
+    if args.extract_benchmark:
+        print("Running extraction benchmark...")
+        results["extraction"] = benchmark_extraction(args.extract_events)
+        for backend, row in results["extraction"].items():
+            for name in ("set_copy", "csr", "csr_bounded"):
+                r = row[name]
+                print(f"  {backend} {name}: {r['seconds']:.3f}s, {r['nodes']:.0f} nodes, {r['edges']:.0f} edges")
+    
+    # MEGR export
+    if args.export_benchmark:
+        print("Running export benchmark...")
+        results["export"] = benchmark_export(args.export_events)
+        for backend, row in results["export"].items():
+            print(f"  {backend} ({row['nodes']} nodes, {row['edges']} edges): "
+                  f"per-element={row['per_element']:.3f}s, vectorized={row['vectorized']:.3f}s, "
+                  f"view={row['vectorized_view']:.3f}s, {row['candidates']} candidates "
+                  f"collated={row['candidates_collated']:.3f}s")
+    
+    # CLI startup
+    if args.startup_benchmark:
+        print("Running startup benchmark...")
+        results["startup"] = benchmark_startup()
+        for module, row in results["startup"].items():
+            if "error" in row:
+                print(f"  {module}: import failed ({row['error']})")
+                continue
+            status = "ok" if row["within_budget"] else "OVER BUDGET"
+            slowest = ", ".join(f"{name} {sec:.3f}s" for name, sec in row["slowest"])
+            print(f"  {module}: {row['seconds']:.3f}s (budget {row['budget']:.1f}s, {status}), "
+                  f"heavy={row['heavy'] or 'none'}; slowest: {slowest}")
+    
+    # Benchmark audit record parsing
+    if args.parse_benchmark:
+        print("Running audit parse benchmark...")
+        results["audit_parse"] = benchmark_audit_parse(
+            Path(args.audit_log) if args.audit_log else None,
+            size_mb=args.audit_size_mb,
+            max_lines=args.parse_max_lines,
+        )
+        for name in ("after", "before"):
+            row = results["audit_parse"][name]
+            print(f"  {name}: {row['lines']} lines, {row['lines_per_second']:.0f} lines/s")
+    
+    # Benchmark collector pipeline scaling
+    if args.collector_benchmark:
+        print("Running collector benchmark...")
+        workers = [int(x) for x in args.collector_workers.split(",") if x.strip()]
+        results["collector"] = benchmark_collector(
+            Path(args.audit_log) if args.audit_log else None,
+            size_mb=args.audit_size_mb,
+            workers=workers,
+            events_format=args.events_format if args.events_format != "parquet" else "jsonl",
+        )
+        for n in workers:
+            row = results["collector"][str(n)]
+            print(f"  workers={n}: {row['mb_per_second']:.1f} MB/s, {row['events_per_second']:.0f} events/s")
+    
+    # Size cap of rotated output
+    if args.rotation_check:
+        print("Running rotation check...")
+        results["rotation"] = check_rotation(rotate_bytes=args.rotate_kb * 2**10)
+        row = results["rotation"]
+        status = "ok" if row["within_cap"] else f"OVER CAP ({len(row['oversized'])} files)"
+        print(f"  {row['files']} files, {row['events']} events, largest {row['max_bytes']} bytes "
+              f"(cap {row['rotate_bytes']}, {status})")
+    
     # Evaluate accuracy
     if args.predictions and args.ground_truth:
         predictions = json.loads(Path(args.predictions).read_text())
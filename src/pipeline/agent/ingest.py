@@ -1,11 +1,8 @@
 from __future__ import annotations
 
-import feedparser
 from dataclasses import dataclass
 from pathlib import Path
 from typing import List
-import requests
-from bs4 import BeautifulSoup
 import logging
 
 from src.common.io import write_json
@@ -66,6 +63,10 @@ def ingest_pdfs(pdf_dir: Path) -> List[CTIItem]:
 
 def fetch_text(url: str, timeout: int = 20, max_bytes: int = 2_000_000) -> str:
     """Fetch a URL and extract visible text. Best-effort for CTI pages."""
+    # network / HTML dependencies load only when something is fetched
+    import requests
+    from bs4 import BeautifulSoup
+
     r = requests.get(url, timeout=timeout, headers={"User-Agent": "Mozilla/5.0"})
     r.raise_for_status()
     content = r.content[:max_bytes]
@@ -87,6 +88,12 @@ def ingest_sources(sources: List[str], per_source_limit: int = 10, timeout: int
     - If the source parses as a feed and has entries: fetch each entry page (best effort).
     - If it has no entries: treat the source itself as a single CTI page and scrape text.
     """
+    # imported up front so a missing dependency fails here, not inside the
+    # per-source try blocks below
+    import bs4  # noqa: F401
+    import feedparser
+    import requests  # noqa: F401
+
     items: List[CTIItem] = []
     for url in sources:
         try:
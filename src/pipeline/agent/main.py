@@ -8,16 +8,13 @@ from typing import List
 from src.common.logging import setup_logging
 from src.common.config import load_yaml
 from src.common.io import write_json
-from src.pipeline.agent.ingest import ingest_sources, save_items
 from src.pipeline.agent.attack_knowledge import load_attack_techniques, TechniqueRetriever
-from src.pipeline.agent.embedding_retriever import EmbeddingTechniqueRetriever
 from src.pipeline.agent.map_step import map_chunk
 from src.pipeline.agent.self_check import self_check
 from src.pipeline.agent.reduce import reduce_candidates, reduce_llm
 from src.pipeline.agent.chunking import chunk_text
 from src.pipeline.agent.map_step_llm import map_chunk_llm
 from src.pipeline.agent.self_correct_llm import self_correct_llm
-from src.pipeline.agent.query_graph import build_simple_query_graph, export_query_graph_json
 
 log = logging.getLogger(__name__)
 
@@ -94,6 +91,11 @@ def main():
     if rf.exists():
         rss_urls += [l.strip() for l in rf.read_text(encoding="utf-8").splitlines() if l.strip() and not l.strip().startswith("#")]
     
+    # feed / HTTP clients and networkx (query graphs) load once the arguments
+    # are known to be good
+    from src.pipeline.agent.ingest import ingest_sources, save_items
+    from src.pipeline.agent.query_graph import build_simple_query_graph, export_query_graph_json
+
     # Ingest from RSS feeds
     items = []
     if rss_urls:
@@ -128,6 +130,7 @@ def main():
     embed_retriever = None
     if retrieval_mode == "embed" and (llm_backend == "openai") and _has_openai_key():
         try:
+            from src.pipeline.agent.embedding_retriever import EmbeddingTechniqueRetriever
             embed_retriever = EmbeddingTechniqueRetriever(techniques, embedding_model=embed_model)
         except Exception:
             # Fallback to lexical retrieval if embeddings cannot be initialized.
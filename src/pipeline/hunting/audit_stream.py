@@ -1,47 +1,249 @@
 from __future__ import annotations
-import re
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Dict, Iterable, Iterator, List, Optional
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+import re
+import string
+import time
+
+# Single-pass auditd tokenizer: the type/msg header is located with plain
+# string searches and the key=value body is scanned once by a regex that only
+# stops at the keys retained for the record type (quoted values may contain
+# spaces), instead of running three regexes and keeping every key.
+
+# keys the normalizer reads, per record type; EXECVE keeps its a0..aN args,
+# SYSCALL the arguments holding open flags (see syscalls.decode_syscall)
+NORMALIZER_KEYS: Dict[str, FrozenSet[str]] = {
+    "SYSCALL": frozenset(("pid", "ppid", "uid", "auid", "exe", "comm", "syscall", "arch", "a1", "a2")),
+    "CWD": frozenset(("cwd",)),
+    "PATH": frozenset(("name", "nametype")),
+    "SOCKADDR": frozenset(("saddr",)),
+    "EXECVE": frozenset(),
+}
 
-SERIAL_RE = re.compile(r"msg=audit\([^:]+:(\d+)\)")
-TYPE_RE = re.compile(r"type=([A-Z_]+)")
-KV_RE = re.compile(r"(\w+)=([^\s]+)")
+# untrusted string fields auditd writes unquoted and hex-encoded when they
+# contain spaces, quotes or control characters
+HEX_ENCODED_KEYS = frozenset(("proctitle", "name", "cwd", "exe", "comm", "path", "key", "data"))
+
+_HEX_DIGITS = frozenset(string.hexdigits)
+_ENRICHED_SEP = "\x1d"
+_TOKEN_RE = re.compile(r'(\w+)=("[^"]*"|\S*)')
 
 @dataclass
 class AuditRecord:
     record_type: str
     serial: str
     kv: Dict[str, str]
-    raw: str
+    raw: str = ""
+    ts: float = 0.0
+
+def _decode_hex(value: str) -> str:
+    if len(value) % 2 or not value or not _HEX_DIGITS.issuperset(value):
+        return value
+    return bytes.fromhex(value).decode("utf-8", errors="replace")
+
+def _is_execve_arg(key: str) -> bool:
+    return len(key) > 1 and key[0] == "a" and key[1:].isdigit()
+
+@lru_cache(maxsize=None)
+def _key_pattern(wanted: FrozenSet[str], execve: bool) -> "re.Pattern[str]":
+    names = sorted(wanted, key=len, reverse=True)
+    if execve:
+        names.append(r"a\d+")
+    return re.compile(r"(?<=\s)(" + "|".join(names) + r')=("[^"]*"|\S*)')
 
-def parse_record(line: str) -> Optional[AuditRecord]:
-    mtype = TYPE_RE.search(line)
-    mserial = SERIAL_RE.search(line)
-    if not mtype or not mserial:
+def parse_record(line: str, keys: Optional[Dict[str, FrozenSet[str]]] = NORMALIZER_KEYS,
+                 keep_raw: bool = False) -> Optional[AuditRecord]:
+    """Parse one audit.log line in a single scan.
+
+    Quoted values are unquoted and hex-encoded values of HEX_ENCODED_KEYS (and
+    EXECVE arguments) are decoded. With keys (the default, NORMALIZER_KEYS)
+    only the listed keys are retained per record type; keys=None keeps all.
+    """
+    cut = line.find(_ENRICHED_SEP)
+    # log_format=ENRICHED appends translated duplicates after 0x1d
+    body = line[:cut] if cut >= 0 else line
+    # header: [node=... ]type=<TYPE> msg=audit(<sec>.<msec>:<serial>):
+    t = body.find("type=")
+    if t < 0:
+        return None
+    t_end = body.find(" ", t)
+    m = body.find("msg=audit(", t_end)
+    m_end = body.find(")", m)
+    if t_end < 0 or m < 0 or m_end < 0:
+        return None
+    record_type = body[t + 5 : t_end]
+    stamp, sep, serial = body[m + 10 : m_end].partition(":")
+    if not sep or not serial.isdigit():
+        return None
+    try:
+        ts = float(stamp)
+    except ValueError:
         return None
-    record_type = mtype.group(1)
-    serial = mserial.group(1)
+
+    execve = record_type == "EXECVE"
+    if keys is None:
+        items = _TOKEN_RE.findall(body, m_end + 1)
+    else:
+        wanted = keys.get(record_type)
+        if wanted is None or not (wanted or execve):
+            items = []
+        else:
+            # one scan that only stops at the retained keys
+            items = _key_pattern(wanted, execve).findall(body, m_end + 1)
     kv: Dict[str, str] = {}
-    for k, v in KV_RE.findall(line):
-        kv[k] = v.strip('"')
-    return AuditRecord(record_type=record_type, serial=serial, kv=kv, raw=line)
+    for key, value in items:
+        if value[:1] == '"':
+            value = value[1:-1]
+        elif key in HEX_ENCODED_KEYS or (execve and _is_execve_arg(key)):
+            value = _decode_hex(value)
+        kv[key] = value
+    return AuditRecord(record_type=record_type, serial=serial, kv=kv, raw=line if keep_raw else "", ts=ts)
 
-def group_by_serial(lines: Iterable[str]) -> Iterator[List[AuditRecord]]:
-    current: Optional[str] = None
-    bucket: List[AuditRecord] = []
-    for line in lines:
-        rec = parse_record(line)
-        if rec is None:
-            continue
-        if current is None:
-            current = rec.serial
-            bucket = [rec]
-            continue
-        if rec.serial == current:
+class EventAssembler:
+    """Reassembles auditd events whose records arrive interleaved.
+
+    Records are collected per serial in a bounded map of open events. An
+    event is flushed when its EOE record arrives, when it is older than
+    timeout_seconds (audit time, relative to the newest record seen or to
+    flush_expired's now), or, oldest first, when more than max_open events
+    are open.
+
+    Counters:
+        split: events whose records were interleaved with other events
+        late: records that arrived after their event was flushed (dropped)
+        dropped: records discarded (currently the late ones)
+        skipped: records of events marked as already written (see skip)
+        eoe / timed_out / evicted: how events were flushed
+
+    add() optionally takes the record's position in the input (any
+    comparable value, e.g. a follower offset); resume_point() then tells
+    from where input has to be re-read after a restart.
+    """
+
+    def __init__(self, timeout_seconds: float = 2.0, max_open: int = 10000) -> None:
+        self.timeout_seconds = timeout_seconds
+        self.max_open = max_open
+        self._open: "OrderedDict[str, List[AuditRecord]]" = OrderedDict()
+        self._split: Set[str] = set()
+        self._flushed: "OrderedDict[str, None]" = OrderedDict()
+        self._last_serial: Optional[str] = None
+        self._newest_ts = 0.0
+        self._positions: Dict[str, Any] = {}
+        self._emitted: "OrderedDict[str, Any]" = OrderedDict()
+        self._skip: Set[str] = set()
+        self.counters: Dict[str, int] = {
+            "events": 0, "eoe": 0, "timed_out": 0, "evicted": 0, "split": 0, "late": 0, "dropped": 0,
+            "skipped": 0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._open)
+
+    def _flush(self, serial: str, reason: str) -> List[AuditRecord]:
+        records = self._open.pop(serial)
+        if serial in self._split:
+            self._split.discard(serial)
+            self.counters["split"] += 1
+        self.counters[reason] += 1
+        self.counters["events"] += 1
+        position = self._positions.pop(serial, None)
+        if position is not None:
+            self._emitted[serial] = position
+            if len(self._emitted) > 10 * self.max_open:
+                self._emitted.popitem(last=False)
+        # remember recently flushed serials to recognise late records
+        self._flushed[serial] = None
+        if len(self._flushed) > self.max_open:
+            self._flushed.popitem(last=False)
+        return records
+
+    def add(self, rec: AuditRecord, position: Any = None) -> List[List[AuditRecord]]:
+        """Add one record; returns the events completed by it (possibly none)."""
+        out: List[List[AuditRecord]] = []
+        serial = rec.serial
+        if serial in self._skip:
+            self.counters["skipped"] += 1
+            return out
+        if rec.ts > self._newest_ts:
+            self._newest_ts = rec.ts
+        bucket = self._open.get(serial)
+        if bucket is None:
+            if serial in self._flushed:
+                self.counters["late"] += 1
+                self.counters["dropped"] += 1
+                return out
+            bucket = self._open[serial] = []
+            if position is not None:
+                self._positions[serial] = position
+        elif serial != self._last_serial:
+            self._split.add(serial)
+        self._last_serial = serial
+        if rec.record_type == "EOE":
+            out.append(self._flush(serial, "eoe"))
+        else:
             bucket.append(rec)
+        out.extend(self.flush_expired())
+        while len(self._open) > self.max_open:
+            out.append(self._flush(next(iter(self._open)), "evicted"))
+        return out
+
+    def flush_expired(self, now: Optional[float] = None) -> List[List[AuditRecord]]:
+        """Flush events older than timeout_seconds; now defaults to the newest record time."""
+        cutoff = (self._newest_ts if now is None else now) - self.timeout_seconds
+        out: List[List[AuditRecord]] = []
+        # open events are in arrival order, so the oldest are at the front
+        while self._open:
+            serial, records = next(iter(self._open.items()))
+            if records and records[0].ts >= cutoff:
+                break
+            out.append(self._flush(serial, "timed_out"))
+        return out
+
+    def flush_all(self) -> List[List[AuditRecord]]:
+        return [self._flush(serial, "timed_out") for serial in list(self._open)]
+
+    def skip(self, serials: Iterable[str]) -> None:
+        """Drop records of these serials (events already written before a restart)."""
+        self._skip.update(serials)
+
+    def resume_point(self, current: Any) -> Tuple[Any, List[str]]:
+        """Position to resume reading from and the serials to skip there.
+
+        current is the position after the last added record. Re-reading starts
+        at the first record of the oldest open event (or at current if none is
+        open); events flushed since then are returned so they can be skipped.
+        """
+        position = current
+        for serial in self._open:
+            if serial in self._positions:
+                position = min(position, self._positions[serial])
+                break
+        for serial in [s for s, p in self._emitted.items() if p < position]:
+            del self._emitted[serial]
+        return position, [s for s, p in self._emitted.items() if p >= position]
+
+def group_by_serial(lines: Iterable[Optional[str]], assembler: Optional[EventAssembler] = None) -> Iterator[List[AuditRecord]]:
+    """Group audit.log lines into events (lists of records of one serial).
+
+    Records of different events may be interleaved; see EventAssembler. A None
+    item in lines is an idle tick: events older than the assembler timeout
+    (against the wall clock) are flushed.
+    """
+    if assembler is None:
+        assembler = EventAssembler()
+    for line in lines:
+        if line is None:
+            events = assembler.flush_expired(time.time())
         else:
-            yield bucket
-            current = rec.serial
-            bucket = [rec]
-    if bucket:
-        yield bucket
+            rec = parse_record(line)
+            if rec is None:
+                continue
+            events = assembler.add(rec)
+        for records in events:
+            if records:
+                yield records
+    for records in assembler.flush_all():
+        if records:
+            yield records
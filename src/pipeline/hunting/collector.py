@@ -1,32 +1,63 @@
 from __future__ import annotations
 import argparse
+import os
+import signal
 import time
 from pathlib import Path
 import logging
 
 from src.common.logging import setup_logging
-from src.common.io import append_jsonl
-from src.pipeline.hunting.audit_stream import group_by_serial
+from src.common.io import append_jsonl, rotated_files
+from src.pipeline.hunting.audit_stream import EventAssembler, parse_record
+from src.pipeline.hunting.event_store import make_event_writer
+from src.pipeline.hunting.collector_pipeline import run_pipeline
+from src.pipeline.hunting.follower import AuditFollower
 from src.pipeline.hunting.normalizer import normalize_records
 
 log = logging.getLogger(__name__)
 
-def follow(path: Path, sleep: float = 0.2):
-    # tail -F like follow
-    with path.open("r", encoding="utf-8", errors="ignore") as f:
-        f.seek(0, 2)
-        while True:
-            line = f.readline()
-            if not line:
-                time.sleep(sleep)
-                continue
-            yield line
+def _truncate_output(out_path: Path, path: Path, size: int) -> None:
+    # output written after the last offset checkpoint is produced again from
+    # the checkpointed offset, so it is dropped instead of duplicated: the tail
+    # of the checkpointed file and, with rotation, the files of the set
+    # (out_path) opened after it
+    files = [p.resolve() for p in rotated_files(out_path)]
+    if path.resolve() in files:
+        for later in files[files.index(path.resolve()) + 1:]:
+            log.warning("Dropping %s, rotated after the last checkpoint", later)
+            later.unlink()
+    if path.is_file() and path.stat().st_size > size:
+        log.warning("Dropping %d bytes of %s written after the last checkpoint", path.stat().st_size - size, path)
+        os.truncate(path, size)
+
+def _exit_on_signal(signum, frame):
+    raise SystemExit(0)
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--audit-log", required=True)
     ap.add_argument("--out", required=True)
+    ap.add_argument("--events-format", choices=["jsonl", "msgpack"], default="jsonl",
+                    help="Output encoding (msgpack: length-prefixed columnar frames, see event_store)")
     ap.add_argument("--log-level", default="INFO")
+    ap.add_argument("--reorder-timeout", type=float, default=2.0, help="Seconds an incomplete event waits for its records")
+    ap.add_argument("--max-open-events", type=int, default=10000, help="Open events kept for reassembly")
+    ap.add_argument("--buffer-size", type=int, default=1000, help="Events buffered before a write")
+    ap.add_argument("--flush-interval", type=float, default=1.0, help="Max seconds an event stays buffered")
+    ap.add_argument("--rotate-mb", type=float, default=0, help="Rotate the output after this many MB (0 = off)")
+    ap.add_argument("--rotate-hourly", action="store_true", help="Start a new output file every hour")
+    ap.add_argument("--fsync-on-rotate", action="store_true", help="fsync each output file when it is rotated")
+    ap.add_argument("--offset-checkpoint", default=None,
+                    help="File persisting the audit.log read offset (default: <out>.offset, 'none' disables)")
+    ap.add_argument("--checkpoint-interval", type=float, default=5.0, help="Seconds between offset checkpoints")
+    ap.add_argument("--from-start", action="store_true", help="Without a checkpoint, read audit.log from its beginning")
+    ap.add_argument("--read-block-kb", type=int, default=1024, help="audit.log read size")
+    ap.add_argument("--metrics-out", default=None, help="Append follower/assembly metrics (JSONL)")
+    ap.add_argument("--metrics-interval", type=float, default=10.0, help="Seconds between metrics rows")
+    ap.add_argument("--workers", type=int, default=0,
+                    help="Parse/normalize worker processes (0 = single-process collector)")
+    ap.add_argument("--queue-blocks", type=int, default=8, help="With --workers, read blocks queued per worker")
+    ap.add_argument("--replay", action="store_true", help="Stop at the end of the audit log instead of following it")
     args = ap.parse_args()
 
     setup_logging(args.log_level)
@@ -34,11 +65,83 @@ def main():
     out_path = Path(args.out)
     out_path.parent.mkdir(parents=True, exist_ok=True)
 
+    if args.offset_checkpoint is None:
+        checkpoint_path = Path(str(out_path) + ".offset")
+    else:
+        checkpoint_path = None if args.offset_checkpoint == "none" else Path(args.offset_checkpoint)
+    metrics_path = Path(args.metrics_out) if args.metrics_out else None
+
     log.info("Collector following %s -> %s", audit_path, out_path)
-    for recs in group_by_serial(follow(audit_path)):
-        ev = normalize_records(recs)
-        if ev:
-            append_jsonl(out_path, ev)
+    follower = AuditFollower(audit_path, checkpoint_path=checkpoint_path, from_start=args.from_start,
+                             block_size=args.read_block_kb * 1024)
+    state = follower.checkpoint_state
+    if state and state.get("out"):
+        _truncate_output(out_path, Path(state["out"]), int(state["out_size"]))
+    writer_kwargs = dict(
+        buffer_size=args.buffer_size,
+        flush_interval=args.flush_interval,
+        rotate_bytes=int(args.rotate_mb * 2**20) or None,
+        rotate_hourly=args.rotate_hourly,
+        fsync_on_rotate=args.fsync_on_rotate,
+    )
+    # SIGTERM unwinds through the finally blocks below so buffered events are written
+    signal.signal(signal.SIGTERM, _exit_on_signal)
+    if args.workers > 0:
+        run_pipeline(
+            follower, out_path, args.events_format, n_workers=args.workers, writer_kwargs=writer_kwargs,
+            checkpoint_interval=args.checkpoint_interval if checkpoint_path is not None else float("inf"),
+            reorder_timeout=args.reorder_timeout, max_open_events=args.max_open_events,
+            queue_blocks=args.queue_blocks, metrics_path=metrics_path, metrics_interval=args.metrics_interval,
+            replay=args.replay,
+        )
+        return
+
+    assembler = EventAssembler(timeout_seconds=args.reorder_timeout, max_open=args.max_open_events)
+    writer = make_event_writer(args.events_format, out_path, **writer_kwargs)
+
+    def write_events(events):
+        for recs in events:
+            ev = normalize_records(recs) if recs else None
+            if ev:
+                writer.write(ev)
+
+    def checkpoint(position=None, skip=()):
+        # the offset only covers events that reached the output file
+        writer.flush()
+        out = writer.current_path
+        follower.save_checkpoint(position, skip, out=str(out) if out else None, out_size=writer.current_size)
+
+    assembler.skip(follower.skip_serials)
+    last_checkpoint = last_metrics = time.monotonic()
+    try:
+        for line in follower.lines():
+            if line is None:
+                if args.replay:
+                    break
+                events = assembler.flush_expired(time.time())
+            else:
+                rec = parse_record(line)
+                if rec is None:
+                    continue
+                events = assembler.add(rec, follower.line_position)
+            write_events(events)
+
+            now = time.monotonic()
+            if checkpoint_path is not None and now - last_checkpoint >= args.checkpoint_interval:
+                checkpoint(*assembler.resume_point(follower.position))
+                last_checkpoint = now
+            if metrics_path is not None and now - last_metrics >= args.metrics_interval:
+                append_jsonl(metrics_path, {"ts": time.time(), "open_events": len(assembler),
+                                            **follower.metrics(), **assembler.counters})
+                last_metrics = now
+    finally:
+        write_events(assembler.flush_all())
+        # every consumed line is now in the output
+        checkpoint()
+        writer.close()
+        log.info("Follower: %s", follower.metrics())
+        log.info("Event assembly: %s", assembler.counters)
+        follower.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,314 @@
+from __future__ import annotations
+import heapq
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import time
+from array import array
+from operator import itemgetter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.common.io import JsonlWriter, append_jsonl
+from src.pipeline.hunting.audit_stream import EventAssembler, parse_record
+from src.pipeline.hunting.event_store import MsgpackWriter, make_event_writer
+from src.pipeline.hunting.follower import AuditFollower, write_checkpoint
+from src.pipeline.hunting.normalizer import normalize_records
+
+log = logging.getLogger(__name__)
+
+# Multi-process collector: reader -> N parse/normalize workers -> one writer.
+#
+# The reader (calling process) follows audit.log in blocks and routes every
+# line to worker serial % N, so all records of an event meet in the same
+# worker's EventAssembler. Each block is sent to every worker (possibly with
+# no lines) under a sequence number; a worker answers each block with the
+# events it completed, tagged with the position of the completing record.
+# The writer process waits until all N answers of the next block are in,
+# merges them by position (the order a single-process collector would have
+# written them in) and writes them. Workers encode events themselves, so the
+# writer only concatenates.
+#
+# All queues are bounded: a slow writer blocks the workers, which block the
+# reader, which stops reading (lag_bytes grows) - backpressure instead of
+# unbounded buffering.
+#
+# Offset checkpoints keep one resume point per partition (worker), so a
+# restart with the same number of workers neither skips nor duplicates
+# events; with a different number, events in flight may be written twice.
+
+# reader -> worker messages: (seq, generation, inode, lines joined by b"\n",
+# line offsets, block end offset, idle tick time or None, final)
+
+def _ignore_signals() -> None:
+    # shutdown is driven by the reader through the queues
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+def _get(q: Any, parent_pid: int) -> Any:
+    """q.get() that gives up (returns None) when the parent process is gone."""
+    while True:
+        try:
+            return q.get(timeout=1.0)
+        except queue.Empty:
+            if os.getppid() != parent_pid:
+                return None
+
+def partition_lines(lines: List[bytes], start: int, n: int) -> Tuple[List[List[bytes]], List["array[int]"]]:
+    """Splits a block by audit serial; lines without a msg=audit(...) header are dropped."""
+    parts: List[List[bytes]] = [[] for _ in range(n)]
+    offsets = [array("q") for _ in range(n)]
+    off = start
+    for raw in lines:
+        i = raw.find(b"msg=audit(")
+        if i >= 0:
+            j = raw.find(b")", i)
+            try:
+                w = int(raw[raw.rfind(b":", i, j) + 1 : j]) % n
+            except ValueError:
+                w = -1
+            if w >= 0:
+                parts[w].append(raw)
+                offsets[w].append(off)
+        off += len(raw) + 1
+    return parts, offsets
+
+def _worker_main(index: int, in_q: Any, out_q: Any, timeout_seconds: float, max_open: int, encode: Any,
+                 floor: Optional[Tuple[int, int]], skip: List[str], parent_pid: int) -> None:
+    _ignore_signals()
+    assembler = EventAssembler(timeout_seconds=timeout_seconds, max_open=max_open)
+    assembler.skip(skip)
+    stats = {"lines": 0, "events": 0, "busy_seconds": 0.0, "dropped_before_checkpoint": 0}
+    # floor: (inode, offset) this partition had already written up to before a
+    # restart; its lines before that point are dropped
+    floor_file_seen = False
+    while True:
+        msg = _get(in_q, parent_pid)
+        if msg is None:
+            return
+        seq, gen, inode, data, offsets, end, tick, final = msg
+        t0 = time.perf_counter()
+        if floor is not None:
+            if inode == floor[0]:
+                floor_file_seen = True
+            elif floor_file_seen:
+                floor = None
+        out: List[Tuple[Tuple[int, int], Any]] = []
+        if data:
+            for raw, off in zip(data.split(b"\n"), offsets):
+                if floor is not None:
+                    if inode != floor[0] or off < floor[1]:
+                        stats["dropped_before_checkpoint"] += 1
+                        continue
+                    floor = None
+                rec = parse_record(raw.decode("utf-8", errors="ignore"))
+                if rec is None:
+                    continue
+                pos = (gen, off)
+                for recs in assembler.add(rec, pos):
+                    ev = normalize_records(recs)
+                    if ev:
+                        out.append((pos, encode(ev)))
+            stats["lines"] += len(offsets)
+        if final:
+            flushed = assembler.flush_all()
+        elif tick is not None:
+            flushed = assembler.flush_expired(tick)
+        else:
+            flushed = []
+        for recs in flushed:
+            ev = normalize_records(recs) if recs else None
+            if ev:
+                out.append(((gen, end), encode(ev)))
+        stats["events"] += len(out)
+        stats["busy_seconds"] += time.perf_counter() - t0
+        resume = assembler.resume_point((gen, end))
+        out_q.put((seq, index, gen, inode, out, resume, dict(stats, **assembler.counters), final))
+        if final:
+            return
+
+def _writer_main(out_q: Any, done_q: Any, n_workers: int, fmt: str, out_path: Path, writer_kwargs: Dict[str, Any],
+                 audit_path: Path, checkpoint_path: Optional[Path], checkpoint_interval: float,
+                 metrics_path: Optional[Path], metrics_interval: float, parent_pid: int) -> None:
+    _ignore_signals()
+    writer = make_event_writer(fmt, out_path, **writer_kwargs)
+    inodes: Dict[int, int] = {}
+    pending: Dict[int, List[Any]] = {}
+    worker_stats: List[Dict[str, Any]] = [{} for _ in range(n_workers)]
+    next_seq = 0
+    written = 0
+    start = last_checkpoint = last_metrics = time.monotonic()
+    written_at_metrics = 0
+
+    def checkpoint(resumes: List[Tuple[Tuple[int, int], List[str]]]) -> None:
+        writer.flush()
+        if any(inodes.get(gen) is None for (gen, _), _ in resumes):
+            # nothing read yet
+            return
+        parts = [{"inode": inodes[gen], "offset": off, "skip": skip} for (gen, off), skip in resumes]
+        (gen, off), _ = min(resumes, key=itemgetter(0))
+        skip_all = sorted(set().union(*(skip for _, skip in resumes)))
+        out = writer.current_path
+        write_checkpoint(checkpoint_path, {
+            "path": str(audit_path), "inode": inodes[gen], "offset": off, "skip": skip_all,
+            "partitions": parts, "out": str(out) if out else None, "out_size": writer.current_size,
+        })
+
+    try:
+        while True:
+            msg = _get(out_q, parent_pid)
+            if msg is None:
+                return
+            seq, index, gen, inode, events, resume, stats, final = msg
+            inodes[gen] = inode
+            worker_stats[index] = stats
+            slot = pending.setdefault(seq, [None] * n_workers)
+            slot[index] = (events, resume, final)
+            finished = False
+            while next_seq in pending and all(r is not None for r in pending[next_seq]):
+                results = pending.pop(next_seq)
+                next_seq += 1
+                merged = heapq.merge(*(r[0] for r in results), key=itemgetter(0))
+                writer.write_encoded(item for _, item in merged)
+                written += sum(len(r[0]) for r in results)
+                finished = results[0][2]
+                now = time.monotonic()
+                if checkpoint_path is not None and (finished or now - last_checkpoint >= checkpoint_interval):
+                    checkpoint([r[1] for r in results])
+                    last_checkpoint = now
+                if metrics_path is not None and now - last_metrics >= metrics_interval:
+                    append_jsonl(metrics_path, {
+                        "ts": time.time(), "stage": "writer", "events": written,
+                        "events_per_second": (written - written_at_metrics) / (now - last_metrics),
+                        "pending_blocks": len(pending), "out_queue_depth": out_q.qsize(),
+                    })
+                    for i, ws in enumerate(worker_stats):
+                        append_jsonl(metrics_path, {"ts": time.time(), "stage": "worker", "worker": i, **ws})
+                    last_metrics, written_at_metrics = now, written
+                if finished:
+                    break
+            if finished:
+                break
+    finally:
+        writer.close()
+        done_q.put({"events": written, "seconds": time.monotonic() - start, "workers": worker_stats})
+
+def _partition_floors(follower: AuditFollower, n_workers: int) -> Tuple[List[Optional[Tuple[int, int]]], List[List[str]]]:
+    """Per-worker (floor, skip) from the checkpoint; without per-partition state
+    (single-process checkpoint, other worker count, files gone) every worker
+    resumes at the global offset."""
+    state = follower.checkpoint_state or {}
+    parts = state.get("partitions")
+    if parts and len(parts) == n_workers and follower.locate(int(state["inode"])) is not None:
+        floors: List[Optional[Tuple[int, int]]] = []
+        for p in parts:
+            located = follower.locate(int(p["inode"]))
+            valid = located is not None and located.stat().st_size >= int(p["offset"])
+            floors.append((int(p["inode"]), int(p["offset"])) if valid else None)
+        return floors, [list(p.get("skip", [])) for p in parts]
+    if parts and len(parts) != n_workers:
+        log.warning("Checkpoint was written with %d workers, resuming with %d: events in flight may be duplicated",
+                    len(parts), n_workers)
+    return [None] * n_workers, [list(follower.skip_serials) for _ in range(n_workers)]
+
+def run_pipeline(
+    follower: AuditFollower,
+    out_path: Path,
+    events_format: str = "jsonl",
+    n_workers: int = 2,
+    writer_kwargs: Optional[Dict[str, Any]] = None,
+    checkpoint_interval: float = 5.0,
+    reorder_timeout: float = 2.0,
+    max_open_events: int = 10000,
+    queue_blocks: int = 8,
+    metrics_path: Optional[Path] = None,
+    metrics_interval: float = 10.0,
+    replay: bool = False,
+) -> Dict[str, Any]:
+    """Runs the collector pipeline until SIGTERM/SIGINT (or, with replay,
+    until the end of the audit log); returns the writer's totals."""
+    encode = MsgpackWriter.encode if events_format == "msgpack" else JsonlWriter.encode
+    parent_pid = os.getpid()
+    floors, skips = _partition_floors(follower, n_workers)
+    in_qs = [multiprocessing.Queue(maxsize=queue_blocks) for _ in range(n_workers)]
+    out_q = multiprocessing.Queue(maxsize=queue_blocks * n_workers)
+    done_q = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(
+            target=_worker_main, name=f"collector-parse-{i}", daemon=True,
+            args=(i, in_qs[i], out_q, reorder_timeout, max_open_events, encode, floors[i], skips[i], parent_pid),
+        )
+        for i in range(n_workers)
+    ]
+    writer = multiprocessing.Process(
+        target=_writer_main, name="collector-writer", daemon=True,
+        args=(out_q, done_q, n_workers, events_format, out_path, writer_kwargs or {}, follower.path,
+              follower.checkpoint_path, checkpoint_interval, metrics_path, metrics_interval, parent_pid),
+    )
+    for p in workers + [writer]:
+        p.start()
+
+    # SIGTERM/SIGINT only stop the reader between blocks: a block always
+    # reaches every worker, so all of them get the final message below under
+    # the same seq (a partial fan-out would leave the writer waiting for a
+    # block that never completes)
+    stop: List[int] = []
+    previous = {sig: signal.signal(sig, lambda signum, frame: stop.append(signum))
+                for sig in (signal.SIGTERM, signal.SIGINT)}
+    seq = 0
+    lines_at_metrics = 0
+    last_metrics = t0 = time.monotonic()
+    try:
+        for block in follower.blocks():
+            if block is None:
+                if replay:
+                    break
+                tick = time.time()
+                gen, end = follower.position
+                inode = follower.inode_of(gen)
+                for q in in_qs:
+                    q.put((seq, gen, inode, b"", array("q"), end, tick, False))
+            else:
+                gen, start, lines = block
+                inode = follower.inode_of(gen)
+                end = follower.offset
+                parts, offsets = partition_lines(lines, start, n_workers)
+                for q, part, offs in zip(in_qs, parts, offsets):
+                    q.put((seq, gen, inode, b"\n".join(part), offs, end, None, False))
+            seq += 1
+            if stop:
+                log.info("Collector pipeline stopping on signal %d", stop[0])
+                break
+            now = time.monotonic()
+            if metrics_path is not None and now - last_metrics >= metrics_interval:
+                m = follower.metrics()
+                append_jsonl(metrics_path, {
+                    "ts": time.time(), "stage": "reader", **m,
+                    "lines_per_second": (m["lines"] - lines_at_metrics) / (now - last_metrics),
+                    "in_queue_depths": [q.qsize() for q in in_qs], "out_queue_depth": out_q.qsize(),
+                })
+                last_metrics, lines_at_metrics = now, m["lines"]
+    finally:
+        # flush every partition and wait for the writer's final checkpoint
+        gen, end = follower.position
+        inode = follower.inode_of(gen)
+        for q in in_qs:
+            q.put((seq, gen, inode, b"", array("q"), end, None, True))
+        summary: Dict[str, Any] = {"events": None, "seconds": None}
+        while writer.is_alive() or not done_q.empty():
+            try:
+                summary = done_q.get(timeout=1.0)
+                break
+            except queue.Empty:
+                continue
+        for p in workers + [writer]:
+            p.join()
+        follower.close()
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+    summary["lines"] = follower.counters["lines"]
+    summary["reader_seconds"] = time.monotonic() - t0
+    log.info("Collector pipeline: %s", summary)
+    return summary
@@ -0,0 +1,383 @@
+from __future__ import annotations
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+
+# Array-backed directed graph for the hunting window.
+#
+# Node keys (e.g. "p:1234") are interned to integer ids, node attributes are
+# int32 columns pointing into a shared string table, and edges live in NumPy
+# columns (src, dst, etype, ts, alive). Edges are append-only: re-adding
+# (u, v) appends a new row and the last row per (u, v) wins, like
+# nx.DiGraph.add_edge overwriting attributes. Superseded and expired rows
+# are dropped by compact().
+#
+# Only the subset of the networkx API used by seeding, extractor and
+# export_megr is provided: nodes / nodes(data=True) / nodes[n],
+# edges(data=True), predecessors, successors, subgraph, copy,
+# number_of_nodes, number_of_edges.
+# The extractor reads the edge columns, node types and CSR adjacency
+# directly (edge_arrays, attr_codes, csr, key_list).
+
+NODE_ATTRS = ("ntype", "exe", "comm", "path", "saddr")
+_UNSET = -1
+
+
+class StringTable:
+    def __init__(self) -> None:
+        self._ids: Dict[str, int] = {}
+        self._strs: List[str] = []
+
+    def intern(self, s: str) -> int:
+        i = self._ids.get(s)
+        if i is None:
+            i = len(self._strs)
+            self._ids[s] = i
+            self._strs.append(s)
+        return i
+
+    def __getitem__(self, i: int) -> str:
+        return self._strs[i]
+
+    def __len__(self) -> int:
+        return len(self._strs)
+
+
+class _Column:
+    __slots__ = ("data", "n")
+
+    def __init__(self, dtype: Any, capacity: int = 1024, fill: Any = 0) -> None:
+        self.data = np.full(capacity, fill, dtype=dtype)
+        self.n = 0
+
+    def _reserve(self, extra: int) -> None:
+        need = self.n + extra
+        if need <= len(self.data):
+            return
+        cap = max(need, 2 * len(self.data))
+        grown = np.empty(cap, dtype=self.data.dtype)
+        grown[: self.n] = self.data[: self.n]
+        self.data = grown
+
+    def append(self, v: Any) -> None:
+        self._reserve(1)
+        self.data[self.n] = v
+        self.n += 1
+
+    def extend(self, arr: np.ndarray) -> None:
+        self._reserve(len(arr))
+        self.data[self.n : self.n + len(arr)] = arr
+        self.n += len(arr)
+
+    def view(self) -> np.ndarray:
+        return self.data[: self.n]
+
+    def keep(self, mask: np.ndarray) -> None:
+        kept = self.view()[mask]
+        self.data = np.array(kept, copy=True)
+        self.n = len(kept)
+        self._reserve(1024)
+
+    def __len__(self) -> int:
+        return self.n
+
+
+class _NodeView:
+    def __init__(self, g: "CompactDiGraph") -> None:
+        self._g = g
+
+    def __call__(self, data: bool = False) -> Iterator[Any]:
+        if data:
+            return ((n, self._g._node_attrs(i)) for i, n in self._g._iter_live_nodes())
+        return (n for _i, n in self._g._iter_live_nodes())
+
+    def __iter__(self) -> Iterator[str]:
+        return self(data=False)
+
+    def __len__(self) -> int:
+        return self._g.number_of_nodes()
+
+    def __contains__(self, n: object) -> bool:
+        return n in self._g._ids
+
+    def __getitem__(self, n: str) -> Dict[str, Any]:
+        return self._g._node_attrs(self._g._ids[n])
+
+
+class CompactDiGraph:
+    def __init__(self) -> None:
+        self._ids: Dict[str, int] = {}
+        self._keys: List[Optional[str]] = []
+        self._free: List[int] = []
+        self._strings = StringTable()
+        self._nattr = {a: _Column(np.int32, fill=_UNSET) for a in NODE_ATTRS}
+        self._extra: Dict[int, Dict[str, Any]] = {}
+
+        self._etypes = StringTable()
+        self._src = _Column(np.int32)
+        self._dst = _Column(np.int32)
+        self._etype = _Column(np.int16)
+        self._ts = _Column(np.float64)
+        self._alive = _Column(np.bool_)
+
+        self._last: Optional[np.ndarray] = None   # cached live rows (last write per (u, v))
+        self._csr: Optional[Tuple[np.ndarray, ...]] = None
+
+    # ---- nodes ---------------------------------------------------------
+
+    @property
+    def nodes(self) -> _NodeView:
+        return _NodeView(self)
+
+    def _iter_live_nodes(self) -> Iterator[Tuple[int, str]]:
+        for i, n in enumerate(self._keys):
+            if n is not None:
+                yield i, n
+
+    def _node_id(self, n: str) -> int:
+        i = self._ids.get(n)
+        if i is not None:
+            return i
+        if self._free:
+            i = self._free.pop()
+            self._keys[i] = n
+        else:
+            i = len(self._keys)
+            self._keys.append(n)
+            for col in self._nattr.values():
+                col.append(_UNSET)
+        self._ids[n] = i
+        return i
+
+    def _node_attrs(self, i: int) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        for a, col in self._nattr.items():
+            sid = col.data[i]
+            if sid != _UNSET:
+                out[a] = self._strings[int(sid)]
+        extra = self._extra.get(i)
+        if extra:
+            out.update(extra)
+        return out
+
+    def _set_attrs(self, i: int, attrs: Dict[str, Any]) -> None:
+        for a, v in attrs.items():
+            col = self._nattr.get(a)
+            if col is not None and isinstance(v, str):
+                col.data[i] = self._strings.intern(v)
+            else:
+                self._extra.setdefault(i, {})[a] = v
+
+    def add_node(self, n: str, **attrs: Any) -> None:
+        self._set_attrs(self._node_id(n), attrs)
+
+    def add_nodes_from(self, nodes: Iterable[Any]) -> None:
+        for item in nodes:
+            if isinstance(item, tuple):
+                n, attrs = item
+                self._set_attrs(self._node_id(n), attrs)
+            else:
+                self._node_id(item)
+
+    def node_ids(self, nodes: Iterable[str]) -> np.ndarray:
+        ids = self._ids
+        return np.fromiter((ids[n] for n in nodes if n in ids), dtype=np.int64)
+
+    def node_keys(self, ids: np.ndarray) -> List[Optional[str]]:
+        keys = self._keys
+        return [keys[i] for i in ids.tolist()]
+
+    def key_list(self) -> List[Optional[str]]:
+        """Node key per id (None for free ids); shared, do not modify."""
+        return self._keys
+
+    def node_attrs(self, i: int) -> Dict[str, Any]:
+        return self._node_attrs(i)
+
+    def attr_codes(self, a: str) -> Tuple[np.ndarray, List[Optional[str]]]:
+        """(codes, values): value of attribute a (one of NODE_ATTRS) per node
+        id as values[codes[i]]; None for free ids and nodes without it."""
+        col = self._nattr[a].view()
+        uniq, codes = np.unique(col, return_inverse=True)
+        return codes.reshape(-1), [self._strings[int(s)] if s != _UNSET else None for s in uniq.tolist()]
+
+    def remove_node_ids(self, ids: np.ndarray) -> None:
+        # caller guarantees the nodes have no live edges
+        for i in ids.tolist():
+            n = self._keys[i]
+            if n is None:
+                continue
+            del self._ids[n]
+            self._keys[i] = None
+            for col in self._nattr.values():
+                col.data[i] = _UNSET
+            self._extra.pop(i, None)
+            self._free.append(i)
+
+    def number_of_nodes(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, n: object) -> bool:
+        return n in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.nodes)
+
+    # ---- edges ---------------------------------------------------------
+
+    def _invalidate(self) -> None:
+        self._last = None
+        self._csr = None
+
+    def add_edge(self, u: str, v: str, etype: str = "OTHER", ts: float = 0.0, **_: Any) -> None:
+        self._src.append(self._node_id(u))
+        self._dst.append(self._node_id(v))
+        self._etype.append(self._etypes.intern(etype))
+        self._ts.append(ts)
+        self._alive.append(True)
+        self._invalidate()
+
+    def add_edges_from(self, edges: Iterable[Tuple[str, str, Dict[str, Any]]]) -> None:
+        src: List[int] = []
+        dst: List[int] = []
+        et: List[int] = []
+        ts: List[float] = []
+        for u, v, dat in edges:
+            src.append(self._node_id(u))
+            dst.append(self._node_id(v))
+            et.append(self._etypes.intern(dat.get("etype", "OTHER")))
+            ts.append(float(dat.get("ts", 0.0)))
+        if not src:
+            return
+        self._src.extend(np.asarray(src, dtype=np.int32))
+        self._dst.extend(np.asarray(dst, dtype=np.int32))
+        self._etype.extend(np.asarray(et, dtype=np.int16))
+        self._ts.extend(np.asarray(ts, dtype=np.float64))
+        self._alive.extend(np.ones(len(src), dtype=np.bool_))
+        self._invalidate()
+
+    def _live_rows(self) -> np.ndarray:
+        # rows holding the last write per (u, v) that have not expired,
+        # in insertion order
+        if self._last is None:
+            n = len(self._src)
+            if n == 0:
+                self._last = np.empty(0, dtype=np.int64)
+            else:
+                key = (self._src.view().astype(np.int64) << 32) | self._dst.view().astype(np.int64)
+                _, ridx = np.unique(key[::-1], return_index=True)
+                last = np.sort((n - 1) - ridx)
+                self._last = last[self._alive.view()[last]]
+        return self._last
+
+    def number_of_edges(self) -> int:
+        return len(self._live_rows())
+
+    def edges(self, data: bool = False) -> Iterator[Any]:
+        rows = self._live_rows()
+        src = self._src.view()[rows].tolist()
+        dst = self._dst.view()[rows].tolist()
+        if not data:
+            return ((self._keys[u], self._keys[v]) for u, v in zip(src, dst))
+        et = self._etype.view()[rows].tolist()
+        ts = self._ts.view()[rows].tolist()
+        return (
+            (self._keys[u], self._keys[v], {"etype": self._etypes[e], "ts": t})
+            for u, v, e, t in zip(src, dst, et, ts)
+        )
+
+    def edge_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        rows = self._live_rows()
+        return self._src.view()[rows], self._dst.view()[rows], self._etype.view()[rows], self._ts.view()[rows]
+
+    def etype_names(self) -> List[str]:
+        """Edge type per etype id of edge_arrays()."""
+        return [self._etypes[i] for i in range(len(self._etypes))]
+
+    def expire(self, cutoff: float) -> np.ndarray:
+        # mark rows older than cutoff dead; return endpoint ids of expired rows
+        alive = self._alive.view()
+        hit = alive & (self._ts.view() < cutoff)
+        if not hit.any():
+            return np.empty(0, dtype=np.int32)
+        alive[hit] = False
+        self._invalidate()
+        return np.unique(np.concatenate([self._src.view()[hit], self._dst.view()[hit]]))
+
+    def edge_rows(self) -> int:
+        # physical rows, including expired and superseded ones
+        return len(self._src)
+
+    def isolate_ids(self) -> np.ndarray:
+        src, dst, _, _ = self.edge_arrays()
+        size = len(self._keys)
+        deg = np.bincount(src, minlength=size) + np.bincount(dst, minlength=size)
+        live = np.fromiter((n is not None for n in self._keys), dtype=np.bool_, count=size)
+        return np.flatnonzero((deg == 0) & live)
+
+    def compact(self) -> None:
+        # drop expired and superseded edge rows
+        rows = self._live_rows()
+        if len(rows) == len(self._src):
+            return
+        mask = np.zeros(len(self._src), dtype=np.bool_)
+        mask[rows] = True
+        for col in (self._src, self._dst, self._etype, self._ts, self._alive):
+            col.keep(mask)
+        self._invalidate()
+
+    # ---- adjacency -----------------------------------------------------
+
+    def _adjacency(self) -> Tuple[np.ndarray, ...]:
+        # (out_ptr, out_idx, in_ptr, in_idx, out_pos, in_pos): neighbor ids and
+        # positions in edge_arrays() of every node's out- and in-edges
+        if self._csr is None:
+            src, dst, _, _ = self.edge_arrays()
+            size = len(self._keys)
+            out_order = np.argsort(src, kind="stable")
+            in_order = np.argsort(dst, kind="stable")
+            out_ptr = np.zeros(size + 1, dtype=np.int64)
+            in_ptr = np.zeros(size + 1, dtype=np.int64)
+            np.cumsum(np.bincount(src, minlength=size), out=out_ptr[1:])
+            np.cumsum(np.bincount(dst, minlength=size), out=in_ptr[1:])
+            self._csr = (out_ptr, dst[out_order], in_ptr, src[in_order], out_order, in_order)
+        return self._csr
+
+    def csr(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """(out_ptr, out_pos, in_ptr, in_pos): the edges of node i are
+        out_pos[out_ptr[i]:out_ptr[i + 1]] (positions in edge_arrays()), its
+        in-edges in_pos[in_ptr[i]:in_ptr[i + 1]]. Cached until the next change."""
+        out_ptr, _, in_ptr, _, out_pos, in_pos = self._adjacency()
+        return out_ptr, out_pos, in_ptr, in_pos
+
+    def successors(self, n: str) -> Iterator[str]:
+        i = self._ids[n]
+        out_ptr, out_idx = self._adjacency()[:2]
+        return (self._keys[j] for j in out_idx[out_ptr[i] : out_ptr[i + 1]].tolist())
+
+    def predecessors(self, n: str) -> Iterator[str]:
+        i = self._ids[n]
+        in_ptr, in_idx = self._adjacency()[2:4]
+        return (self._keys[j] for j in in_idx[in_ptr[i] : in_ptr[i + 1]].tolist())
+
+    # ---- views / copies ------------------------------------------------
+
+    def subgraph(self, nodes: Iterable[str]) -> "CompactDiGraph":
+        keep = [self._ids[n] for n in nodes if n in self._ids]
+        sub = CompactDiGraph()
+        for i in keep:
+            sub.add_node(self._keys[i], **self._node_attrs(i))
+        mask = np.zeros(len(self._keys), dtype=np.bool_)
+        mask[keep] = True
+        src, dst, et, ts = self.edge_arrays()
+        sel = mask[src] & mask[dst]
+        sub.add_edges_from(
+            (self._keys[u], self._keys[v], {"etype": self._etypes[e], "ts": t})
+            for u, v, e, t in zip(src[sel].tolist(), dst[sel].tolist(), et[sel].tolist(), ts[sel].tolist())
+        )
+        return sub
+
+    def copy(self) -> "CompactDiGraph":
+        return self.subgraph(list(self.nodes))
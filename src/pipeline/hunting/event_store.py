@@ -0,0 +1,247 @@
+from __future__ import annotations
+import argparse
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from src.common.io import JsonlTail, JsonlWriter, read_jsonl_batches, rotated_files
+from src.pipeline.hunting.normalizer import AuditEvent
+from src.pipeline.hunting.syscalls import ACTION_CODES, READ
+
+# Binary event stores for the hunting replay, next to the JSONL default.
+#
+# msgpack: a stream of length-prefixed frames (<u32 little-endian length>
+# <msgpack map>), one frame per writer flush. A frame holds its events column
+# by column ({"n": count, "cols": {field: [values...]}}), so a replay decodes
+# a whole frame with one unpackb call and hands the columns to
+# WindowedProvenanceGraph.ingest_columns without building per-event dicts.
+# A torn frame at the end of a file (writer killed mid-flush) is ignored.
+#
+# parquet: columnar compaction of a msgpack (or JSONL) log, read back in
+# record batches. Needs pyarrow.
+
+EVENT_FORMATS = ("jsonl", "msgpack", "parquet")
+
+# fields written by normalizer.normalize_records; other keys are not stored.
+# action (a syscalls action code) and syscall (the number) are integers.
+EVENT_COLUMNS = AuditEvent._fields
+
+_FRAME_HEADER = struct.Struct("<I")
+
+# action names of older collectors; their OTHER was ingested as READ
+_LEGACY_ACTIONS = dict(ACTION_CODES, OTHER=READ)
+
+def _msgpack() -> Any:
+    try:
+        import msgpack
+    except ImportError:
+        raise ImportError("The msgpack event format requires the msgpack package (pip install msgpack)")
+    return msgpack
+
+def _pyarrow() -> Any:
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("The parquet event format requires the pyarrow package (pip install pyarrow)")
+    return pyarrow
+
+def events_to_columns(events: Sequence[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Column-oriented copy of events; fields that no event has are left out."""
+    cols: Dict[str, List[Any]] = {}
+    for name in EVENT_COLUMNS:
+        values = [ev.get(name) for ev in events]
+        if any(v is not None for v in values):
+            cols[name] = values
+    if "ts" not in cols:
+        cols["ts"] = [None] * len(events)
+    return cols
+
+def columns_to_events(cols: Dict[str, Sequence[Any]]) -> List[Dict[str, Any]]:
+    names = list(cols)
+    return [{k: v for k, v in zip(names, row) if v is not None} for row in zip(*cols.values())]
+
+def encode_frame(events: Sequence[Dict[str, Any]]) -> bytes:
+    payload = _msgpack().packb({"n": len(events), "cols": events_to_columns(events)}, use_bin_type=True)
+    return _FRAME_HEADER.pack(len(payload)) + payload
+
+def _split_frames(buf: bytes, unpackb: Any) -> Tuple[List[Dict[str, List[Any]]], bytes]:
+    """Decodes the complete frames at the start of buf; returns (frames, rest)."""
+    frames = []
+    pos = 0
+    size = _FRAME_HEADER.size
+    while len(buf) - pos >= size:
+        (n,) = _FRAME_HEADER.unpack_from(buf, pos)
+        if len(buf) - pos - size < n:
+            break
+        frames.append(unpackb(buf[pos + size : pos + size + n], raw=False)["cols"])
+        pos += size + n
+    return frames, buf[pos:]
+
+def _read_frame_file(path: Path, read_size: int = 1 << 24) -> Iterator[Dict[str, List[Any]]]:
+    unpackb = _msgpack().unpackb
+    rest = b""
+    with path.open("rb") as f:
+        while True:
+            chunk = f.read(read_size)
+            if not chunk:
+                break
+            frames, rest = _split_frames(rest + chunk if rest else chunk, unpackb)
+            yield from frames
+
+def read_msgpack_columns(path: Path) -> Iterator[Dict[str, List[Any]]]:
+    """Frames of a msgpack event log (or of the rotated set for path), in order."""
+    files = rotated_files(path)
+    if not files:
+        raise FileNotFoundError(path)
+    for p in files:
+        yield from _read_frame_file(p)
+
+def read_parquet_columns(path: Path, batch_size: int = 65536) -> Iterator[Dict[str, List[Any]]]:
+    pq = _pyarrow().parquet
+    pf = pq.ParquetFile(str(path))
+    for batch in pf.iter_batches(batch_size=batch_size):
+        yield {name: batch.column(i).to_pylist() for i, name in enumerate(batch.schema.names)}
+
+def read_event_columns(path: Path, fmt: str, batch_size: int = 5000) -> Iterator[Dict[str, List[Any]]]:
+    """Column batches of an event log in any EVENT_FORMATS (JSONL is converted per batch)."""
+    if fmt == "msgpack":
+        return read_msgpack_columns(path)
+    if fmt == "parquet":
+        return read_parquet_columns(path, batch_size)
+    if fmt == "jsonl":
+        return (events_to_columns(batch) for batch in read_jsonl_batches(path, batch_size))
+    raise ValueError(f"Unknown event format: {fmt!r} (expected one of {EVENT_FORMATS})")
+
+def _parquet_schema() -> Any:
+    pa = _pyarrow()
+    fields = [pa.field("ts", pa.float64())]
+    for name in EVENT_COLUMNS[1:]:
+        if name == "argv":
+            fields.append(pa.field(name, pa.list_(pa.string())))
+        elif name == "action":
+            fields.append(pa.field(name, pa.int8()))
+        elif name == "syscall":
+            fields.append(pa.field(name, pa.int32()))
+        else:
+            fields.append(pa.field(name, pa.string()))
+    return pa.schema(fields)
+
+def _as_text(values: Sequence[Any]) -> List[Optional[str]]:
+    # pid/ppid are ints in the JSONL/msgpack logs but can be unparsed strings;
+    # stored as text they map to the same graph nodes
+    return [v if v is None or isinstance(v, str) else str(v) for v in values]
+
+def _as_int(values: Sequence[Any]) -> List[Optional[int]]:
+    # syscall numbers of older logs are numeric strings
+    return [v if v is None or isinstance(v, int) else (int(v) if str(v).isdigit() else None) for v in values]
+
+def compact_to_parquet(src: Path, dst: Path, src_format: str = "msgpack", row_group_size: int = 65536,
+                       batch_size: int = 5000) -> int:
+    """Rewrites an event log as a single Parquet file; returns the number of events."""
+    pa = _pyarrow()
+    schema = _parquet_schema()
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    count = 0
+    pending: List[Dict[str, List[Any]]] = []
+    pending_rows = 0
+
+    def table(parts: List[Dict[str, List[Any]]]) -> Any:
+        arrays = []
+        for field in schema:
+            values: List[Any] = []
+            for cols in parts:
+                n = len(cols["ts"])
+                values.extend(cols.get(field.name, [None] * n))
+            if field.name == "ts":
+                arrays.append(pa.array([None if v is None else float(v) for v in values], pa.float64()))
+            elif field.name == "argv":
+                arrays.append(pa.array(values, field.type))
+            elif field.name == "action":
+                codes = [v if v is None or isinstance(v, int) else _LEGACY_ACTIONS.get(v) for v in values]
+                arrays.append(pa.array(codes, field.type))
+            elif field.name == "syscall":
+                arrays.append(pa.array(_as_int(values), field.type))
+            else:
+                arrays.append(pa.array(_as_text(values), pa.string()))
+        return pa.Table.from_arrays(arrays, schema=schema)
+
+    with pa.parquet.ParquetWriter(str(dst), schema, use_dictionary=True, compression="zstd") as writer:
+        for cols in read_event_columns(src, src_format, batch_size):
+            pending.append(cols)
+            pending_rows += len(cols["ts"])
+            if pending_rows >= row_group_size:
+                writer.write_table(table(pending), row_group_size=row_group_size)
+                count += pending_rows
+                pending, pending_rows = [], 0
+        if pending:
+            writer.write_table(table(pending), row_group_size=row_group_size)
+            count += pending_rows
+    return count
+
+class MsgpackWriter(JsonlWriter):
+    """JsonlWriter (buffering, rotation, fsync) writing msgpack frames, one per flush."""
+
+    binary = True
+
+    @staticmethod
+    def encode(obj: Dict[str, Any]) -> Any:
+        return obj
+
+    def _chunks(self, pending: List[Any]) -> List[Any]:
+        return [encode_frame(pending)]
+
+class MsgpackTail(JsonlTail):
+    """JsonlTail for msgpack frame logs: read_new returns the events of the
+    frames completed since the last call (whole frames, so possibly a few
+    more than max_items)."""
+
+    binary = True
+
+    def read_new(self, max_items: int) -> List[Dict[str, Any]]:
+        if self._f is None and not self._open_next():
+            return []
+        unpackb = _msgpack().unpackb
+        out: List[Dict[str, Any]] = []
+        while len(out) < max_items:
+            frames, self._partial = _split_frames(self._partial, unpackb)
+            for cols in frames:
+                out.extend(columns_to_events(cols))
+            if len(out) >= max_items:
+                break
+            chunk = self._f.read(1 << 20)
+            if not chunk:
+                # drained: continue with the next rotated file, if any
+                if self._partial or not self._open_next():
+                    break
+                continue
+            self._partial += chunk
+        return out
+
+def make_event_writer(fmt: str, path: Path, **kwargs: Any) -> JsonlWriter:
+    if fmt == "jsonl":
+        return JsonlWriter(path, **kwargs)
+    if fmt == "msgpack":
+        _msgpack()
+        return MsgpackWriter(path, **kwargs)
+    raise ValueError(f"Events can be written as jsonl or msgpack, not {fmt!r} (see compact_to_parquet)")
+
+def make_event_tail(fmt: str, path: Path, from_end: bool = False) -> JsonlTail:
+    if fmt == "jsonl":
+        return JsonlTail(path, from_end=from_end)
+    if fmt == "msgpack":
+        return MsgpackTail(path, from_end=from_end)
+    raise ValueError(f"Only jsonl and msgpack event logs can be followed, not {fmt!r}")
+
+def main():
+    ap = argparse.ArgumentParser(description="Compact a hunting event log into Parquet")
+    ap.add_argument("--src", required=True, help="Event log (base path of a rotated set)")
+    ap.add_argument("--src-format", choices=["jsonl", "msgpack"], default="msgpack")
+    ap.add_argument("--dst", required=True, help="Parquet file to write")
+    ap.add_argument("--row-group-size", type=int, default=65536)
+    args = ap.parse_args()
+    n = compact_to_parquet(Path(args.src), Path(args.dst), args.src_format, args.row_group_size)
+    print(f"Wrote {n} events to {args.dst}")
+
+if __name__ == "__main__":
+    main()
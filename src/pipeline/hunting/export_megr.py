@@ -1,42 +1,113 @@
 from __future__ import annotations
-from typing import Dict, List, Tuple
+from typing import Any, Callable, Dict, List, Sequence, Tuple, Union
 import networkx as nx
+import numpy as np
 import torch
+import torch.nn.functional as F
 from torch_geometric.data import Data
 
-NODE_TYPES = ["process", "file", "socket", "other"]
-EDGE_TYPES = ["FORK", "READ", "WRITE", "CREATE", "DELETE", "CONNECT", "OTHER"]
-
-def _one_hot(idx: int, size: int) -> torch.Tensor:
-    x = torch.zeros(size, dtype=torch.float)
-    x[idx] = 1.0
-    return x
-
-def to_megr_data_list(g: nx.DiGraph, g_name: str) -> List[Data]:
-    # single-graph list (engine expects list[Data])
-    nodes = list(g.nodes())
-    idx = {n:i for i,n in enumerate(nodes)}
-    # edge index
-    edges = list(g.edges(data=True))
-    if edges:
-        edge_index = torch.tensor([[idx[u] for u,v,_ in edges],[idx[v] for u,v,_ in edges]], dtype=torch.long)
-        elabel = torch.tensor([EDGE_TYPES.index((dat.get("etype","OTHER") if dat.get("etype","OTHER") in EDGE_TYPES else "OTHER")) for _,_,dat in edges], dtype=torch.long)
+# Labels come from the engine's per-dataset vocabulary (see
+# engine_repo/src/vocabulary.py): ntypes and normalizer actions map onto
+# dataset labels through its aliases, anything else gets its defaults. They
+# are encoded with numpy for all graphs of an export at once, then nlabel is
+# a single F.one_hot over every node. to_megr_collated returns the
+# (data, slices) pair of InMemoryDataset.collate, which DARPADataset stores
+# as is; to_megr_data_list gives the same graphs as one Data each.
+
+
+def _lut(names: Sequence[Any], label: Callable[[Any], int]) -> np.ndarray:
+    return np.array([label(n) for n in names], dtype=np.int64).reshape(-1)
+
+
+def _encode(g: Any, vocabulary: Any) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(node labels, edge_index (2, E), edge labels) of one graph as int64
+    arrays; node i of edge_index is the i-th node of g.nodes()."""
+    if hasattr(g, "edge_arrays") and hasattr(g, "node_types"):
+        # SubgraphView: label ids through a lookup table per type code
+        codes, names = g.node_types()
+        src, dst, etype, _ts = g.edge_arrays()
+        nlabel = _lut(names, vocabulary.node_label)[codes]
+        elabel = _lut(g.base.etype_names, vocabulary.edge_label)[etype]
+        return nlabel, np.stack([src, dst]).astype(np.int64, copy=False), elabel
+    node_label, edge_label = vocabulary.node_label, vocabulary.edge_label
+    nodes = g.nodes
+    idx = {n: i for i, n in enumerate(nodes)}
+    nlabel = np.fromiter((node_label(dat.get("ntype")) for _, dat in nodes(data=True)),
+                         dtype=np.int64, count=len(idx))
+    num_edges = g.number_of_edges()
+    flat = np.fromiter(
+        (x for u, v, dat in g.edges(data=True) for x in (idx[u], idx[v], edge_label(dat.get("etype", "OTHER")))),
+        dtype=np.int64, count=3 * num_edges,
+    ).reshape(num_edges, 3)
+    return nlabel, np.ascontiguousarray(flat[:, :2].T), flat[:, 2].copy()
+
+
+def _as_list(graphs: Union[nx.DiGraph, Sequence[Any]]) -> List[Any]:
+    # a single graph gives a single-graph export
+    if hasattr(graphs, "nodes"):
+        return [graphs]
+    return list(graphs)
+
+
+def to_megr_collated(graphs: Union[nx.DiGraph, Sequence[Any]], g_name: str,
+                     vocabulary: Any) -> Tuple[Data, Dict[str, torch.Tensor]]:
+    """Candidate subgraphs as the (data, slices) pair InMemoryDataset.collate
+    builds from their to_megr_data_list; edge_index stays local per graph.
+    vocabulary is the engine Vocabulary of the checkpoint's dataset
+    (Predictor.vocabulary)."""
+    encoded = [_encode(g, vocabulary) for g in _as_list(graphs)]
+    node_counts = [len(n) for n, _, _ in encoded]
+    edge_counts = [len(e) for _, _, e in encoded]
+
+    def ptr(counts: List[int]) -> torch.Tensor:
+        return torch.from_numpy(np.concatenate([[0], np.cumsum(counts, dtype=np.int64)]))
+
+    if encoded:
+        nlabel = np.concatenate([n for n, _, _ in encoded])
+        edge_index = np.concatenate([ei for _, ei, _ in encoded], axis=1)
+        elabel = np.concatenate([e for _, _, e in encoded])
     else:
-        edge_index = torch.empty((2,0), dtype=torch.long)
-        elabel = torch.empty((0,), dtype=torch.long)
+        nlabel = elabel = np.empty(0, dtype=np.int64)
+        edge_index = np.empty((2, 0), dtype=np.int64)
+
+    data = Data(edge_index=torch.from_numpy(edge_index), g_name=[g_name] * len(encoded))
+    data._num_nodes = node_counts
+    data.num_nodes = sum(node_counts)
+    data.nlabel = F.one_hot(torch.from_numpy(nlabel), num_classes=vocabulary.num_node_labels).float()
+    data.elabel = torch.from_numpy(elabel)
+    slices = {
+        "edge_index": ptr(edge_counts),
+        "g_name": torch.arange(len(encoded) + 1),
+        "nlabel": ptr(node_counts),
+        "elabel": ptr(edge_counts),
+    }
+    return data, slices
+
+
+def split_collated(data: Data, slices: Dict[str, torch.Tensor]) -> List[Data]:
+    """The graphs of a to_megr_collated pair, one Data each (tensors are views)."""
+    node_ptr = slices["nlabel"].tolist()
+    edge_ptr = slices["edge_index"].tolist()
+    out = []
+    for i in range(len(node_ptr) - 1):
+        e0, e1 = edge_ptr[i], edge_ptr[i + 1]
+        d = Data(edge_index=data.edge_index[:, e0:e1], g_name=data.g_name[i])
+        d.num_nodes = node_ptr[i + 1] - node_ptr[i]
+        d.nlabel = data.nlabel[node_ptr[i]:node_ptr[i + 1]]
+        d.elabel = data.elabel[e0:e1]
+        out.append(d)
+    return out
+
 
-    nlabel = torch.stack([
-        _one_hot(NODE_TYPES.index((g.nodes[n].get("ntype") if g.nodes[n].get("ntype") in NODE_TYPES else "other")), len(NODE_TYPES))
-        for n in nodes
-    ], dim=0)
+def to_megr_data_list(graphs: Union[nx.DiGraph, Sequence[Any]], g_name: str, vocabulary: Any) -> List[Data]:
+    # one Data per candidate subgraph (engine expects list[Data]); a single
+    # graph gives a single-graph list
+    return split_collated(*to_megr_collated(graphs, g_name, vocabulary))
 
-    data = Data(edge_index=edge_index, g_name=g_name)
-    data.num_nodes = len(nodes)
-    data.nlabel = nlabel
-    data.elabel = elabel
-    return [data]
 
-def save_prediction_pt(out_path, data_list: List[Data]) -> None:
+def save_prediction_pt(out_path, data: Union[List[Data], Tuple[Data, Dict[str, torch.Tensor]]]) -> None:
+    # a data list, or a to_megr_collated pair (saved as is, DARPADataset
+    # skips collating it)
     import os
     os.makedirs(os.path.dirname(str(out_path)), exist_ok=True)
-    torch.save(data_list, out_path)
+    torch.save(data, out_path)
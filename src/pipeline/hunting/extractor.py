@@ -1,20 +1,496 @@
 from __future__ import annotations
-from typing import Iterable, List, Set
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+import hashlib
+import logging
 import networkx as nx
+import numpy as np
 
-def k_hop_subgraph(g: nx.DiGraph, seeds: List[str], k: int = 2) -> nx.DiGraph:
-    if not seeds:
-        return g.copy()
-    nodes: Set[str] = set(seeds)
-    frontier: Set[str] = set(seeds)
-    for _ in range(k):
-        nxt: Set[str] = set()
-        for u in frontier:
-            nxt.update(g.predecessors(u))
-            nxt.update(g.successors(u))
-        nxt -= nodes
-        nodes |= nxt
-        frontier = nxt
-        if not frontier:
+from src.pipeline.hunting.compact_graph import CompactDiGraph
+
+log = logging.getLogger(__name__)
+
+# k-hop extraction on a CSR snapshot of the provenance window. Every hop
+# gathers the in- and out-edges of the whole frontier with NumPy index
+# arithmetic instead of per-node set updates, and the result is a
+# SubgraphView: node ids and edge positions into the snapshot, no copy of
+# the graph.
+#
+# Bounding the expansion:
+#   max_fanout       per hop, a frontier node expands through at most this
+#                    many edges (the most recent ones)
+#   hub_out_degree,  nodes above these degrees (init, /etc/ld.so.cache, ...)
+#   hub_in_degree    are kept as leaves but not expanded, unless they are seeds
+#   time_respecting  only follow causally ordered paths: forward along edges
+#                    at or after the time the node was reached, backward
+#                    along edges at or before it. The view then holds the
+#                    followed edges instead of the induced subgraph.
+#
+# extract_candidates turns the seeds of a hunting cycle into a list of
+# query-sized candidates (one per seed cluster, merged on node overlap and
+# deduplicated by structural hash) that MEGRAPT scores in one batch.
+
+
+class CsrGraph:
+    """Read-only CSR snapshot of a provenance graph (either backend).
+
+    Node ids index keys (None for free ids of a CompactDiGraph); the ntype
+    of node i is ntype_names[ntype[i]]. src, dst, etype and ts are aligned
+    edge columns, etype indexing etype_names; the out-edges of node i are
+    out_pos[out_ptr[i]:out_ptr[i + 1]] (positions in the edge columns), its
+    in-edges in_pos[in_ptr[i]:in_ptr[i + 1]].
+    """
+
+    def __init__(
+        self,
+        keys: Sequence[Optional[str]],
+        ids: Dict[str, int],
+        node_attrs: Callable[[int], Dict[str, Any]],
+        src: np.ndarray,
+        dst: np.ndarray,
+        etype: np.ndarray,
+        etype_names: List[str],
+        ts: np.ndarray,
+        ntypes: Tuple[np.ndarray, List[Optional[str]]],
+        csr: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = None,
+    ) -> None:
+        self.keys = keys
+        self.ids = ids
+        self.node_attrs = node_attrs
+        self.ntype, self.ntype_names = ntypes
+        self.src, self.dst, self.etype, self.ts = src, dst, etype, ts
+        self.etype_names = etype_names
+        size = len(keys)
+        if csr is None:
+            out_pos = np.argsort(src, kind="stable")
+            in_pos = np.argsort(dst, kind="stable")
+            out_ptr = np.zeros(size + 1, dtype=np.int64)
+            in_ptr = np.zeros(size + 1, dtype=np.int64)
+            np.cumsum(np.bincount(src, minlength=size), out=out_ptr[1:])
+            np.cumsum(np.bincount(dst, minlength=size), out=in_ptr[1:])
+            csr = (out_ptr, out_pos, in_ptr, in_pos)
+        self.out_ptr, self.out_pos, self.in_ptr, self.in_pos = csr
+        # degrees in the source graph, when the snapshot is a part of it
+        self.degrees: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._expandable: Dict[Tuple[Any, Any], np.ndarray] = {}
+
+    @property
+    def size(self) -> int:
+        return len(self.keys)
+
+    def out_degree(self) -> np.ndarray:
+        return self.degrees[0] if self.degrees is not None else np.diff(self.out_ptr)
+
+    def in_degree(self) -> np.ndarray:
+        return self.degrees[1] if self.degrees is not None else np.diff(self.in_ptr)
+
+    def expandable(self, hub_out_degree: Optional[int], hub_in_degree: Optional[int]) -> Optional[np.ndarray]:
+        """Mask of the nodes within the hub degree limits (None: no limits)."""
+        if not hub_out_degree and not hub_in_degree:
+            return None
+        key = (hub_out_degree, hub_in_degree)
+        mask = self._expandable.get(key)
+        if mask is None:
+            mask = np.ones(self.size, dtype=np.bool_)
+            if hub_out_degree:
+                mask &= self.out_degree() <= hub_out_degree
+            if hub_in_degree:
+                mask &= self.in_degree() <= hub_in_degree
+            self._expandable[key] = mask
+        return mask
+
+    @classmethod
+    def from_graph(cls, g: Any) -> "CsrGraph":
+        if isinstance(g, CompactDiGraph):
+            keys = g.key_list()
+            ids = {n: i for i, n in enumerate(keys) if n is not None}
+            src, dst, etype, ts = g.edge_arrays()
+            return cls(keys, ids, g.node_attrs, src, dst, etype, g.etype_names(), ts, g.attr_codes("ntype"),
+                       csr=g.csr())
+        return cls._from_networkx(g, list(g.nodes()))
+
+    @classmethod
+    def _from_networkx(cls, g: nx.DiGraph, keys: List[str], within: Optional[Set[str]] = None) -> "CsrGraph":
+        # nodes keys and the edges of g between them (all of them without within)
+        ids = {n: i for i, n in enumerate(keys)}
+        names: Dict[str, int] = {}
+        src: List[int] = []
+        dst: List[int] = []
+        etype: List[int] = []
+        ts: List[float] = []
+        succ = g.succ
+        for i, u in enumerate(keys):
+            for v, dat in succ[u].items():
+                if within is not None and v not in within:
+                    continue
+                src.append(i)
+                dst.append(ids[v])
+                name = dat.get("etype", "OTHER")
+                code = names.get(name)
+                if code is None:
+                    code = names[name] = len(names)
+                etype.append(code)
+                ts.append(dat.get("ts", 0.0))
+        nodes = g.nodes
+        ntype_codes: Dict[Optional[str], int] = {}
+        ntype = np.fromiter(
+            (ntype_codes.setdefault(nodes[n].get("ntype"), len(ntype_codes)) for n in keys),
+            dtype=np.int64, count=len(keys),
+        )
+        return cls(keys, ids, lambda i: nodes[keys[i]], np.asarray(src, dtype=np.int64),
+                   np.asarray(dst, dtype=np.int64), np.asarray(etype, dtype=np.int16), list(names),
+                   np.asarray(ts, dtype=np.float64), (ntype, list(ntype_codes)))
+
+    @classmethod
+    def around(cls, g: Any, seeds: Iterable[str], k: int, hub_out_degree: Optional[int] = None,
+               hub_in_degree: Optional[int] = None) -> "CsrGraph":
+        """Snapshot holding everything k_hop_subgraph can reach from seeds.
+
+        A CompactDiGraph keeps its CSR arrays, so the whole graph is used.
+        For an nx.DiGraph, copying all edges costs far more than a narrow
+        extraction: the snapshot covers the subgraph induced by the nodes
+        within k hops, not expanding hubs, and carries the degrees of g.
+        """
+        if isinstance(g, CompactDiGraph):
+            return cls.from_graph(g)
+        succ, pred = g.succ, g.pred
+        start = {n for n in seeds if n in succ}
+        nodes = set(start)
+        frontier = list(start)
+        for _ in range(k):
+            nxt = []
+            for u in frontier:
+                if u not in start and (hub_out_degree and len(succ[u]) > hub_out_degree
+                                       or hub_in_degree and len(pred[u]) > hub_in_degree):
+                    continue
+                for v in (*succ[u], *pred[u]):
+                    if v not in nodes:
+                        nodes.add(v)
+                        nxt.append(v)
+            frontier = nxt
+        snap = cls._from_networkx(g, list(nodes), nodes)
+        keys = snap.keys
+        snap.degrees = (
+            np.fromiter((len(succ[n]) for n in keys), dtype=np.int64, count=len(keys)),
+            np.fromiter((len(pred[n]) for n in keys), dtype=np.int64, count=len(keys)),
+        )
+        return snap
+
+
+class _ViewNodes:
+    def __init__(self, view: "SubgraphView") -> None:
+        self._view = view
+
+    def __call__(self, data: bool = False) -> Iterator[Any]:
+        keys = self._view.keys
+        if data:
+            attrs = self._view.base.node_attrs
+            return ((keys[i], attrs(i)) for i in self._view.node_ids.tolist())
+        return iter(self._view.node_keys())
+
+    def __iter__(self) -> Iterator[str]:
+        return self(data=False)
+
+    def __len__(self) -> int:
+        return len(self._view.node_ids)
+
+    def __contains__(self, n: object) -> bool:
+        i = self._view.base.ids.get(n)  # type: ignore[arg-type]
+        return i is not None and self._view.has_id(i)
+
+    def __getitem__(self, n: str) -> Dict[str, Any]:
+        if n not in self:
+            raise KeyError(n)
+        return self._view.base.node_attrs(self._view.base.ids[n])
+
+
+class SubgraphView:
+    """Nodes and edges of an extracted subgraph, as ids into a CsrGraph.
+
+    Provides the read-only subset of the networkx API used by export_megr
+    (nodes(), nodes(data=True), nodes[n], edges(data=True), number_of_nodes,
+    number_of_edges) plus edge_arrays() with local node indexes. node_ids
+    is sorted; seeds lists the seeds the subgraph was extracted for.
+    """
+
+    def __init__(self, base: CsrGraph, node_ids: np.ndarray, edge_pos: np.ndarray,
+                 seeds: Sequence[str] = ()) -> None:
+        self.base = base
+        self.keys = base.keys
+        self.node_ids = node_ids
+        self.edge_pos = edge_pos
+        self.seeds = list(seeds)
+
+    def has_id(self, i: int) -> bool:
+        j = int(np.searchsorted(self.node_ids, i))
+        return j < len(self.node_ids) and self.node_ids[j] == i
+
+    def local(self, ids: np.ndarray) -> np.ndarray:
+        """Positions in node_keys() of node ids of the subgraph."""
+        return np.searchsorted(self.node_ids, ids)
+
+    def node_types(self) -> Tuple[np.ndarray, List[Optional[str]]]:
+        """(codes, names): ntype of the i-th node is names[codes[i]]."""
+        return self.base.ntype[self.node_ids], self.base.ntype_names
+
+    @property
+    def nodes(self) -> _ViewNodes:
+        return _ViewNodes(self)
+
+    def node_keys(self) -> List[str]:
+        keys = self.keys
+        return [keys[i] for i in self.node_ids.tolist()]
+
+    def number_of_nodes(self) -> int:
+        return len(self.node_ids)
+
+    def number_of_edges(self) -> int:
+        return len(self.edge_pos)
+
+    def edge_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """(src, dst, etype, ts): src/dst are positions in node_keys(),
+        etype ids index base.etype_names."""
+        b, pos = self.base, self.edge_pos
+        return self.local(b.src[pos]), self.local(b.dst[pos]), b.etype[pos], b.ts[pos]
+
+    def edges(self, data: bool = False) -> Iterator[Any]:
+        b, pos, keys = self.base, self.edge_pos, self.keys
+        src = b.src[pos].tolist()
+        dst = b.dst[pos].tolist()
+        if not data:
+            return ((keys[u], keys[v]) for u, v in zip(src, dst))
+        names = b.etype_names
+        return (
+            (keys[u], keys[v], {"etype": names[e], "ts": t})
+            for u, v, e, t in zip(src, dst, b.etype[pos].tolist(), b.ts[pos].tolist())
+        )
+
+    def to_networkx(self) -> nx.DiGraph:
+        out = nx.DiGraph()
+        out.add_nodes_from((n, dict(dat)) for n, dat in self.nodes(data=True))
+        out.add_edges_from(self.edges(data=True))
+        return out
+
+
+def _gather(ptr: np.ndarray, pos: np.ndarray, nodes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # (owner node, edge position) of every CSR entry of nodes
+    starts = ptr[nodes]
+    lens = ptr[nodes + 1] - starts
+    total = int(lens.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    owner = np.repeat(nodes, lens)
+    offsets = np.arange(total) - np.repeat(np.cumsum(lens) - lens, lens)
+    return owner, pos[np.repeat(starts, lens) + offsets]
+
+
+def _cap_per_owner(owner: np.ndarray, ts: np.ndarray, cap: int) -> np.ndarray:
+    # indexes of at most cap entries per owner, the most recent first
+    order = np.lexsort((-ts, owner))
+    sorted_owner = owner[order]
+    first = np.flatnonzero(np.r_[True, sorted_owner[1:] != sorted_owner[:-1]])
+    counts = np.diff(np.r_[first, len(order)])
+    rank = np.arange(len(order)) - np.repeat(first, counts)
+    return order[rank < cap]
+
+
+def k_hop_subgraph(
+    g: Any,
+    seeds: Iterable[str],
+    k: int = 2,
+    max_fanout: Optional[int] = None,
+    hub_out_degree: Optional[int] = None,
+    hub_in_degree: Optional[int] = None,
+    time_respecting: bool = False,
+    csr: Optional[CsrGraph] = None,
+) -> SubgraphView:
+    """Nodes within k hops of seeds (in either direction) and their edges.
+
+    Without seeds the view covers the whole graph. csr is a snapshot of g
+    to reuse across calls (CsrGraph.from_graph(g)); by default one is built
+    with CsrGraph.around. Degree limits and max_fanout of None or 0 are off.
+    See the module comment.
+    """
+    seeds = list(seeds)
+    if csr is not None:
+        base = csr
+    elif seeds:
+        base = CsrGraph.around(g, seeds, k, hub_out_degree, hub_in_degree)
+    else:
+        base = CsrGraph.from_graph(g)
+    size = base.size
+    seed_ids = np.unique(np.fromiter((base.ids[n] for n in seeds if n in base.ids), dtype=np.int64))
+    if seed_ids.size == 0:
+        live = np.fromiter((n is not None for n in base.keys), dtype=np.bool_, count=size)
+        return SubgraphView(base, np.flatnonzero(live), np.arange(len(base.src)))
+
+    visited = np.zeros(size, dtype=np.bool_)
+    visited[seed_ids] = True
+    reached = [seed_ids]
+    expand = base.expandable(hub_out_degree, hub_in_degree)
+    if time_respecting:
+        used = []
+        # earliest ts of an out-edge / latest ts of an in-edge that continues
+        # a causal path through the node (inf / -inf: not reached that way)
+        fwd = np.full(size, np.inf)
+        bwd = np.full(size, -np.inf)
+        fwd[seed_ids] = -np.inf
+        bwd[seed_ids] = np.inf
+
+    frontier = seed_ids
+    for hop in range(k):
+        if expand is not None:
+            # seeds are expanded even if they are hubs
+            frontier = frontier[expand[frontier] | (np.isin(frontier, seed_ids) if hop else True)]
+        if frontier.size == 0:
             break
-    return g.subgraph(nodes).copy()
+        out_owner, out_pos = _gather(base.out_ptr, base.out_pos, frontier)
+        in_owner, in_pos = _gather(base.in_ptr, base.in_pos, frontier)
+        owner = np.concatenate([out_owner, in_owner])
+        pos = np.concatenate([out_pos, in_pos])
+        nb = np.concatenate([base.dst[out_pos], base.src[in_pos]])
+        forward = np.zeros(len(pos), dtype=np.bool_)
+        forward[: len(out_pos)] = True
+        ts = base.ts[pos]
+        if time_respecting:
+            keep = np.where(forward, ts >= fwd[owner], ts <= bwd[owner])
+        else:
+            keep = ~visited[nb]
+        owner, pos, nb, forward, ts = owner[keep], pos[keep], nb[keep], forward[keep], ts[keep]
+        if max_fanout and len(pos):
+            keep = _cap_per_owner(owner, ts, max_fanout)
+            pos, nb, forward, ts = pos[keep], nb[keep], forward[keep], ts[keep]
+        new = np.unique(nb[~visited[nb]])
+        visited[new] = True
+        reached.append(new)
+        if time_respecting:
+            used.append(pos)
+            ahead, behind = nb[forward], nb[~forward]
+            was_fwd, was_bwd = fwd[ahead], bwd[behind]
+            np.minimum.at(fwd, ahead, ts[forward])
+            np.maximum.at(bwd, behind, ts[~forward])
+            frontier = np.unique(np.concatenate([ahead[fwd[ahead] < was_fwd], behind[bwd[behind] > was_bwd]]))
+        else:
+            frontier = new
+
+    node_ids = np.sort(np.concatenate(reached))
+    if time_respecting:
+        edge_pos = np.unique(np.concatenate(used)) if used else np.empty(0, dtype=np.int64)
+    else:
+        # induced: out-edges of the nodes that end inside
+        _owner, out_pos = _gather(base.out_ptr, base.out_pos, node_ids)
+        edge_pos = np.sort(out_pos[visited[base.dst[out_pos]]])
+    return SubgraphView(base, node_ids, edge_pos, seeds=[base.keys[i] for i in seed_ids.tolist()])
+
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    # splitmix64 finalizer, elementwise on uint64 (wraps around)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _label_hashes(names: Sequence[Optional[str]]) -> np.ndarray:
+    # by name: codes differ between snapshots
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(str(n).encode(), digest_size=8).digest(), "little") for n in names],
+        dtype=np.uint64,
+    )
+
+
+def structural_hash(view: SubgraphView, rounds: int = 2) -> str:
+    """Weisfeiler-Lehman style hash of a subgraph's node/edge types and shape.
+
+    MEGRAPT only sees node types, edge types and structure, so candidates
+    with equal hashes (up to collisions) get the same scores.
+    """
+    codes, names = view.node_types()
+    labels = _label_hashes(names)[codes]
+    src, dst, etype, _ts = view.edge_arrays()
+    etoken = _label_hashes(view.base.etype_names)[etype]
+    out_salt, in_salt = np.uint64(0x243F6A8885A308D3), np.uint64(0x13198A2E03707344)
+    for _ in range(rounds):
+        acc = np.zeros(len(labels), dtype=np.uint64)
+        np.add.at(acc, src, _mix(labels[dst] ^ etoken ^ out_salt))
+        np.add.at(acc, dst, _mix(labels[src] ^ etoken ^ in_salt))
+        labels = _mix(_mix(labels) + acc)
+    digest = hashlib.blake2b(np.sort(labels).tobytes(), digest_size=16)
+    digest.update(len(src).to_bytes(8, "little"))
+    return digest.hexdigest()
+
+
+def _jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    inter = len(np.intersect1d(a, b, assume_unique=True))
+    return inter / (len(a) + len(b) - inter) if inter else 0.0
+
+
+def extract_candidates(
+    g: Any,
+    seeds: Iterable[str],
+    k: int = 2,
+    max_nodes: Optional[int] = None,
+    max_edges: Optional[int] = None,
+    min_nodes: int = 1,
+    merge_jaccard: float = 0.5,
+    **options: Any,
+) -> List[SubgraphView]:
+    """Candidate subgraphs for scoring: one per seed cluster.
+
+    Every seed not already inside a candidate gets its own k-hop subgraph
+    (options as for k_hop_subgraph), with fewer hops while it exceeds
+    max_nodes / max_edges; seeds whose 1-hop subgraph is still too large,
+    and candidates below min_nodes, are dropped. Candidates whose node sets
+    overlap by a Jaccard index of at least merge_jaccard (0: never) are
+    merged while the union stays within the limits, and candidates with the
+    same structural_hash are scored once.
+    """
+    seeds = sorted(set(seeds))
+    if not seeds:
+        return []
+    base = CsrGraph.around(g, seeds, k, options.get("hub_out_degree"), options.get("hub_in_degree"))
+
+    def fits(v: SubgraphView) -> bool:
+        return ((max_nodes is None or v.number_of_nodes() <= max_nodes)
+                and (max_edges is None or v.number_of_edges() <= max_edges))
+
+    candidates: List[SubgraphView] = []
+    too_large = 0
+    for seed in seeds:
+        i = base.ids.get(seed)
+        if i is None:
+            continue
+        covering = next((c for c in candidates if c.has_id(i)), None)
+        if covering is not None:
+            covering.seeds.append(seed)
+            continue
+        for hops in range(k, 0, -1):
+            v = k_hop_subgraph(g, [seed], hops, csr=base, **options)
+            if fits(v):
+                candidates.append(v)
+                break
+        else:
+            too_large += 1
+
+    merged: List[SubgraphView] = []
+    for v in candidates:
+        for j, c in enumerate(merged if merge_jaccard else ()):
+            if _jaccard(c.node_ids, v.node_ids) >= merge_jaccard:
+                union = SubgraphView(base, np.union1d(c.node_ids, v.node_ids), np.union1d(c.edge_pos, v.edge_pos),
+                                     seeds=c.seeds + v.seeds)
+                if fits(union):
+                    merged[j] = union
+                    break
+        else:
+            merged.append(v)
+
+    out: List[SubgraphView] = []
+    seen: Set[str] = set()
+    for v in merged:
+        if v.number_of_nodes() < min_nodes:
+            continue
+        h = structural_hash(v)
+        if h not in seen:
+            seen.add(h)
+            out.append(v)
+    log.info("Candidates: %d from %d seeds (%d seeds over the size limits, %d before merging, %d before dedup)",
+             len(out), len(seeds), too_large, len(candidates), len(merged))
+    return out
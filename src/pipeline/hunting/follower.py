@@ -0,0 +1,342 @@
+from __future__ import annotations
+import ctypes
+import ctypes.util
+import json
+import logging
+import os
+import select
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+log = logging.getLogger(__name__)
+
+# Block-reading follower for audit.log. Lines are split from large reads
+# instead of readline(); an idle follower sleeps on inotify (falling back to
+# polling) instead of a fixed 200 ms sleep. Rotation (new inode at path) and
+# truncation (size below the read offset) are detected at EOF; a rotated file
+# is drained before switching to the new one. The byte offset of the last
+# consumed line can be persisted to a checkpoint file, so a restart resumes
+# exactly where the previous run stopped, also inside an already rotated file.
+
+# (generation, offset): generation counts the files opened by this follower,
+# offset is a byte offset in that file
+Position = Tuple[int, int]
+Block = Tuple[int, int, List[bytes]]
+
+_IN_MODIFY = 0x002
+_IN_ATTRIB = 0x004
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+
+class _Inotify:
+    """Minimal inotify watch on a directory (Linux, via libc)."""
+
+    def __init__(self, directory: Path) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = _IN_MODIFY | _IN_ATTRIB | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+        if libc.inotify_add_watch(fd, os.fsencode(str(directory)), mask) < 0:
+            err = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(err, f"inotify_add_watch failed for {directory}")
+        self.fd = fd
+
+    def wait(self, timeout: float) -> bool:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+def load_checkpoint(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        log.warning("Ignoring unreadable follower checkpoint %s", path)
+        return None
+
+def write_checkpoint(path: Path, state: Dict[str, Any]) -> None:
+    """Atomically replaces the checkpoint file with state (plus a timestamp)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(dict(state, ts=time.time()), f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+class AuditFollower:
+    """tail -F for audit.log with block reads, rotation handling and a resumable offset.
+
+    lines() yields decoded lines (without the newline) and None as an idle
+    tick whenever no data arrived for idle_timeout seconds. After each line,
+    position is the end of that line and line_position its start.
+
+    With checkpoint_path, the follower resumes from the checkpoint written by
+    save_checkpoint(); without a (usable) checkpoint it starts at the end of
+    the file, or at its beginning with from_start.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        checkpoint_path: Optional[Path] = None,
+        from_start: bool = False,
+        block_size: int = 1 << 20,
+        idle_timeout: float = 0.5,
+        poll_interval: float = 0.2,
+        use_inotify: bool = True,
+    ) -> None:
+        self.path = Path(path)
+        self.checkpoint_path = Path(checkpoint_path) if checkpoint_path else None
+        self.from_start = from_start
+        self.block_size = block_size
+        self.idle_timeout = idle_timeout
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.checkpoint_state = load_checkpoint(self.checkpoint_path) if self.checkpoint_path else None
+        # serials of events already written after the checkpoint offset
+        self.skip_serials: List[str] = list(self.checkpoint_state.get("skip", [])) if self.checkpoint_state else []
+
+        self._f = None
+        self._file: Optional[Path] = None
+        self._inode: Optional[int] = None
+        self._inodes: Dict[int, int] = {}
+        self._generation = -1
+        self._partial = b""
+        self._draining = False
+        self._notify: Optional[_Inotify] = None
+        self._closed = False
+        self.offset = 0
+        self.line_position: Position = (0, 0)
+        self.counters: Dict[str, int] = {"lines": 0, "bytes": 0, "rotations": 0, "truncations": 0}
+
+    @property
+    def position(self) -> Position:
+        return (self._generation, self.offset)
+
+    def _open(self, path: Path, offset: int) -> None:
+        if self._f is not None:
+            self._f.close()
+        self._f = path.open("rb", buffering=0)
+        self._file = path
+        self._inode = os.fstat(self._f.fileno()).st_ino
+        self._generation += 1
+        self._inodes[self._generation] = self._inode
+        self._partial = b""
+        self._draining = False
+        self._f.seek(offset)
+        self.offset = offset
+
+    def inode_of(self, generation: int) -> Optional[int]:
+        return self._inodes.get(generation)
+
+    def locate(self, inode: int) -> Optional[Path]:
+        """The log file (current or rotated) with this inode, if it still exists."""
+        try:
+            if self.path.stat().st_ino == inode:
+                return self.path
+        except FileNotFoundError:
+            pass
+        return self._find_rotated(inode)
+
+    def _find_rotated(self, inode: int) -> Optional[Path]:
+        # auditd and logrotate keep rotated files next to the log (audit.log.1, ...)
+        for p in sorted(self.path.parent.glob(self.path.name + ".*")):
+            try:
+                if p.stat().st_ino == inode:
+                    return p
+            except OSError:
+                continue
+        return None
+
+    def _start(self) -> bool:
+        if not self.path.exists():
+            return False
+        cp = self.checkpoint_state
+        if cp is None:
+            self._open(self.path, 0)
+            if not self.from_start:
+                self._f.seek(0, 2)
+                self.offset = self._f.tell()
+            log.info("Following %s from offset %d", self.path, self.offset)
+            return True
+        inode, offset = int(cp["inode"]), int(cp["offset"])
+        st = self.path.stat()
+        if st.st_ino == inode:
+            if offset > st.st_size:
+                log.warning("%s shrank below the checkpoint offset, reading from the start", self.path)
+                self.counters["truncations"] += 1
+                offset = 0
+            self._open(self.path, offset)
+        else:
+            rotated = self._find_rotated(inode)
+            if rotated is not None:
+                # rotated while we were down: finish the old file first
+                self._open(rotated, offset)
+                self._draining = True
+            else:
+                log.warning("Checkpointed file (inode %d) of %s is gone, reading the current file from the start",
+                            inode, self.path)
+                self._open(self.path, 0)
+        log.info("Resuming %s at offset %d", self._file, self.offset)
+        return True
+
+    def _check_rotation(self) -> bool:
+        """At EOF: switch files on rotation/truncation; True if reading should continue."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            # between rename and re-creation
+            return False
+        if st.st_ino != self._inode:
+            if not self._draining:
+                # one more read picks up anything appended before the rename
+                self._draining = True
+                return True
+            return False
+        if st.st_size < self.offset + len(self._partial):
+            log.warning("%s was truncated, reading from the start", self.path)
+            self.counters["truncations"] += 1
+            self._f.seek(0)
+            self.offset = 0
+            self._partial = b""
+            return True
+        return False
+
+    def _wait(self) -> None:
+        if self._notify is None and self.use_inotify:
+            try:
+                self._notify = _Inotify(self.path.parent)
+            except (OSError, AttributeError) as e:
+                log.info("inotify unavailable (%s), polling %s every %.2fs", e, self.path, self.poll_interval)
+                self.use_inotify = False
+        if self._notify is not None:
+            self._notify.wait(self.idle_timeout)
+        else:
+            time.sleep(min(self.poll_interval, self.idle_timeout))
+
+    def blocks(self) -> Iterator[Optional[Block]]:
+        """Yields (generation, start offset, lines) for every read that completed
+        lines (lines as bytes without the newline), or None as an idle tick.
+        offset is at the end of the block when it is yielded."""
+        while not self._closed and self._f is None:
+            if self._start():
+                break
+            self._wait()
+            yield None
+        while not self._closed:
+            chunk = self._f.read(self.block_size)
+            if chunk:
+                self.counters["bytes"] += len(chunk)
+                data = self._partial + chunk if self._partial else chunk
+                cut = data.rfind(b"\n")
+                if cut < 0:
+                    self._partial = data
+                    continue
+                self._partial = data[cut + 1:]
+                start = self.offset
+                lines = data[:cut].split(b"\n")
+                self.offset = start + cut + 1
+                self.counters["lines"] += len(lines)
+                yield self._generation, start, lines
+                continue
+            if self._check_rotation():
+                continue
+            if self._draining and self.path.exists():
+                # leave the drained rotated file; its last line may lack the newline
+                tail, self._partial = self._partial, b""
+                if tail:
+                    start = self.offset
+                    self.offset = start + len(tail) + 1
+                    self.counters["lines"] += 1
+                    yield self._generation, start, [tail]
+                self.counters["rotations"] += 1
+                log.info("%s rotated, continuing with the new file", self.path)
+                self._open(self.path, 0)
+                continue
+            self._wait()
+            yield None
+
+    def lines(self) -> Iterator[Optional[str]]:
+        for block in self.blocks():
+            if block is None:
+                yield None
+                continue
+            gen, offset, lines = block
+            for raw in lines:
+                self.line_position = (gen, offset)
+                offset += len(raw) + 1
+                # position follows the consumer, so it never covers an unread line
+                self.offset = offset
+                yield raw.decode("utf-8", errors="ignore")
+
+    def __iter__(self) -> Iterator[Optional[str]]:
+        return self.lines()
+
+    def lag_bytes(self) -> int:
+        """Bytes written to the log (including a pending rotated-to file) but not consumed yet."""
+        if self._f is None:
+            return 0
+        lag = os.fstat(self._f.fileno()).st_size - self.offset
+        try:
+            st = os.stat(self.path)
+            if st.st_ino != self._inode:
+                lag += st.st_size
+        except FileNotFoundError:
+            pass
+        return max(0, lag)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "file": str(self._file) if self._file else None,
+            "offset": self.offset,
+            "lag_bytes": self.lag_bytes(),
+            **self.counters,
+        }
+
+    def save_checkpoint(self, position: Optional[Position] = None, skip: Sequence[str] = (),
+                        **extra: Any) -> None:
+        """Persist position (default: after the last yielded line) atomically.
+
+        skip lists serials of events starting after position that were already
+        written; they are handed back as skip_serials on restart. extra is
+        stored as is and available in checkpoint_state after a restart.
+        """
+        if self.checkpoint_path is None or self._f is None:
+            return
+        generation, offset = self.position if position is None else position
+        inode = self._inodes.get(generation)
+        if inode is None:
+            return
+        state = {"path": str(self.path), "inode": inode, "offset": offset, "skip": list(skip), **extra}
+        write_checkpoint(self.checkpoint_path, state)
+        # generations before the checkpointed one are no longer needed
+        for g in [g for g in self._inodes if g < generation]:
+            del self._inodes[g]
+
+    def close(self) -> None:
+        self._closed = True
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+        if self._notify is not None:
+            self._notify.close()
+            self._notify = None
@@ -3,30 +3,143 @@ import argparse
 from pathlib import Path
 import logging
 import time
+from typing import Any, Dict, List, Optional, Set
 
 from src.common.logging import setup_logging
 from src.common.config import load_yaml
-from src.common.io import read_jsonl
-from src.pipeline.hunting.provenance import WindowedProvenanceGraph
+from src.common.io import append_jsonl, read_jsonl_batches, rotated_files
+from src.pipeline.hunting.event_store import EVENT_FORMATS, make_event_tail, read_event_columns
+from src.pipeline.hunting.provenance import WindowedProvenanceGraph, make_provenance_graph
 from src.pipeline.hunting.seeding import find_seeds
-from src.pipeline.hunting.extractor import k_hop_subgraph
-from src.pipeline.hunting.export_megr import to_megr_data_list, save_prediction_pt
-from src.pipeline.hunting.predictor import run_predict
+from src.pipeline.hunting.extractor import extract_candidates
+from src.pipeline.hunting.predictor import Predictor
 
 log = logging.getLogger(__name__)
 
+def run_cycle(pg: WindowedProvenanceGraph, args: argparse.Namespace, hunt_cfg: Dict[str, Any], exp_path: Path,
+              predictor: Predictor, seeds: Optional[List[str]] = None) -> Any:
+    if seeds is None:
+        seeds = find_seeds(pg.g, query_name=args.query_name, cti_seeds_path=args.cti_seeds, index=pg.index)
+    # candidates are sized against the query graph, like max_nodes_mult_qg /
+    # max_edges_mult_qg of the engine's subgraph extraction
+    max_nodes = max_edges = None
+    query_size = predictor.query_size(args.query_name)
+    if query_size is not None:
+        max_nodes = query_size[0] * int(hunt_cfg.get("max_nodes_mult_qg", 10))
+        max_edges = query_size[1] * int(hunt_cfg.get("max_edges_mult_qg", 25))
+    candidates = extract_candidates(
+        pg.g, seeds, k=int(hunt_cfg["k_hop"]),
+        max_nodes=max_nodes,
+        max_edges=max_edges,
+        min_nodes=int(hunt_cfg.get("min_nodes", 1)),
+        merge_jaccard=float(hunt_cfg.get("candidate_merge_jaccard", 0.5)),
+        max_fanout=int(hunt_cfg.get("k_hop_max_fanout", 0)),
+        hub_out_degree=int(hunt_cfg.get("hub_out_degree", 0)),
+        hub_in_degree=int(hunt_cfg.get("hub_in_degree", 0)),
+        time_respecting=bool(hunt_cfg.get("time_respecting", False)),
+    )
+    if not candidates:
+        log.info("No candidate subgraphs for %d seeds, nothing to score", len(seeds))
+        return None
+    g_name = args.query_name
+    # torch / torch_geometric load on the first cycle, not at startup
+    from src.pipeline.hunting.export_megr import save_prediction_pt, split_collated, to_megr_collated
+
+    predict_file = f"{args.query_name}_in_realtime_{int(time.time())}.pt"
+    out_pt = exp_path/"raw/torch_prediction"/predict_file
+    collated = to_megr_collated(candidates, g_name, predictor.vocabulary)
+    save_prediction_pt(out_pt, collated)
+    log.info("Wrote prediction graph: %s (%d candidates)", out_pt, len(candidates))
+
+    return predictor.predict(predict_file, args.query_name, split_collated(*collated))
+
+def follow(pg: WindowedProvenanceGraph, args: argparse.Namespace, hunt_cfg: Dict[str, Any], exp_path: Path,
+           predictor: Predictor) -> None:
+    batch_size = int(hunt_cfg.get("ingest_batch_size", 5000))
+    interval = float(hunt_cfg.get("follow_interval_seconds", 30))
+    poll = float(hunt_cfg.get("follow_poll_seconds", 0.5))
+    on_new_seeds = bool(hunt_cfg.get("follow_on_new_seeds", True))
+    metrics_path = Path(args.metrics_out) if args.metrics_out else None
+
+    tail = make_event_tail(args.events_format, Path(args.events), from_end=args.from_end)
+    known_seeds: Set[str] = set()
+    oldest_pending: Optional[float] = None   # ts of the oldest event not yet covered by a prediction
+    newest_pending: Optional[float] = None
+    pending = 0
+    last_cycle = time.time()
+    log.info("Following %s (cycle every %.1fs)", args.events, interval)
+    try:
+        while True:
+            batch = tail.read_new(batch_size)
+            if batch:
+                pg.ingest_batch(batch)
+                ts = [float(ev["ts"]) for ev in batch if "ts" in ev]
+                if ts:
+                    oldest_pending = min(ts) if oldest_pending is None else min(oldest_pending, min(ts))
+                    newest_pending = max(ts) if newest_pending is None else max(newest_pending, max(ts))
+                pending += len(batch)
+
+            now = time.time()
+            due = pending > 0 and now - last_cycle >= interval
+            seeds: Optional[List[str]] = None
+            if pending > 0 and not due and on_new_seeds and batch:
+                seeds = find_seeds(pg.g, query_name=args.query_name, cti_seeds_path=args.cti_seeds, index=pg.index)
+                due = bool(set(seeds) - known_seeds)
+
+            if due:
+                if seeds is None:
+                    seeds = find_seeds(pg.g, query_name=args.query_name, cti_seeds_path=args.cti_seeds,
+                                       index=pg.index)
+                known_seeds = set(seeds)
+                sim = run_cycle(pg, args, hunt_cfg, exp_path, predictor, seeds=seeds)
+                alert_ts = time.time()
+                row = {
+                    "alert_ts": alert_ts,
+                    "events": pending,
+                    "seeds": len(seeds),
+                    "nodes": pg.g.number_of_nodes(),
+                    "edges": pg.g.number_of_edges(),
+                    "cycle_seconds": alert_ts - now,
+                    # event timestamp -> alert, worst case (oldest) and freshest event of the cycle
+                    "detection_latency_max": alert_ts - oldest_pending if oldest_pending is not None else None,
+                    "detection_latency_min": alert_ts - newest_pending if newest_pending is not None else None,
+                    "max_similarity": float(sim.max()) if sim is not None and sim.size else None,
+                }
+                log.info("Cycle: events=%d seeds=%d latency max=%s min=%s",
+                         pending, len(seeds), row["detection_latency_max"], row["detection_latency_min"])
+                if metrics_path is not None:
+                    append_jsonl(metrics_path, row)
+                pending = 0
+                oldest_pending = newest_pending = None
+                last_cycle = alert_ts
+
+            if not batch:
+                time.sleep(poll)
+    except KeyboardInterrupt:
+        log.info("Follow mode stopped")
+    finally:
+        tail.close()
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--dataset", choices=["cadets","theia","trace"], required=True)
     ap.add_argument("--experiment", choices=["DEMO","REALTIME"], default="REALTIME")
     ap.add_argument("--events", default="runs/events/events.jsonl")
+    ap.add_argument("--events-format", choices=EVENT_FORMATS, default="jsonl",
+                    help="Encoding of --events (parquet: compacted log, replay only)")
     ap.add_argument("--checkpoint", required=True)
     ap.add_argument("--query-name", default="qg")
     ap.add_argument("--cti-seeds", default="runs/cti/seeds.json", help="Path to CTI seeds.json produced by pipeline.agent")
     ap.add_argument("--configs", default="configs")
+    ap.add_argument("--follow", action="store_true", help="Tail --events and predict continuously")
+    ap.add_argument("--from-end", action="store_true", help="With --follow, skip events already in the file")
+    ap.add_argument("--metrics-out", default=None, help="With --follow, append per-cycle metrics (JSONL)")
     ap.add_argument("--log-level", default="INFO")
     args = ap.parse_args()
 
+    if args.follow and args.events_format == "parquet":
+        ap.error("--follow needs a jsonl or msgpack event log")
+
     setup_logging(args.log_level)
     ds_cfg = load_yaml(Path(args.configs)/"datasets.yaml")
     hunt_cfg = load_yaml(Path(args.configs)/"hunting.yaml")
@@ -34,27 +147,36 @@ def main():
     exp_rel = ds_cfg["experiments"]["realtime"] if args.experiment == "REALTIME" else ds_cfg["experiments"]["demo"]
     exp_path = Path(ds["root"])/exp_rel
 
-    pg = WindowedProvenanceGraph(window_seconds=int(hunt_cfg["window_seconds"]), max_nodes=int(hunt_cfg["max_nodes"]))
-    events_path = Path(args.events)
-    if not events_path.exists():
-        raise FileNotFoundError(events_path)
+    pg = make_provenance_graph(
+        hunt_cfg.get("graph_backend", "networkx"),
+        window_seconds=int(hunt_cfg["window_seconds"]),
+        max_nodes=int(hunt_cfg["max_nodes"]),
+    )
+    predictor = Predictor(
+        ds["engine_name"], exp_path, Path(args.checkpoint),
+        threshold=float(hunt_cfg.get("threshold", 0.5)),
+        mode=hunt_cfg.get("predict_mode", "inprocess"),
+    )
 
-    # ingest all events (replay-style). For realtime, run this in a loop or tail.
-    for ev in read_jsonl(events_path):
-        pg.ingest(ev)
+    if args.follow:
+        follow(pg, args, hunt_cfg, exp_path, predictor)
+        return
 
-    seeds = find_seeds(pg.g, query_name=args.query_name, cti_seeds_path=args.cti_seeds)
-    sub = k_hop_subgraph(pg.g, seeds, k=int(hunt_cfg["k_hop"]))
-    g_name = args.query_name
+    events_path = Path(args.events)
+    if not rotated_files(events_path):
+        raise FileNotFoundError(events_path)
 
-    predict_file = f"{args.query_name}_in_realtime_{int(time.time())}.pt"
-    out_pt = exp_path/"raw/torch_prediction"/predict_file
-    data_list = to_megr_data_list(sub, g_name=g_name)
-    save_prediction_pt(out_pt, data_list)
-    log.info("Wrote prediction graph: %s", out_pt)
+    # ingest all events (replay-style); use --follow for realtime
+    batch_size = int(hunt_cfg.get("ingest_batch_size", 5000))
+    if args.events_format == "jsonl":
+        for batch in read_jsonl_batches(events_path, batch_size):
+            pg.ingest_batch(batch)
+    else:
+        # binary stores are replayed column-wise, without per-event dicts
+        for cols in read_event_columns(events_path, args.events_format, batch_size):
+            pg.ingest_columns(cols)
 
-    rc = run_predict(ds["engine_name"], exp_path, predict_file, Path(args.checkpoint))
-    log.info("Engine predict return code: %s", rc)
+    run_cycle(pg, args, hunt_cfg, exp_path, predictor)
 
 if __name__ == "__main__":
     main()
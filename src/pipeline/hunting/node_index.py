@@ -0,0 +1,360 @@
+from __future__ import annotations
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import ipaddress
+
+# Attribute indexes over the nodes of the provenance window, maintained by
+# WindowedProvenanceGraph as nodes are added and evicted, so seeding is a
+# set of lookups instead of scans over every node:
+#
+#   file paths   path -> node, and a component trie for prefix queries
+#   processes    exe component trie (prefixes), exact/suffix maps of the
+#                lowercased exe path components and comm
+#   sockets      saddr -> node, and the decoded IP in a sorted index for
+#                address / CIDR queries
+#
+# Values are also appended to per-field journals, so a substring matcher
+# (seeding.SeedMatcher) only scans the values added since its last run.
+
+NODE_PROCESS = "process"
+NODE_FILE = "file"
+NODE_SOCKET = "socket"
+
+# fields with a journal: file paths, exe, comm, saddr
+JOURNAL_FIELDS = ("path", "exe", "comm", "saddr")
+
+_Net = Any  # ipaddress.IPv4Network | ipaddress.IPv6Network
+
+
+class _TrieNode:
+    __slots__ = ("children", "items")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, _TrieNode] = {}
+        self.items: Set[str] = set()
+
+
+class PathTrie:
+    """Path components -> nodes; prefix() answers str.startswith queries."""
+
+    def __init__(self) -> None:
+        self._root = _TrieNode()
+
+    def add(self, path: str, item: str) -> None:
+        t = self._root
+        for comp in path.split("/"):
+            nxt = t.children.get(comp)
+            if nxt is None:
+                nxt = t.children[comp] = _TrieNode()
+            t = nxt
+        t.items.add(item)
+
+    def remove(self, path: str, item: str) -> None:
+        trail: List[Tuple[_TrieNode, str]] = []
+        t = self._root
+        for comp in path.split("/"):
+            nxt = t.children.get(comp)
+            if nxt is None:
+                return
+            trail.append((t, comp))
+            t = nxt
+        t.items.discard(item)
+        # drop the branch nodes left empty
+        for parent, comp in reversed(trail):
+            child = parent.children[comp]
+            if child.items or child.children:
+                break
+            del parent.children[comp]
+
+    def prefix(self, prefix: str) -> Iterator[str]:
+        """Items whose path starts with prefix."""
+        *head, last = prefix.split("/")
+        t = self._root
+        for comp in head:
+            t = t.children.get(comp)
+            if t is None:
+                return
+        stack = [child for comp, child in t.children.items() if comp.startswith(last)]
+        while stack:
+            t = stack.pop()
+            yield from t.items
+            stack.extend(t.children.values())
+
+
+def saddr_ip(saddr: str) -> Optional[Any]:
+    """IP address of a socket node's saddr, or None.
+
+    Handles the hex sockaddr auditd logs (AF_INET / AF_INET6), the
+    interpreted form of ausearch -i (laddr=...) and plain "ip:port" /
+    "[ip]:port" strings.
+    """
+    if not saddr:
+        return None
+    s = saddr.strip()
+    if len(s) >= 16 and all(c in "0123456789abcdefABCDEF" for c in s):
+        family = int(s[2:4] + s[0:2], 16)
+        try:
+            if family == 2:
+                return ipaddress.IPv4Address(bytes.fromhex(s[8:16]))
+            if family == 10 and len(s) >= 48:
+                return ipaddress.IPv6Address(bytes.fromhex(s[16:48]))
+        except ValueError:
+            return None
+        return None
+    i = s.find("laddr=")
+    if i >= 0:
+        s = s[i + 6:].split()[0]
+    elif s.startswith("["):
+        s = s[1:s.find("]")] if "]" in s else s[1:]
+    elif s.count(":") == 1:
+        s = s.split(":", 1)[0]
+    try:
+        return ipaddress.ip_address(s)
+    except ValueError:
+        return None
+
+
+class IpIndex:
+    """IP address -> nodes with address range (CIDR) lookups.
+
+    The sorted key arrays are rebuilt lazily on the first lookup after a change.
+    """
+
+    def __init__(self) -> None:
+        self._nodes: Dict[Tuple[int, int], Set[str]] = {}
+        self._sorted: Optional[Dict[int, List[int]]] = None
+
+    def add(self, ip: Any, item: str) -> None:
+        key = (ip.version, int(ip))
+        items = self._nodes.get(key)
+        if items is None:
+            items = self._nodes[key] = set()
+            self._sorted = None
+        items.add(item)
+
+    def remove(self, ip: Any, item: str) -> None:
+        key = (ip.version, int(ip))
+        items = self._nodes.get(key)
+        if items is None:
+            return
+        items.discard(item)
+        if not items:
+            del self._nodes[key]
+            self._sorted = None
+
+    def lookup(self, net: _Net) -> Set[str]:
+        if self._sorted is None:
+            per_version: Dict[int, List[int]] = {4: [], 6: []}
+            for version, value in self._nodes:
+                per_version[version].append(value)
+            for values in per_version.values():
+                values.sort()
+            self._sorted = per_version
+        values = self._sorted[net.version]
+        lo = bisect_left(values, int(net.network_address))
+        hi = bisect_right(values, int(net.broadcast_address))
+        out: Set[str] = set()
+        for value in values[lo:hi]:
+            out |= self._nodes[(net.version, value)]
+        return out
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+
+def _exe_suffixes(exe: str) -> Iterator[str]:
+    # "/usr/bin/nc" -> "nc", "bin/nc", "usr/bin/nc", "/usr/bin/nc"
+    low = exe.lower()
+    i = len(low)
+    while True:
+        i = low.rfind("/", 0, i)
+        if i < 0:
+            yield low
+            return
+        if i + 1 < len(low):
+            yield low[i + 1:]
+        if i == 0:
+            yield low
+            return
+
+
+class NodeIndex:
+    """Incremental attribute indexes over graph nodes (see module comment)."""
+
+    def __init__(self) -> None:
+        self._attrs: Dict[str, Dict[str, Any]] = {}
+        self.file_paths: Dict[str, str] = {}
+        self.saddrs: Dict[str, str] = {}
+        self.exes: Dict[str, Set[str]] = {}
+        self.comms: Dict[str, Set[str]] = {}
+        self._path_trie = PathTrie()
+        self._exe_trie = PathTrie()
+        self._names: Dict[str, Set[str]] = {}
+        self._ips = IpIndex()
+        self._journal: Dict[str, List[str]] = {f: [] for f in JOURNAL_FIELDS}
+        self.epoch = 0
+
+    def __len__(self) -> int:
+        return len(self._attrs)
+
+    def __contains__(self, node: object) -> bool:
+        return node in self._attrs
+
+    # ---- maintenance -----------------------------------------------------
+
+    def add(self, node: str, attrs: Dict[str, Any]) -> None:
+        """Index node (again if its process attributes changed)."""
+        prev = self._attrs.get(node)
+        if prev is attrs:
+            return
+        if prev is not None:
+            # files and sockets never change; a process only when exe/comm do
+            # (attributes without them, e.g. of a parent, add nothing)
+            if prev.get("ntype") != NODE_PROCESS or "exe" not in attrs or (
+                    prev.get("exe") == attrs.get("exe") and prev.get("comm") == attrs.get("comm")):
+                self._attrs[node] = attrs if "exe" in attrs else prev
+                return
+            self._unindex(node, prev)
+        self._attrs[node] = attrs
+        self._index(node, attrs)
+
+    def add_nodes(self, nodes: Dict[str, Dict[str, Any]]) -> None:
+        add = self.add
+        for node, attrs in nodes.items():
+            add(node, attrs)
+
+    def remove(self, node: str) -> None:
+        attrs = self._attrs.pop(node, None)
+        if attrs is not None:
+            self._unindex(node, attrs)
+            self._maybe_compact()
+
+    def remove_nodes(self, nodes: Iterable[str]) -> None:
+        for node in nodes:
+            attrs = self._attrs.pop(node, None)
+            if attrs is not None:
+                self._unindex(node, attrs)
+        self._maybe_compact()
+
+    def _index(self, node: str, attrs: Dict[str, Any]) -> None:
+        ntype = attrs.get("ntype")
+        if ntype == NODE_FILE:
+            path = attrs.get("path") or ""
+            self.file_paths[path] = node
+            self._path_trie.add(path, node)
+            self._journal["path"].append(path)
+        elif ntype == NODE_SOCKET:
+            saddr = attrs.get("saddr") or ""
+            self.saddrs[saddr] = node
+            self._journal["saddr"].append(saddr)
+            ip = saddr_ip(saddr)
+            if ip is not None:
+                self._ips.add(ip, node)
+        elif ntype == NODE_PROCESS:
+            exe = attrs.get("exe") or ""
+            comm = attrs.get("comm") or ""
+            if exe:
+                nodes = self.exes.get(exe)
+                if nodes is None:
+                    nodes = self.exes[exe] = set()
+                    self._journal["exe"].append(exe)
+                nodes.add(node)
+                self._exe_trie.add(exe, node)
+                for suffix in _exe_suffixes(exe):
+                    self._names.setdefault(suffix, set()).add(node)
+            if comm:
+                nodes = self.comms.get(comm)
+                if nodes is None:
+                    nodes = self.comms[comm] = set()
+                    self._journal["comm"].append(comm)
+                nodes.add(node)
+                self._names.setdefault(comm.lower(), set()).add(node)
+
+    def _unindex(self, node: str, attrs: Dict[str, Any]) -> None:
+        ntype = attrs.get("ntype")
+        if ntype == NODE_FILE:
+            path = attrs.get("path") or ""
+            if self.file_paths.get(path) == node:
+                del self.file_paths[path]
+            self._path_trie.remove(path, node)
+        elif ntype == NODE_SOCKET:
+            saddr = attrs.get("saddr") or ""
+            if self.saddrs.get(saddr) == node:
+                del self.saddrs[saddr]
+            ip = saddr_ip(saddr)
+            if ip is not None:
+                self._ips.remove(ip, node)
+        elif ntype == NODE_PROCESS:
+            exe = attrs.get("exe") or ""
+            comm = attrs.get("comm") or ""
+            if exe:
+                self._discard(self.exes, exe, node)
+                self._exe_trie.remove(exe, node)
+                for suffix in _exe_suffixes(exe):
+                    self._discard(self._names, suffix, node)
+            if comm:
+                self._discard(self.comms, comm, node)
+                self._discard(self._names, comm.lower(), node)
+
+    @staticmethod
+    def _discard(index: Dict[str, Set[str]], key: str, node: str) -> None:
+        nodes = index.get(key)
+        if nodes is not None:
+            nodes.discard(node)
+            if not nodes:
+                del index[key]
+
+    def _maybe_compact(self) -> None:
+        # journals keep removed values; rewrite them once they are mostly stale
+        live = len(self.file_paths) + len(self.saddrs) + len(self.exes) + len(self.comms)
+        if sum(len(j) for j in self._journal.values()) > 2 * live + 4096:
+            self._journal = {
+                "path": list(self.file_paths),
+                "exe": list(self.exes),
+                "comm": list(self.comms),
+                "saddr": list(self.saddrs),
+            }
+            self.epoch += 1
+
+    # ---- queries ---------------------------------------------------------
+
+    def journal(self, field: str, start: int) -> Tuple[int, List[str]]:
+        """Values of field added from journal position start; (end, values).
+        Removed values may be included; positions restart when epoch changes."""
+        j = self._journal[field]
+        return len(j), j[start:]
+
+    def nodes_of(self, field: str, value: str) -> Set[str]:
+        """Nodes currently having value in field (one of JOURNAL_FIELDS)."""
+        if field == "path":
+            node = self.file_paths.get(value)
+            return {node} if node is not None else set()
+        if field == "saddr":
+            node = self.saddrs.get(value)
+            return {node} if node is not None else set()
+        if field == "exe":
+            return set(self.exes.get(value, ()))
+        return set(self.comms.get(value, ()))
+
+    def files_with_prefix(self, prefix: str) -> Set[str]:
+        return set(self._path_trie.prefix(prefix))
+
+    def procs_with_exe_prefix(self, prefix: str) -> Set[str]:
+        return set(self._exe_trie.prefix(prefix))
+
+    def procs_named(self, name: str) -> Set[str]:
+        """Processes whose comm equals name or whose exe ends with name as
+        whole path components ("nc", "bin/nc", "/usr/bin/nc"); case-insensitive."""
+        return set(self._names.get(name.lower().rstrip("/") or name.lower(), ()))
+
+    def sockets_in(self, net: _Net) -> Set[str]:
+        """Sockets whose address is in net (an ipaddress network; a single
+        address is a /32 or /128)."""
+        return self._ips.lookup(net)
+
+    @classmethod
+    def from_graph(cls, g: Any) -> "NodeIndex":
+        index = cls()
+        for n, dat in g.nodes(data=True):
+            index.add(n, dat)
+        return index
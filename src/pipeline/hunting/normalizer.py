@@ -1,8 +1,50 @@
 from __future__ import annotations
-from typing import Any, Dict, List, Optional
+from sys import intern
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional
 from src.pipeline.hunting.audit_stream import AuditRecord
-import datetime
-import re
+from src.pipeline.hunting.syscalls import CREATE, DELETE, EXIT, OTHER, READ, RENAME, WRITE, decode_syscall
+
+# actions a PATH record's nametype refines: an open(O_CREAT) that created its
+# file is a CREATE, an unlink-like one a DELETE
+_REFINED_ACTIONS = frozenset((READ, WRITE, OTHER))
+
+# per-process strings repeated by every event of a process; interned so the
+# events (and the graph attributes built from them) share one copy
+_INTERNED_FIELDS = ("kind", "uid", "exe", "comm", "cwd", "nametype")
+
+class AuditEvent(NamedTuple):
+    """One normalized event. Fields a kind does not have are None; the
+    repeated per-process strings are interned. to_dict() is the form the
+    collector writes (see event_store.EVENT_COLUMNS)."""
+
+    ts: float
+    kind: str
+    pid: Any
+    ppid: Any = None
+    uid: Optional[str] = None
+    exe: Optional[str] = None
+    comm: Optional[str] = None
+    cwd: Optional[str] = None
+    path: Optional[str] = None
+    nametype: Optional[str] = None
+    action: Optional[int] = None
+    saddr: Optional[str] = None
+    syscall: Optional[int] = None
+    serial: Optional[str] = None
+    argv: Optional[List[str]] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: v for k, v in zip(self._fields, self) if v is not None}
+
+    @classmethod
+    def from_dict(cls, ev: Mapping[str, Any]) -> "AuditEvent":
+        """Event from a decoded event log line; unknown keys are dropped."""
+        values = {k: ev[k] for k in cls._fields if k in ev}
+        for k in _INTERNED_FIELDS:
+            v = values.get(k)
+            if type(v) is str:
+                values[k] = intern(v)
+        return cls(**values)
 
 def _first(records: List[AuditRecord], rtype: str) -> Optional[AuditRecord]:
     for r in records:
@@ -15,25 +57,26 @@ def _get(rec: Optional[AuditRecord], key: str, default: str = "") -> str:
         return default
     return rec.kv.get(key, default)
 
-TS_RE = re.compile(r"audit\((\d+)\.(\d+):\d+\)")
-
-def _extract_ts(raw: str) -> float:
-    m = TS_RE.search(raw)
-    if not m:
-        return 0.0
-    sec = int(m.group(1))
-    usec = int(m.group(2))
-    return float(sec) + float(usec)/1000000.0
-
-def _syscall_name(syscall: str) -> str:
-    # some audit logs provide syscall name in 'syscall=' already (numeric). Keep numeric string.
-    return syscall
+def _target_path(records: List[AuditRecord], action: int) -> Optional[AuditRecord]:
+    # PATH records of one event list the parent directories (nametype=PARENT)
+    # before the objects; the object is the target, for renames the new name
+    paths = [r for r in records if r.record_type == "PATH"]
+    if not paths:
+        return None
+    want = "CREATE" if action == RENAME else None
+    for r in paths:
+        nametype = r.kv.get("nametype")
+        if nametype != "PARENT" and (want is None or nametype == want):
+            return r
+    for r in paths:
+        if r.kv.get("nametype") != "PARENT":
+            return r
+    return paths[0]
 
-def normalize_records(records: List[AuditRecord]) -> Optional[Dict[str, Any]]:
+def normalize_event(records: List[AuditRecord]) -> Optional[AuditEvent]:
     if not records:
         return None
-    raw0 = records[0].raw
-    ts = _extract_ts(raw0)
+    ts = records[0].ts
 
     syscall = _first(records, "SYSCALL")
     if syscall is None:
@@ -41,74 +84,95 @@ def normalize_records(records: List[AuditRecord]) -> Optional[Dict[str, Any]]:
 
     pid = _get(syscall, "pid")
     ppid = _get(syscall, "ppid")
-    uid = _get(syscall, "uid") or _get(syscall, "auid")
-    exe = _get(syscall, "exe").strip('"')
-    comm = _get(syscall, "comm").strip('"')
-    sc = _get(syscall, "syscall")
+    uid = intern(_get(syscall, "uid") or _get(syscall, "auid"))
+    exe = intern(_get(syscall, "exe").strip('"'))
+    comm = intern(_get(syscall, "comm").strip('"'))
+    sc, action = decode_syscall(syscall.kv)
+
+    # Process exit: exit_group ends the process (exit only ends a thread)
+    if action == EXIT:
+        return AuditEvent(
+            ts=ts,
+            kind="process_exit",
+            pid=int(pid) if pid.isdigit() else pid,
+            ppid=int(ppid) if ppid.isdigit() else ppid,
+            uid=uid,
+            exe=exe,
+            comm=comm,
+            action=action,
+            syscall=sc,
+            serial=records[0].serial,
+        )
 
     cwd_rec = _first(records, "CWD")
-    cwd = _get(cwd_rec, "cwd").strip('"')
+    cwd = intern(_get(cwd_rec, "cwd").strip('"'))
 
     # Process start / exec
     execve = _first(records, "EXECVE")
     if execve is not None:
-        argv = [v.strip('"') for k, v in sorted(execve.kv.items()) if k.startswith("a")]
-        return {
-            "ts": ts,
-            "kind": "process_start",
-            "pid": int(pid) if pid.isdigit() else pid,
-            "ppid": int(ppid) if ppid.isdigit() else ppid,
-            "uid": uid,
-            "exe": exe,
-            "comm": comm,
-            "cwd": cwd,
-            "syscall": sc,
-            "argv": argv,
-            "serial": records[0].serial,
-        }
+        args = [(int(k[1:]), v) for k, v in execve.kv.items() if k[:1] == "a" and k[1:].isdigit()]
+        argv = [v for _, v in sorted(args)]
+        return AuditEvent(
+            ts=ts,
+            kind="process_start",
+            pid=int(pid) if pid.isdigit() else pid,
+            ppid=int(ppid) if ppid.isdigit() else ppid,
+            uid=uid,
+            exe=exe,
+            comm=comm,
+            cwd=cwd,
+            action=action,
+            syscall=sc,
+            argv=argv,
+            serial=records[0].serial,
+        )
 
     # File ops: PATH record exists
-    path_rec = _first(records, "PATH")
+    path_rec = _target_path(records, action)
     if path_rec is not None:
         name = _get(path_rec, "name").strip('"')
-        nametype = _get(path_rec, "nametype")
-        # crude action inference: use syscall number bucket + nametype
-        action = "OTHER"
-        if nametype in ("CREATE", "CREATE-TRUNCATE"):
-            action = "CREATE"
-        elif nametype == "DELETE":
-            action = "DELETE"
-        # if open/read/write not directly known, tag by comm/syscall
-        return {
-            "ts": ts,
-            "kind": "file_op",
-            "pid": int(pid) if pid.isdigit() else pid,
-            "uid": uid,
-            "exe": exe,
-            "comm": comm,
-            "cwd": cwd,
-            "path": name,
-            "nametype": nametype,
-            "action": action,
-            "syscall": sc,
-            "serial": records[0].serial,
-        }
+        nametype = intern(_get(path_rec, "nametype"))
+        if action in _REFINED_ACTIONS:
+            if nametype in ("CREATE", "CREATE-TRUNCATE"):
+                action = CREATE
+            elif nametype == "DELETE":
+                action = DELETE
+        return AuditEvent(
+            ts=ts,
+            kind="file_op",
+            pid=int(pid) if pid.isdigit() else pid,
+            uid=uid,
+            exe=exe,
+            comm=comm,
+            cwd=cwd,
+            path=name,
+            nametype=nametype,
+            action=action,
+            syscall=sc,
+            serial=records[0].serial,
+        )
 
     # Network connect: SOCKADDR
     sock = _first(records, "SOCKADDR")
     if sock is not None:
         saddr = _get(sock, "saddr")
-        return {
-            "ts": ts,
-            "kind": "net_op",
-            "pid": int(pid) if pid.isdigit() else pid,
-            "uid": uid,
-            "exe": exe,
-            "comm": comm,
-            "cwd": cwd,
-            "saddr": saddr,
-            "syscall": sc,
-            "serial": records[0].serial,
-        }
+        return AuditEvent(
+            ts=ts,
+            kind="net_op",
+            pid=int(pid) if pid.isdigit() else pid,
+            uid=uid,
+            exe=exe,
+            comm=comm,
+            cwd=cwd,
+            saddr=saddr,
+            action=action,
+            syscall=sc,
+            serial=records[0].serial,
+        )
 
     return None
+
+def normalize_records(records: List[AuditRecord]) -> Optional[Dict[str, Any]]:
+    """normalize_event as the dict the collector writes."""
+    ev = normalize_event(records)
+    return None if ev is None else ev.to_dict()
@@ -1,7 +1,8 @@
 from __future__ import annotations
 from pathlib import Path
 import logging
-from src.engine.megr_adapter import MEGRArgs, megr_predict
+from typing import Any, List, Optional, Sequence, Tuple
+from src.engine.megr_adapter import MEGRArgs, load_vocabulary, megr_predict
 
 log = logging.getLogger(__name__)
 
@@ -15,3 +16,63 @@ def run_predict(dataset_engine_name: str, experiment_path: Path, predict_file: s
         threshold=threshold,
     )
     return megr_predict(args)
+
+class Predictor:
+    # prediction setup resolved once per process; follow mode reuses it
+    # for every cycle. mode="inprocess" keeps MEGRAPT and the query graphs
+    # resident and returns the similarity matrix; mode="subprocess" runs the
+    # engine CLI on the saved predict_file and returns None.
+    def __init__(self, dataset_engine_name: str, experiment_path: Path, checkpoint: Path, threshold: float = 0.5,
+                 mode: str = "inprocess") -> None:
+        if mode not in ("inprocess", "subprocess"):
+            raise ValueError(f"Unknown predict mode: {mode!r}")
+        self.dataset_engine_name = dataset_engine_name
+        self.experiment_path = experiment_path
+        self.checkpoint = checkpoint
+        self.threshold = threshold
+        self.mode = mode
+        self._scorer = None
+        self._queries: dict = {}
+
+    @property
+    def vocabulary(self) -> Any:
+        """Label vocabulary of the dataset; candidates are exported with it."""
+        return load_vocabulary(self.dataset_engine_name)
+
+    def _query_graphs(self, query_name: str) -> List[Any]:
+        if query_name not in self._queries:
+            from src.engine.megr_scorer import load_query_graphs
+            self._queries[query_name] = load_query_graphs(self.experiment_path, query_name)
+        return self._queries[query_name]
+
+    def query_size(self, query_name: str) -> Optional[Tuple[int, int]]:
+        """(nodes, edges) of the largest query graph named query_name, or None
+        if there is none (or no query dataset)."""
+        try:
+            graphs = self._query_graphs(query_name)
+        except FileNotFoundError:
+            return None
+        if not graphs:
+            return None
+        return max(int(q.num_nodes) for q in graphs), max(int(q.num_edges) for q in graphs)
+
+    def score(self, query_name: str, candidates: Sequence[Any]) -> Any:
+        if self._scorer is None:
+            from src.engine.megr_scorer import MegraptScorer
+            self._scorer = MegraptScorer(self.checkpoint, self.dataset_engine_name,
+                                         cache_dir=Path(self.experiment_path)/"processed/query_embeddings")
+            log.info("Loaded MEGRAPT checkpoint %s", self.checkpoint)
+        return self._scorer.score(self._query_graphs(query_name), candidates)
+
+    def predict(self, predict_file: str, query_name: str, candidates: Optional[Sequence[Any]] = None) -> Any:
+        if self.mode == "subprocess" or candidates is None:
+            rc = run_predict(self.dataset_engine_name, self.experiment_path, predict_file, self.checkpoint, self.threshold)
+            log.info("Engine predict return code: %s", rc)
+            return None
+        sim = self.score(query_name, candidates)
+        if sim.size == 0:
+            log.info("No query graphs named %r or no candidates to score", query_name)
+            return sim
+        alarms = int((sim > self.threshold).any(axis=0).sum())
+        log.info("Highest similarity: %.4f; candidates over threshold %.2f: %d", float(sim.max()), self.threshold, alarms)
+        return sim
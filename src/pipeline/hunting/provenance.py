@@ -1,15 +1,43 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Any, Dict, Iterable, List, Set, Tuple
+from itertools import repeat
+from sys import intern
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+import heapq
 import networkx as nx
+import numpy as np
 import time
 
-NODE_PROCESS = "process"
-NODE_FILE = "file"
-NODE_SOCKET = "socket"
+from src.pipeline.hunting.compact_graph import CompactDiGraph
+from src.pipeline.hunting.node_index import NODE_FILE, NODE_PROCESS, NODE_SOCKET, NodeIndex
+from src.pipeline.hunting.normalizer import AuditEvent
+from src.pipeline.hunting.syscalls import EDGE_ACTION_NAMES
 
-def _proc_node(pid: Any) -> str:
-    return f"p:{pid}"
+_EVENT_KINDS = frozenset(("process_start", "process_exit", "file_op", "net_op"))
+# event fields read by WindowedProvenanceGraph._updates, in argument order
+_UPDATE_FIELDS = ("kind", "pid", "ppid", "exe", "comm", "path", "action", "saddr")
+# edge type of a file_op per action: normalizer action codes, and the names
+# written by older collectors, whose OTHER (anything but create/delete) and
+# missing actions stay conservatively READ
+_FILE_ETYPES: Dict[Any, str] = {
+    **dict(enumerate(EDGE_ACTION_NAMES)),
+    **{name: name for name in EDGE_ACTION_NAMES},
+    "OTHER": "READ",
+}
+
+# attributes of a parent process not seen yet; shared, never mutated
+_PARENT_ATTRS: Dict[str, Any] = {"ntype": NODE_PROCESS}
+# parents an orphaned process is re-parented to; a changed ppid is no pid reuse then
+_REAPER_PIDS = frozenset((1, "1"))
+
+# (u, u attrs, v, v attrs, etype) of one event
+Update = Tuple[str, Dict[str, Any], str, Dict[str, Any], str]
+# per-pid cache entry of the running process: (node, attrs, ppid)
+_Proc = Tuple[str, Dict[str, Any], Any]
+
+def _proc_node(pid: Any, start_ts: float) -> str:
+    # pids are reused, so a process is keyed by pid and the time it was first seen
+    return f"p:{pid}:{start_ts:.3f}"
 
 def _file_node(path: str) -> str:
     return f"f:{path}"
@@ -24,44 +52,279 @@ class WindowedProvenanceGraph:
 
     def __post_init__(self):
         self.g = nx.DiGraph()
+        # min-heap of (ts, u, v) keyed by edge timestamp; entries
+        # whose edge was re-stamped or already removed are skipped lazily
+        self._expiry: List[Tuple[float, str, str]] = []
+        # endpoints of evicted edges and exited processes: the only nodes
+        # that can become removable
+        self._orphans: Set[str] = set()
+        # isolated nodes of running processes, trimmed only above max_nodes
+        self._idle: Set[str] = set()
+        self._init_procs()
+        # attribute indexes of the nodes in the window, for seeding
+        self.index = NodeIndex()
+
+    def _init_procs(self) -> None:
+        # running processes per pid and their nodes
+        self._procs: Dict[Any, _Proc] = {}
+        self._live: Set[str] = set()
+
+    def _add_edge(self, u: str, v: str, etype: str, ts: float) -> None:
+        self.g.add_edge(u, v, etype=etype, ts=ts)
+        heapq.heappush(self._expiry, (ts, u, v))
 
     def _prune(self, now_ts: float) -> None:
         cutoff = now_ts - self.window_seconds
-        # remove old edges; keep nodes if still connected
-        remove_edges = [(u,v) for u,v,dat in self.g.edges(data=True) if dat.get("ts", now_ts) < cutoff]
-        self.g.remove_edges_from(remove_edges)
+        # pop only the edges that actually expired; keep nodes if still connected
+        heap = self._expiry
+        while heap and heap[0][0] < cutoff:
+            ts, u, v = heapq.heappop(heap)
+            dat = self.g.get_edge_data(u, v)
+            if dat is None or dat.get("ts", now_ts) != ts:
+                continue
+            self.g.remove_edge(u, v)
+            self._orphans.add(u)
+            self._orphans.add(v)
+        g = self.g
+        if self._orphans:
+            # isolated files, sockets and exited processes go right away;
+            # running processes stay until they exit
+            live, idle = self._live, self._idle
+            drop = []
+            for n in self._orphans:
+                if n in g and g.degree(n) == 0:
+                    if n in live:
+                        idle.add(n)
+                    else:
+                        drop.append(n)
+            g.remove_nodes_from(drop)
+            self.index.remove_nodes(drop)
+            self._orphans = set()
         # optional: trim isolated nodes if too big
-        if self.g.number_of_nodes() > self.max_nodes:
-            isolates = list(nx.isolates(self.g))
-            self.g.remove_nodes_from(isolates[: max(0, len(isolates)//2)])
+        if g.number_of_nodes() > self.max_nodes:
+            isolates = [n for n in self._idle if n in g and g.degree(n) == 0]
+            drop = isolates[: max(0, len(isolates)//2)]
+            g.remove_nodes_from(drop)
+            self.index.remove_nodes(drop)
+            self._idle = {n for n in isolates if n in g}
 
-    def ingest(self, ev: Dict[str, Any]) -> None:
-        ts = float(ev.get("ts", time.time()))
-        kind = ev.get("kind")
-        self._prune(ts)
+    @staticmethod
+    def _proc_attrs(exe: Any, comm: Any) -> Dict[str, Any]:
+        return {"ntype": NODE_PROCESS, "exe": intern(exe) if exe else "", "comm": intern(comm) if comm else ""}
+
+    def _start_proc(self, ts: Any, pid: Any, ppid: Any, attrs: Dict[str, Any]) -> _Proc:
+        key = _proc_node(pid, time.time() if ts is None else float(ts))
+        entry = self._procs[pid] = (key, attrs, ppid)
+        self._live.add(key)
+        return entry
+
+    def _end_proc(self, pid: Any) -> None:
+        entry = self._procs.pop(pid, None)
+        if entry is not None:
+            self._live.discard(entry[0])
+            self._idle.discard(entry[0])
+            # removed by the next prune once its edges have aged out
+            self._orphans.add(entry[0])
 
+    def _proc(self, ts: Any, pid: Any, exe: Any, comm: Any) -> _Proc:
+        # cache entry of a running process: the attribute dict is built once
+        # (on process_start, or the first event of a process seen running)
+        # and handed to every later event of the process as is
+        entry = self._procs.get(pid)
+        if entry is None:
+            entry = self._start_proc(ts, pid, None, self._proc_attrs(exe, comm))
+        elif entry[1] is _PARENT_ATTRS and (exe or comm):
+            # first own event of a process only known as a parent so far
+            entry = self._procs[pid] = (entry[0], self._proc_attrs(exe, comm), entry[2])
+        return entry
+
+    def _trim_procs(self) -> None:
+        # forget processes whose node left the graph once the cache outgrows it
+        # (exits not audited)
+        if len(self._procs) > self.max_nodes:
+            g = self.g
+            self._procs = {pid: e for pid, e in self._procs.items() if e[0] in g}
+            self._live = {e[0] for e in self._procs.values()}
+            self._idle &= self._live
+
+    def _updates(self, ts: Any, kind: Any, pid: Any, ppid: Any, exe: Any, comm: Any, path: Any, action: Any,
+                 saddr: Any) -> Optional[Update]:
+        # map one normalized event to its edge and the attributes of both
+        # endpoints; None stands for a missing field. Process attributes are
+        # only updated by process_start.
         if kind == "process_start":
-            p = _proc_node(ev["pid"])
-            pp = _proc_node(ev.get("ppid", "0"))
-            self.g.add_node(p, ntype=NODE_PROCESS, exe=ev.get("exe",""), comm=ev.get("comm",""))
-            self.g.add_node(pp, ntype=NODE_PROCESS)
-            self.g.add_edge(pp, p, etype="FORK", ts=ts)
-            return
+            if ppid is None:
+                ppid = "0"
+            attrs = self._proc_attrs(exe, comm)
+            entry = self._procs.get(pid)
+            if entry is None or (entry[2] is not None and entry[2] != ppid and ppid not in _REAPER_PIDS):
+                # a new process, or the pid was reused without its exit being seen
+                self._end_proc(pid)
+                p = self._start_proc(ts, pid, ppid, attrs)[0]
+            else:
+                # exec in a running process: same process, new image
+                p = entry[0]
+                self._procs[pid] = (p, attrs, ppid)
+            parent = self._procs.get(ppid)
+            if parent is None:
+                parent = self._start_proc(ts, ppid, None, _PARENT_ATTRS)
+            return parent[0], parent[1], p, attrs, "FORK"
 
         if kind == "file_op":
-            p = _proc_node(ev["pid"])
-            f = _file_node(ev.get("path",""))
-            self.g.add_node(p, ntype=NODE_PROCESS, exe=ev.get("exe",""), comm=ev.get("comm",""))
-            self.g.add_node(f, ntype=NODE_FILE, path=ev.get("path",""))
-            act = ev.get("action","OTHER")
-            etype = "READ" if act == "OTHER" else act  # conservative
-            self.g.add_edge(p, f, etype=etype, ts=ts)
-            return
+            p, attrs, _ = self._proc(ts, pid, exe, comm)
+            path = path or ""
+            return p, attrs, _file_node(path), {"ntype": NODE_FILE, "path": path}, _FILE_ETYPES.get(action, "READ")
 
         if kind == "net_op":
-            p = _proc_node(ev["pid"])
-            s = _sock_node(ev.get("saddr",""))
-            self.g.add_node(p, ntype=NODE_PROCESS, exe=ev.get("exe",""), comm=ev.get("comm",""))
-            self.g.add_node(s, ntype=NODE_SOCKET, saddr=ev.get("saddr",""))
-            self.g.add_edge(p, s, etype="CONNECT", ts=ts)
+            p, attrs, _ = self._proc(ts, pid, exe, comm)
+            saddr = saddr or ""
+            return p, attrs, _sock_node(saddr), {"ntype": NODE_SOCKET, "saddr": saddr}, "CONNECT"
+
+        if kind == "process_exit":
+            self._end_proc(pid)
+
+        return None
+
+    def _event_updates(self, ev: Any) -> Optional[Update]:
+        if type(ev) is AuditEvent:
+            return self._updates(ev.ts, ev.kind, ev.pid, ev.ppid, ev.exe, ev.comm, ev.path, ev.action, ev.saddr)
+        kind = ev.get("kind")
+        if kind not in _EVENT_KINDS:
+            return None
+        return self._updates(ev.get("ts"), kind, ev["pid"], ev.get("ppid"), ev.get("exe"), ev.get("comm"),
+                             ev.get("path"), ev.get("action"), ev.get("saddr"))
+
+    def ingest(self, ev: Union[AuditEvent, Dict[str, Any]]) -> None:
+        """Add one event: a normalizer.AuditEvent or its dict form."""
+        ts = ev.ts if type(ev) is AuditEvent else ev.get("ts")
+        ts = float(time.time() if ts is None else ts)
+        self._prune(ts)
+        upd = self._event_updates(ev)
+        if upd is None:
+            return
+        u, u_attrs, v, v_attrs, etype = upd
+        self.g.add_node(u, **u_attrs)
+        self.g.add_node(v, **v_attrs)
+        self.index.add(u, u_attrs)
+        self.index.add(v, v_attrs)
+        self._add_edge(u, v, etype, ts)
+        self._trim_procs()
+
+    def ingest_batch(self, events: Iterable[Union[AuditEvent, Dict[str, Any]]]) -> int:
+        # node upserts are last-write-wins per key, like edges per (u, v), so
+        # the result matches ingesting the events one by one; pruning runs
+        # once against the batch's max timestamp
+        return self._ingest_updates(
+            (ev.ts if type(ev) is AuditEvent else ev.get("ts"), self._event_updates(ev)) for ev in events
+        )
+
+    def ingest_columns(self, cols: Dict[str, Sequence[Any]]) -> int:
+        """ingest_batch for column-oriented events (see event_store.EVENT_COLUMNS):
+        equal-length sequences per field, None for missing values."""
+        missing = repeat(None)
+        rows = zip(cols["ts"], *(cols.get(k, missing) for k in _UPDATE_FIELDS))
+        updates = self._updates
+        return self._ingest_updates(
+            (ts, updates(ts, kind, pid, ppid, exe, comm, path, action, saddr))
+            for ts, kind, pid, ppid, exe, comm, path, action, saddr in rows
+        )
+
+    def _ingest_updates(self, updates: Iterable[Tuple[Any, Optional[Update]]]) -> int:
+        # every update carries the complete attributes of both endpoints (the
+        # cached ones for processes), so the last one per node wins
+        node_attrs: Dict[str, Dict[str, Any]] = {}
+        edges: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        max_ts: Optional[float] = None
+        count = 0
+        for ts, upd in updates:
+            count += 1
+            ts = float(time.time() if ts is None else ts)
+            if max_ts is None or ts > max_ts:
+                max_ts = ts
+            if upd is None:
+                continue
+            u, u_attrs, v, v_attrs, etype = upd
+            if u_attrs is not _PARENT_ATTRS or u not in node_attrs:
+                node_attrs[u] = u_attrs
+            node_attrs[v] = v_attrs
+            edges[(u, v)] = (etype, ts)
+
+        if max_ts is None:
+            return 0
+        self.g.add_nodes_from(node_attrs.items())
+        self.index.add_nodes(node_attrs)
+        self._add_edges(edges)
+        self._prune(max_ts)
+        self._trim_procs()
+        return count
+
+    def _add_edges(self, edges: Dict[Tuple[str, str], Tuple[str, float]]) -> None:
+        self.g.add_edges_from((u, v, {"etype": etype, "ts": ts}) for (u, v), (etype, ts) in edges.items())
+        for (u, v), (_etype, ts) in edges.items():
+            heapq.heappush(self._expiry, (ts, u, v))
+
+@dataclass
+class CompactProvenanceGraph(WindowedProvenanceGraph):
+    # Same ingest semantics as WindowedProvenanceGraph, backed by the
+    # array-based CompactDiGraph. Expiry is a vectorized scan over the edge
+    # columns, so it runs at most once per prune_interval seconds of event
+    # time; edges may outlive the window by up to prune_interval.
+    prune_interval: float = 1.0
+
+    def __post_init__(self):
+        self.g = CompactDiGraph()
+        self._next_prune: Optional[float] = None
+        # exited processes; the expired edges' endpoints come from expire()
+        self._orphans: Set[str] = set()
+        self._idle: Set[str] = set()
+        self._init_procs()
+        self.index = NodeIndex()
+
+    def _add_edge(self, u: str, v: str, etype: str, ts: float) -> None:
+        self.g.add_edge(u, v, etype=etype, ts=ts)
+
+    def _add_edges(self, edges: Dict[Tuple[str, str], Tuple[str, float]]) -> None:
+        self.g.add_edges_from((u, v, {"etype": etype, "ts": ts}) for (u, v), (etype, ts) in edges.items())
+
+    def _prune(self, now_ts: float) -> None:
+        if self._next_prune is not None and now_ts < self._next_prune:
             return
+        self._next_prune = now_ts + self.prune_interval
+        g = self.g
+        candidates = np.union1d(g.expire(now_ts - self.window_seconds), g.node_ids(self._orphans))
+        self._orphans = set()
+        if len(candidates):
+            # isolated files, sockets and exited processes go right away;
+            # running processes stay until they exit
+            isolated = np.intersect1d(candidates, g.isolate_ids())
+            live, idle = self._live, self._idle
+            drop = []
+            for i, n in zip(isolated.tolist(), g.node_keys(isolated)):
+                if n in live:
+                    idle.add(n)
+                else:
+                    drop.append((i, n))
+            if drop:
+                g.remove_node_ids(np.asarray([i for i, _ in drop], dtype=np.int64))
+                self.index.remove_nodes(n for _, n in drop)
+        if g.edge_rows() > 2 * g.number_of_edges() + 1024:
+            g.compact()
+        # optional: trim isolated nodes if too big
+        if g.number_of_nodes() > self.max_nodes:
+            isolates = np.intersect1d(g.node_ids(self._idle), g.isolate_ids())
+            drop = isolates[: max(0, len(isolates)//2)]
+            self.index.remove_nodes(g.node_keys(drop))
+            g.remove_node_ids(drop)
+            self._idle = set(g.node_keys(isolates[len(drop):]))
+
+GRAPH_BACKENDS = {
+    "networkx": WindowedProvenanceGraph,
+    "compact": CompactProvenanceGraph,
+}
+
+def make_provenance_graph(backend: str = "networkx", **kwargs: Any) -> WindowedProvenanceGraph:
+    try:
+        cls = GRAPH_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown graph backend: {backend!r} (expected one of {sorted(GRAPH_BACKENDS)})")
+    return cls(**kwargs)
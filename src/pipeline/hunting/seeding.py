@@ -1,11 +1,20 @@
 from __future__ import annotations
-from typing import Dict, List, Set, Tuple, Optional
+from typing import Any, Dict, Iterable, List, Set, Tuple, Optional
 from pathlib import Path
+import ipaddress
 import json
 import networkx as nx
 
+from src.pipeline.hunting.node_index import NodeIndex
+
 SUSPICIOUS_PATH_PREFIXES = ("/tmp/", "/dev/shm/", "/var/tmp/")
 
+# Seeding runs on the NodeIndex of the provenance window instead of scanning
+# every node once per indicator. Substring indicators (file_path on paths,
+# command_line on exe/comm, domain on saddr) go through one Aho-Corasick
+# automaton per field, built once per seeds file; process_name matches comm
+# or whole trailing exe components, ip matches addresses by value or CIDR.
+
 
 def _load_cti_seeds(path: Optional[str]) -> Tuple[List[dict], List[dict]]:
     if not path:
@@ -20,53 +29,159 @@ def _load_cti_seeds(path: Optional[str]) -> Tuple[List[dict], List[dict]]:
         return [], []
 
 
-def _match_indicator_to_nodes(g: nx.DiGraph, ind: dict) -> Set[str]:
-    typ = (ind.get("type") or "").strip()
-    val = (ind.get("value") or "").strip()
-    if not typ or not val:
-        return set()
-    vlow = val.lower()
-    out: Set[str] = set()
-
-    for n, dat in g.nodes(data=True):
-        ntype = dat.get("ntype")
-        if typ == "file_path" and ntype == "file":
-            if vlow in (dat.get("path", "").lower()):
-                out.add(n)
-        elif typ in ("process_name", "command_line") and ntype == "process":
-            exe = (dat.get("exe", "").lower())
-            comm = (dat.get("comm", "").lower())
-            if vlow in exe or vlow in comm:
-                out.add(n)
-        elif typ in ("ip", "domain") and ntype == "socket":
-            saddr = (dat.get("saddr", "").lower())
-            if vlow in saddr:
-                out.add(n)
-    return out
+class AhoCorasick:
+    """Matches a text against many substrings at once (pure Python)."""
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        goto: List[Dict[str, int]] = [{}]
+        final = [False]
+        for pattern in patterns:
+            if not pattern:
+                continue
+            s = 0
+            for c in pattern:
+                nxt = goto[s].get(c)
+                if nxt is None:
+                    nxt = goto[s][c] = len(goto)
+                    goto.append({})
+                    final.append(False)
+                s = nxt
+            final[s] = True
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for s in queue:
+            for c, nxt in goto[s].items():
+                f = fail[s]
+                while f and c not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(c, 0)
+                final[nxt] = final[nxt] or final[fail[nxt]]
+                queue.append(nxt)
+        self._goto = goto
+        self._fail = fail
+        self._final = final
+        self.empty = len(goto) == 1
+
+    def search(self, text: str) -> bool:
+        """True if any pattern occurs in text."""
+        goto, fail, final = self._goto, self._fail, self._final
+        s = 0
+        for c in text:
+            while s and c not in goto[s]:
+                s = fail[s]
+            s = goto[s].get(c, 0)
+            if final[s]:
+                return True
+        return False
+
+
+class SeedMatcher:
+    """The indicators of one seeds file, matched against a NodeIndex.
+
+    Substring matching is incremental: every distinct value is checked once
+    (lowercased), when it first appears in the index journal, and matching
+    values are kept until they leave the index.
+    """
+
+    def __init__(self, indicators: Iterable[dict]) -> None:
+        substrings: Dict[str, Set[str]] = {"path": set(), "exe": set(), "saddr": set()}
+        self.names: Set[str] = set()
+        self.nets: List[Any] = []
+        for ind in indicators:
+            typ = (ind.get("type") or "").strip()
+            val = (ind.get("value") or "").strip()
+            if not typ or not val:
+                continue
+            if typ == "file_path":
+                substrings["path"].add(val.lower())
+            elif typ == "command_line":
+                substrings["exe"].add(val.lower())
+            elif typ == "process_name":
+                self.names.add(val)
+            elif typ == "ip":
+                try:
+                    self.nets.append(ipaddress.ip_network(val, strict=False))
+                except ValueError:
+                    substrings["saddr"].add(val.lower())
+            elif typ == "domain":
+                substrings["saddr"].add(val.lower())
+        automata = {field: AhoCorasick(sorted(pats)) for field, pats in substrings.items() if pats}
+        if "exe" in automata:
+            automata["comm"] = automata["exe"]
+        self._automata = automata
+        self._index: Optional[NodeIndex] = None
+        self._epoch = -1
+        self._cursors: Dict[str, int] = {}
+        self._hits: Dict[str, Set[str]] = {}
+
+    def match(self, index: NodeIndex) -> Set[str]:
+        if index is not self._index or index.epoch != self._epoch:
+            self._index, self._epoch = index, index.epoch
+            self._cursors = dict.fromkeys(self._automata, 0)
+            self._hits = {field: set() for field in self._automata}
+        out: Set[str] = set()
+        for field, ac in self._automata.items():
+            end, values = index.journal(field, self._cursors[field])
+            self._cursors[field] = end
+            hits = self._hits[field]
+            for v in values:
+                if v not in hits and ac.search(v.lower()):
+                    hits.add(v)
+            gone = []
+            for v in hits:
+                nodes = index.nodes_of(field, v)
+                if nodes:
+                    out |= nodes
+                else:
+                    gone.append(v)
+            hits.difference_update(gone)
+        for name in self.names:
+            out |= index.procs_named(name)
+        for net in self.nets:
+            out |= index.sockets_in(net)
+        return out
+
+
+# seeds file -> ((mtime, size), matcher); rebuilt when the file changes
+_MATCHERS: Dict[str, Tuple[Tuple[int, int], SeedMatcher]] = {}
+
+
+def _seed_matcher(path: Optional[str]) -> Optional[SeedMatcher]:
+    if not path:
+        return None
+    try:
+        st = Path(path).stat()
+    except OSError:
+        return None
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _MATCHERS.get(path)
+    if cached is None or cached[0] != stamp:
+        _techs, inds = _load_cti_seeds(path)
+        cached = _MATCHERS[path] = (stamp, SeedMatcher(inds))
+    return cached[1]
+
 
 def find_seeds(
     g: nx.DiGraph,
     query_name: Optional[str] = None,
     cti_seeds_path: Optional[str] = None,
+    index: Optional[NodeIndex] = None,
 ) -> List[str]:
+    """Seed nodes of g. index is the NodeIndex kept by the provenance graph
+    (WindowedProvenanceGraph.index); without it one is built from g."""
+    if index is None:
+        index = NodeIndex.from_graph(g)
     seeds: Set[str] = set()
 
     # 0) CTI-derived indicators (preferred)
-    _techs, inds = _load_cti_seeds(cti_seeds_path)
-    for ind in inds:
-        seeds |= _match_indicator_to_nodes(g, ind)
-
-    # Heuristic: suspicious file paths
-    for n, dat in g.nodes(data=True):
-        if dat.get("ntype") == "file":
-            path = dat.get("path","")
-            if path.startswith(SUSPICIOUS_PATH_PREFIXES):
-                seeds.add(n)
-    # Heuristic: processes with exe in temp paths
-    for n, dat in g.nodes(data=True):
-        if dat.get("ntype") == "process":
-            exe = dat.get("exe","")
-            if exe.startswith(SUSPICIOUS_PATH_PREFIXES):
-                seeds.add(n)
+    matcher = _seed_matcher(cti_seeds_path)
+    if matcher is not None:
+        seeds |= matcher.match(index)
+
+    for prefix in SUSPICIOUS_PATH_PREFIXES:
+        # Heuristic: suspicious file paths
+        seeds |= index.files_with_prefix(prefix)
+        # Heuristic: processes with exe in temp paths
+        seeds |= index.procs_with_exe_prefix(prefix)
     # If query_name is provided, keep as tag (future extension)
     return list(seeds)
@@ -0,0 +1,133 @@
+from __future__ import annotations
+from typing import Dict, Mapping, Optional, Tuple
+
+# Syscall decoding for the normalizer. SYSCALL records carry the syscall
+# number and the audit arch (AUDIT_ARCH_* in hex, or the name in ausearch -i
+# output). Per arch, a tuple indexed by syscall number holds the action code
+# of every known syscall, so decoding is one dict lookup for the arch and one
+# tuple index. Action codes are small ints and double as edge type ids: the
+# code is the index of the edge type in ACTION_NAMES (export_megr maps the
+# names onto the dataset's label vocabulary). EXIT (exit_group) ends a
+# process and is not an edge type.
+
+ACTION_NAMES = (
+    "FORK", "READ", "WRITE", "CREATE", "DELETE", "CONNECT", "OTHER", "EXECUTE", "RENAME", "MMAP", "EXIT",
+)
+FORK, READ, WRITE, CREATE, DELETE, CONNECT, OTHER, EXECUTE, RENAME, MMAP, EXIT = range(len(ACTION_NAMES))
+EDGE_ACTION_NAMES = ACTION_NAMES[:EXIT]
+
+ACTION_CODES: Dict[str, int] = {name: code for code, name in enumerate(ACTION_NAMES)}
+
+_SYSCALL_ACTIONS: Dict[str, int] = {
+    **dict.fromkeys(("clone", "clone3", "fork", "vfork"), FORK),
+    **dict.fromkeys((
+        "read", "pread64", "readv", "preadv", "preadv2", "open", "openat", "openat2", "stat", "fstat", "lstat",
+        "newfstatat", "statx", "access", "faccessat", "faccessat2", "readlink", "readlinkat", "getdents",
+        "getdents64", "recvfrom", "recvmsg",
+    ), READ),
+    **dict.fromkeys((
+        "write", "pwrite64", "writev", "pwritev", "pwritev2", "truncate", "ftruncate", "sendfile",
+        "copy_file_range", "sendto", "sendmsg", "chmod", "fchmod", "fchmodat", "chown", "fchown", "lchown",
+        "fchownat", "setxattr", "lsetxattr", "fsetxattr", "removexattr", "utime", "utimes", "utimensat",
+    ), WRITE),
+    **dict.fromkeys((
+        "creat", "mkdir", "mkdirat", "mknod", "mknodat", "link", "linkat", "symlink", "symlinkat",
+    ), CREATE),
+    **dict.fromkeys(("unlink", "unlinkat", "rmdir"), DELETE),
+    **dict.fromkeys(("connect", "accept", "accept4", "bind", "listen"), CONNECT),
+    **dict.fromkeys(("execve", "execveat"), EXECUTE),
+    **dict.fromkeys(("rename", "renameat", "renameat2"), RENAME),
+    **dict.fromkeys(("mmap", "mprotect"), MMAP),
+    "exit_group": EXIT,
+}
+
+# syscall numbers (arch/x86/entry/syscalls/syscall_64.tbl, include/uapi/asm-generic/unistd.h)
+_X86_64: Dict[str, int] = {
+    "read": 0, "write": 1, "open": 2, "stat": 4, "fstat": 5, "lstat": 6, "mmap": 9, "mprotect": 10,
+    "pread64": 17, "pwrite64": 18, "readv": 19, "writev": 20, "access": 21, "sendfile": 40, "connect": 42,
+    "accept": 43, "sendto": 44, "recvfrom": 45, "sendmsg": 46, "recvmsg": 47, "bind": 49, "listen": 50,
+    "clone": 56, "fork": 57, "vfork": 58, "execve": 59, "truncate": 76, "ftruncate": 77, "getdents": 78,
+    "rename": 82, "mkdir": 83, "rmdir": 84, "creat": 85, "link": 86, "unlink": 87, "symlink": 88,
+    "readlink": 89, "chmod": 90, "fchmod": 91, "chown": 92, "fchown": 93, "lchown": 94, "utime": 132,
+    "mknod": 133, "setxattr": 188, "lsetxattr": 189, "fsetxattr": 190, "removexattr": 197, "getdents64": 217,
+    "exit_group": 231, "utimes": 235, "openat": 257, "mkdirat": 258, "mknodat": 259, "fchownat": 260,
+    "newfstatat": 262, "unlinkat": 263, "renameat": 264, "linkat": 265, "symlinkat": 266, "readlinkat": 267,
+    "fchmodat": 268, "faccessat": 269, "utimensat": 280, "accept4": 288, "preadv": 295, "pwritev": 296,
+    "renameat2": 316, "execveat": 322, "copy_file_range": 326, "preadv2": 327, "pwritev2": 328, "statx": 332,
+    "clone3": 435, "openat2": 437, "faccessat2": 439,
+}
+
+_AARCH64: Dict[str, int] = {
+    "setxattr": 5, "lsetxattr": 6, "fsetxattr": 7, "removexattr": 14, "mknodat": 33, "mkdirat": 34,
+    "unlinkat": 35, "symlinkat": 36, "linkat": 37, "renameat": 38, "truncate": 45, "ftruncate": 46,
+    "faccessat": 48, "fchmod": 52, "fchmodat": 53, "fchownat": 54, "fchown": 55, "openat": 56,
+    "getdents64": 61, "read": 63, "write": 64, "readv": 65, "writev": 66, "pread64": 67, "pwrite64": 68,
+    "preadv": 69, "pwritev": 70, "sendfile": 71, "readlinkat": 78, "newfstatat": 79, "fstat": 80,
+    "utimensat": 88, "exit_group": 94, "bind": 200, "listen": 201, "accept": 202, "connect": 203,
+    "sendto": 206, "recvfrom": 207, "sendmsg": 211, "recvmsg": 212, "clone": 220, "execve": 221, "mmap": 222,
+    "mprotect": 226, "accept4": 242, "renameat2": 276, "execveat": 281, "copy_file_range": 285,
+    "preadv2": 286, "pwritev2": 287, "statx": 291, "clone3": 435, "openat2": 437, "faccessat2": 439,
+}
+
+# open flags argument (hex, as auditd logs a0..a3) of the syscalls whose
+# READ/WRITE direction depends on O_ACCMODE / O_TRUNC
+_OPEN_FLAGS_ARG = {"open": "a1", "openat": "a2"}
+_O_ACCMODE = 0o3
+_O_TRUNC = 0o1000
+
+class SyscallTable:
+    """Action codes of one arch, indexed by syscall number."""
+
+    def __init__(self, arch: str, numbers: Mapping[str, int]) -> None:
+        self.arch = arch
+        self.numbers = dict(numbers)
+        table = [OTHER] * (max(numbers.values()) + 1)
+        for name, nr in numbers.items():
+            table[nr] = _SYSCALL_ACTIONS.get(name, OTHER)
+        self.actions: Tuple[int, ...] = tuple(table)
+        self.flags_args: Dict[int, str] = {numbers[n]: a for n, a in _OPEN_FLAGS_ARG.items() if n in numbers}
+
+    def action(self, nr: int) -> int:
+        return self.actions[nr] if 0 <= nr < len(self.actions) else OTHER
+
+X86_64 = SyscallTable("x86_64", _X86_64)
+AARCH64 = SyscallTable("aarch64", _AARCH64)
+
+# audit arch field: AUDIT_ARCH_* as logged, or its name after ausearch -i
+ARCHES: Dict[str, SyscallTable] = {
+    "c000003e": X86_64,
+    "x86_64": X86_64,
+    "c00000b7": AARCH64,
+    "aarch64": AARCH64,
+}
+DEFAULT_ARCH = X86_64
+
+def _open_action(flags: str) -> int:
+    try:
+        value = int(flags, 16)
+    except ValueError:
+        # ausearch -i spells the flags out (O_WRONLY|O_CREAT|...)
+        return WRITE if "O_WRONLY" in flags or "O_RDWR" in flags or "O_TRUNC" in flags else READ
+    return WRITE if value & _O_ACCMODE or value & _O_TRUNC else READ
+
+def decode_syscall(kv: Mapping[str, str]) -> Tuple[Optional[int], int]:
+    """(syscall number, action code) of a SYSCALL record's key/values.
+
+    The number is None if the syscall field is missing or names a syscall
+    unknown for the arch; unknown syscalls decode to OTHER. Records without
+    an arch (or with an unknown one) are decoded as x86_64.
+    """
+    table = ARCHES.get(kv.get("arch", "").lower(), DEFAULT_ARCH)
+    sc = kv.get("syscall", "")
+    if sc.isdigit():
+        nr: Optional[int] = int(sc)
+    else:
+        # interpreted logs (ausearch -i) name the syscall
+        nr = table.numbers.get(sc)
+        if nr is None:
+            return None, _SYSCALL_ACTIONS.get(sc, OTHER)
+    action = table.action(nr)
+    flags_arg = table.flags_args.get(nr)
+    if flags_arg is not None and flags_arg in kv:
+        action = _open_action(kv[flags_arg])
+    return nr, action